@@ -1,5 +1,12 @@
 __all__ = [
     "openai_embeddings",
     "chroma_user_vectors",
+    "cached_embeddings",
+    "sqlite_embedding_store",
+    "local_embeddings",
+    "sqlite_validated_cache",
+    "sqlite_parent_store",
+    "numpy_user_vectors",
+    "ivf_user_vectors",
 ]
 
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from search.adapters.sqlite_embedding_store import SqliteEmbeddingStore
+from search.ports.embeddings import EmbeddingsProvider
+from search.utils.ingest import hash_text
+
+
+class CachedEmbeddings(EmbeddingsProvider):
+    """
+    EmbeddingsProvider decorator with an in-memory LRU tier and an optional on-disk tier.
+    Entries are keyed by (model, hash of the whitespace-normalized text); only misses
+    reach the wrapped provider, each distinct text once per call.
+    """
+
+    def __init__(
+            self,
+            inner: EmbeddingsProvider,
+            model: str,
+            *,
+            max_memory_items: int = 1024,
+            store: SqliteEmbeddingStore | None = None,
+    ) -> None:
+        self._inner = inner
+        self._model = model
+        self._max_memory_items = max(0, max_memory_items)
+        self._store = store
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_items": len(self._memory),
+        }
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys = [hash_text(t) for t in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vec
+                    self.memory_hits += 1
+
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing and self._store is not None:
+            from_disk = self._store.get_many(self._model, missing)
+            with self._lock:
+                self.disk_hits += len(from_disk)
+            found.update(from_disk)
+            self._remember(from_disk)
+
+        missing_idx: Dict[str, int] = {}
+        for i, key in enumerate(keys):
+            if key not in found and key not in missing_idx:
+                missing_idx[key] = i
+        if missing_idx:
+            new_vecs = self._inner.embed_texts([texts[i] for i in missing_idx.values()])
+            computed = {key: list(vec) for key, vec in zip(missing_idx, new_vecs)}
+            with self._lock:
+                self.misses += len(missing_idx)
+            found.update(computed)
+            self._remember(computed)
+            if self._store is not None:
+                self._store.put_many(self._model, computed)
+
+        return [list(found.get(key, [])) for key in keys]
+
+    def _remember(self, vectors: Dict[str, List[float]]) -> None:
+        if not self._max_memory_items:
+            return
+        with self._lock:
+            for key, vec in vectors.items():
+                self._memory[key] = vec
+                self._memory.move_to_end(key)
+            while len(self._memory) > self._max_memory_items:
+                self._memory.popitem(last=False)
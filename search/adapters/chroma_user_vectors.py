@@ -1,10 +1,12 @@
-from typing import Any, Dict, List
+import os
+from typing import Any, Dict, Iterator, List, Tuple
 
 import chromadb
 from chromadb.api.models.Collection import Collection
 
 from search.models.collection_item import CollectionItem
-from search.ports.user_vectors import Row, UserVectorRepository
+from search.ports.user_vectors import WITH_DOCUMENTS, Projection, Row, UserVectorRepository
+from search.utils.ingest import batched
 
 def get_or_create_collection(
         persist_path: str,
@@ -33,9 +35,53 @@ def get_or_create_collection(
         return client.create_collection(name=name, metadata=md)
 
 
+def get_collection(persist_path: str, name: str) -> Collection | None:
+    """Open an existing collection, or None if there is none; never creates one (or the store)."""
+    if not os.path.isdir(persist_path):
+        return None
+    client = chromadb.PersistentClient(path=persist_path)
+    try:
+        return client.get_collection(name)
+    except Exception:
+        return None
+
+
+def delete_collection(persist_path: str, name: str) -> bool:
+    """Drop a collection if it exists; returns whether one was deleted."""
+    client = chromadb.PersistentClient(path=persist_path)
+    try:
+        client.delete_collection(name)
+    except Exception:
+        return False
+    return True
+
+
+def _nth(batch: Any, i: int) -> List[Any]:
+    """Per-query slice of a batched Chroma result field (None/short lists -> [])."""
+    if batch is None or i >= len(batch) or batch[i] is None:
+        return []
+    return list(batch[i])
+
+
+# Used when the client cannot report its limit
+DEFAULT_MAX_BATCH_SIZE = 1000
+
+
 class ChromaUserVectors(UserVectorRepository):
-    def __init__(self, collection: Collection) -> None:
+    def __init__(self, collection: Collection, max_batch_size: int | None = None) -> None:
         self._col = collection
+        self._max_batch_size = max_batch_size if max_batch_size and max_batch_size > 0 else None
+
+    @property
+    def max_batch_size(self) -> int:
+        """Records per write call: the client's reported maximum unless overridden."""
+        if self._max_batch_size is None:
+            try:
+                reported = int(self._col._client.get_max_batch_size())
+            except Exception:
+                reported = 0
+            self._max_batch_size = reported if reported > 0 else DEFAULT_MAX_BATCH_SIZE
+        return self._max_batch_size
 
     @property
     def name(self) -> str:
@@ -44,9 +90,24 @@ class ChromaUserVectors(UserVectorRepository):
     @property
     def metadata(self) -> Dict[str, Any] | None:
         try:
-            return self._col.metadata
+            md = self._col.metadata
         except Exception:
             return None
+        if md is not None and "hnsw:space" not in md:
+            # Chroma drops hnsw:* keys from metadata after modify(); recover space from the config
+            try:
+                space = (self._col.configuration or {}).get("hnsw", {}).get("space")
+            except Exception:
+                space = None
+            if space:
+                md = {**md, "hnsw:space": space}
+        return md
+
+    def update_metadata(self, values: Dict[str, Any]) -> None:
+        """Merge `values` into the collection metadata (hnsw:* settings are immutable)."""
+        current = {k: v for k, v in (self._col.metadata or {}).items() if not k.startswith("hnsw:")}
+        current.update(values)
+        self._col.modify(metadata=current)
 
     def upsert(
             self,
@@ -57,41 +118,86 @@ class ChromaUserVectors(UserVectorRepository):
     ) -> None:
         if not ids:
             return
-        try:
-            self._col.delete(ids=ids)
-        except Exception:
-            pass
-        kwargs: Dict[str, Any] = {"ids": ids, "documents": documents, "embeddings": vectors}
-        if metadatas is not None:
-            kwargs["metadatas"] = metadatas
-        self._col.add(**kwargs)
+        step = self.max_batch_size
+        for start in range(0, len(ids), step):
+            end = start + step
+            part = ids[start:end]
+            try:
+                self._col.delete(ids=part)
+            except Exception:
+                pass
+            kwargs: Dict[str, Any] = {"ids": part, "documents": documents[start:end], "embeddings": vectors[start:end]}
+            if metadatas is not None:
+                kwargs["metadatas"] = metadatas[start:end]
+            self._col.add(**kwargs)
 
     def query(
-            self, vector: List[float], k: int, where_document: str | None = None
+            self, vector: List[float], k: int, where_document: str | None = None,
+            include: Projection = WITH_DOCUMENTS,
     ) -> tuple[List[Row], List[float]]:
         if not vector:
             return [], []
+        return self.query_many([vector], k, where_document, include)[0]
+
+    def query_many(
+            self, vectors: List[List[float]], k: int, where_document: str | None = None,
+            include: Projection = WITH_DOCUMENTS,
+    ) -> List[tuple[List[Row], List[float]]]:
+        return [(rows, [r[1] for r in rows]) for rows, _ in self._query(vectors, k, where_document, include, False)]
+
+    def query_many_with_embeddings(
+            self, vectors: List[List[float]], k: int, where_document: str | None = None,
+            include: Projection = WITH_DOCUMENTS,
+    ) -> List[tuple[List[Row], List[Any]]]:
+        """`query_many` that also returns each row's stored embedding (None when unavailable)."""
+        return self._query(vectors, k, where_document, include, True)
+
+    def _query(
+            self, vectors: List[List[float]], k: int, where_document: str | None, include: Projection,
+            with_embeddings: bool,
+    ) -> List[tuple[List[Row], List[Any]]]:
+        if not vectors:
+            return []
+        # Chroma always returns ids; everything else is deserialized only when asked for
+        fields = ["distances"]
+        if "documents" in include:
+            fields.append("documents")
+        if "metadata" in include:
+            fields.append("metadatas")
+        if with_embeddings:
+            fields.append("embeddings")
         query_kwargs: Dict[str, Any] = {
-            "query_embeddings": [vector],
+            "query_embeddings": vectors,
             "n_results": max(1, k),
-            "include": ["documents", "distances", "metadatas", "embeddings"],
+            "include": fields,
         }
         if where_document:
             query_kwargs["where_document"] = {"$contains": where_document}
         res = self._col.query(**query_kwargs)
-        ids = res.get("ids", [[]])[0]
-        docs = res.get("documents", [[]])[0]
-        dists = res.get("distances", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
-        rows: List[Row] = list(zip(ids, dists, docs, metas))
-        return rows, dists
-
-    def get_by_ids(self, ids: List[str], include_embeddings: bool = False) -> Dict[str, CollectionItem]:
+        out: List[tuple[List[Row], List[Any]]] = []
+        for qi in range(len(vectors)):
+            ids = _nth(res.get("ids"), qi)
+            docs = _nth(res.get("documents"), qi)
+            dists = _nth(res.get("distances"), qi)
+            metas = _nth(res.get("metadatas"), qi)
+            embs = _nth(res.get("embeddings"), qi) if with_embeddings else []
+            rows: List[Row] = [
+                (rid, dists[j], docs[j] if j < len(docs) else "", (metas[j] if j < len(metas) else None) or {})
+                for j, rid in enumerate(ids[: len(dists)])
+            ]
+            out.append((rows, [embs[j] if j < len(embs) else None for j in range(len(rows))]))
+        return out
+
+    def get_by_ids(
+            self, ids: List[str], include_embeddings: bool = False, include_documents: bool = False
+    ) -> Dict[str, CollectionItem]:
         if not ids:
             return {}
         include: List[str] = ["metadatas"]
         if include_embeddings:
             include.append("embeddings")
+        if include_documents:
+            include.append("documents")
         res = self._col.get(ids=ids, include=include)
         got_ids = res.get("ids")
         if got_ids is None:
@@ -102,6 +208,9 @@ class ChromaUserVectors(UserVectorRepository):
         embs = res.get("embeddings")
         if embs is None:
             embs = []
+        docs = res.get("documents")
+        if docs is None:
+            docs = []
         out: Dict[str, UserVectorRepository.Item] = {}
         for i, rid in enumerate(got_ids):
             item: UserVectorRepository.Item = {}
@@ -109,5 +218,26 @@ class ChromaUserVectors(UserVectorRepository):
                 item["metadata"] = metas[i]
             if include_embeddings and i < len(embs) and embs[i] is not None:
                 item["embedding"] = embs[i]
+            if include_documents and i < len(docs) and docs[i] is not None:
+                item["document"] = docs[i]
             out[rid] = item
         return out
+
+    def delete(self, ids: List[str]) -> None:
+        for part in batched(list(ids), self.max_batch_size):
+            self._col.delete(ids=list(part))
+
+    def iter_metadata(self, page_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        page_size = max(1, page_size)
+        offset = 0
+        while True:
+            res = self._col.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids = res.get("ids") or []
+            metas = res.get("metadatas")
+            if metas is None:
+                metas = []
+            for i, rid in enumerate(ids):
+                yield rid, (metas[i] if i < len(metas) and metas[i] is not None else {})
+            if len(ids) < page_size:
+                return
+            offset += len(ids)
@@ -0,0 +1,312 @@
+import math
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from search.adapters.numpy_user_vectors import NumpyUserVectors
+
+# Lists are only worth it once each holds a few dozen vectors
+MIN_POINTS_PER_LIST = 39
+
+
+def ivf_collection_path(persist_path: str, name: str) -> str:
+    return os.path.join(persist_path, "ivf", name)
+
+
+def open_ivf_collection(
+        persist_path: str,
+        name: str,
+        space: str = "cosine",
+        force_recreate: bool = False,
+        model: str | None = None,
+        extra_meta: Dict[str, Any] | None = None,
+        **options: Any,
+) -> "IvfUserVectors":
+    """Counterpart of `get_or_create_collection` for the IVF backend; `options` go to IvfUserVectors."""
+    path = ivf_collection_path(persist_path, name)
+    if force_recreate:
+        shutil.rmtree(path, ignore_errors=True)
+    md: Dict[str, Any] = {"hnsw:space": space, "model": model}
+    if extra_meta:
+        md.update(extra_meta)
+    return IvfUserVectors(path, name=name, metadata=md, **options)
+
+
+def delete_ivf_collection(persist_path: str, name: str) -> bool:
+    path = ivf_collection_path(persist_path, name)
+    if not os.path.isdir(path):
+        return False
+    shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+def auto_nlist(n: int) -> int:
+    """~sqrt(n) lists, keeping at least MIN_POINTS_PER_LIST vectors per list."""
+    return max(1, min(int(round(math.sqrt(n))), n // MIN_POINTS_PER_LIST))
+
+
+class IvfUserVectors(NumpyUserVectors):
+    """
+    Inverted-file index over the NumPy backend's storage: k-means centroids (`centroids.npy`)
+    partition the vectors into `nlist` lists (`lists.npy` holds each row's list), and a query
+    scans only the `nprobe` lists whose centroids are nearest.
+
+    Training is an explicit step, `train_if_needed`, run by the writer after an ingest: once
+    the collection holds `min_train` vectors and again whenever it has grown
+    `retrain_growth`-fold since, on a sample of at most `train_sample_per_list` vectors per
+    list. In between, upserted vectors are assigned to their nearest centroid. Queries never
+    train: until the first training they are exact. Cosine uses spherical k-means; ip probes
+    by inner product.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            *,
+            name: str | None = None,
+            metadata: Dict[str, Any] | None = None,
+            nlist: int = 0,
+            nprobe: int = 8,
+            min_train: int = 4096,
+            retrain_growth: float = 4.0,
+            train_sample_per_list: int = 64,
+            iterations: int = 15,
+            seed: int = 0,
+    ) -> None:
+        super().__init__(path, name=name, metadata=metadata)
+        self.nlist = max(0, int(nlist))
+        self.nprobe = max(1, int(nprobe))
+        self.min_train = max(1, int(min_train))
+        self.retrain_growth = max(1.0, float(retrain_growth))
+        self.train_sample_per_list = max(1, int(train_sample_per_list))
+        self.iterations = max(1, int(iterations))
+        self.seed = seed
+        self._state: Dict[str, Any] = self._get_value("ivf") or {}
+        self._centroids: np.ndarray | None = None
+        cpath = os.path.join(path, "centroids.npy")
+        if self._state and os.path.exists(cpath):
+            self._centroids = np.load(cpath)
+        self._lists: np.ndarray | None = None
+        lpath = os.path.join(path, "lists.npy")
+        if self._vectors is not None and os.path.exists(lpath):
+            self._lists = np.load(lpath, mmap_mode="r+")
+        # (order, offsets): rows grouped by list, rebuilt lazily after writes
+        self._members: Tuple[np.ndarray, np.ndarray] | None = None
+
+    # ---- training -----------------------------------------------------------------
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None and self._lists is not None
+
+    def needs_training(self) -> bool:
+        n = len(self)
+        if n < self.min_train:
+            return False
+        if not self.trained:
+            return True
+        assert self._centroids is not None
+        if self.nlist and self.nlist != self._centroids.shape[0]:
+            return True
+        return n > int(self._state.get("trained_size") or 0) * self.retrain_growth
+
+    def train_if_needed(self) -> bool:
+        """Train when `needs_training`; returns whether it did. Call after writes, not per query."""
+        with self._lock:
+            if not self.needs_training():
+                return False
+            self.train()
+            return True
+
+    def train(self) -> None:
+        """Run k-means over (a sample of) the stored vectors and assign every vector to a list."""
+        with self._lock:
+            live = np.flatnonzero(self._live[: self._size])
+            if live.size == 0 or self._vectors is None:
+                return
+            t0 = time.perf_counter()
+            nlist = min(self.nlist or auto_nlist(live.size), live.size)
+            rng = np.random.default_rng(self.seed)
+            cap = nlist * self.train_sample_per_list
+            sample_rows = np.sort(rng.choice(live, size=min(cap, live.size), replace=False))
+            sample = self._train_space(np.asarray(self._vectors[sample_rows], dtype=np.float32))
+            centroids = _kmeans(sample, nlist, self.iterations, rng, spherical=self.space == "cosine")
+
+            self._centroids = centroids
+            self._ensure_lists()
+            assert self._lists is not None
+            self._lists[:] = -1
+            for start in range(0, live.size, 65536):
+                part = live[start: start + 65536]
+                self._lists[part] = self._nearest_lists(np.asarray(self._vectors[part], dtype=np.float32))
+            self._lists.flush()
+            np.save(os.path.join(self._path, "centroids.npy"), centroids)
+            self._state = {
+                "nlist": int(nlist),
+                "trained_size": int(live.size),
+                "train_sample": int(sample_rows.size),
+                "build_seconds": round(time.perf_counter() - t0, 3),
+            }
+            self._put_value("ivf", self._state)
+            self._conn.commit()
+            self._members = None
+
+    def _train_space(self, x: np.ndarray) -> np.ndarray:
+        if self.space == "cosine":
+            return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+        return x
+
+    def _nearest_lists(self, x: np.ndarray, n: int = 1) -> np.ndarray:
+        """Nearest `n` lists per vector (shape (len(x),) when n == 1)."""
+        assert self._centroids is not None
+        c = self._centroids
+        dots = self._train_space(x) @ c.T
+        if self.space == "l2":
+            scores = (c * c).sum(axis=1)[None, :] - 2.0 * dots
+        else:
+            scores = -dots
+        if n == 1:
+            return np.argmin(scores, axis=1).astype(np.int32)
+        n = min(n, c.shape[0])
+        part = np.argpartition(scores, n - 1, axis=1)[:, :n]
+        return part.astype(np.int32)
+
+    def _ensure_lists(self) -> None:
+        capacity = 0 if self._vectors is None else int(self._vectors.shape[0])
+        if self._lists is None or self._lists.shape[0] < capacity:
+            self._lists = self._grow("lists.npy", (capacity,), self._lists, dtype=np.int32, fill=-1)
+
+    def _ensure_capacity(self, needed: int, dim: int) -> None:
+        super()._ensure_capacity(needed, dim)
+        if self._lists is not None:
+            self._ensure_lists()
+
+    # ---- writes -----------------------------------------------------------------
+
+    def upsert(
+            self,
+            ids: List[str],
+            documents: List[str],
+            vectors: List[List[float]],
+            metadatas: List[Dict[str, Any]] | None = None,
+    ) -> None:
+        if not ids:
+            return
+        with self._lock:
+            super().upsert(ids, documents, vectors, metadatas)
+            if self.trained:
+                # Incremental assignment: new and changed vectors join their nearest list
+                assert self._lists is not None and self._vectors is not None
+                rows = np.fromiter((self._row_of[rid] for rid in ids), dtype=np.int64, count=len(ids))
+                self._lists[rows] = self._nearest_lists(np.asarray(self._vectors[rows], dtype=np.float32))
+                self._lists.flush()
+                self._members = None
+
+    # ---- reads ------------------------------------------------------------------
+
+    def _search(
+            self, q: np.ndarray, where_document: str | None, k: int, oversample: int | None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        if not self.trained:
+            return super()._search(q, where_document, k, oversample)
+        allowed = self._candidate_rows(where_document) if where_document else None
+        probes = self._nearest_lists(q, self.nprobe)
+        if probes.ndim == 1:
+            probes = probes[:, None]
+        ranked = []
+        for qi in range(q.shape[0]):
+            candidates = self._probe(probes[qi])
+            if allowed is not None:
+                candidates = np.intersect1d(candidates, allowed, assume_unique=True)
+            if oversample is None:
+                ranked.extend(self._rank(q[qi: qi + 1], candidates, k))
+            else:
+                ranked.append(self._rank_quantized(q[qi: qi + 1], candidates, k, oversample))
+        return ranked
+
+    def _probe(self, lists: np.ndarray) -> np.ndarray:
+        """Live rows in the given lists."""
+        order, offsets = self._list_members()
+        parts = [order[offsets[c]: offsets[c + 1]] for c in lists]
+        rows = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        return np.sort(rows[self._live[rows]])
+
+    def _list_members(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._members is None:
+            assert self._lists is not None and self._centroids is not None
+            assign = np.asarray(self._lists[: self._size])
+            order = np.argsort(assign, kind="stable")
+            offsets = np.searchsorted(assign[order], np.arange(self._centroids.shape[0] + 1))
+            self._members = (order.astype(np.int64), offsets)
+        return self._members
+
+    # ---- metrics ----------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Build time, list balance and bytes per stored vector (vector, norm, code, list id, share of centroids)."""
+        with self._lock:
+            n = len(self)
+            dim = self.dimension or 0
+            out: Dict[str, Any] = {"vectors": n, "dim": dim, "nprobe": self.nprobe, "trained": self.trained}
+            per_vector = 4 * dim + 4 + (dim + 63) // 64 * 8
+            if self.trained:
+                assert self._centroids is not None
+                order, offsets = self._list_members()
+                sizes = np.diff(offsets)
+                out.update(self._state)
+                out.update({
+                    "list_min": int(sizes.min()), "list_mean": round(float(sizes.mean()), 1),
+                    "list_max": int(sizes.max()),
+                })
+                per_vector += 4 + (self._centroids.nbytes / n if n else 0.0)
+            out["bytes_per_vector"] = round(per_vector, 1)
+            return out
+
+    def estimate_recall(self, k: int = 10, queries: int = 100, seed: int = 0) -> float:
+        """Mean recall@k of probed search against exact search, using stored vectors as queries."""
+        with self._lock:
+            live = np.flatnonzero(self._live[: self._size])
+            if not self.trained or live.size == 0 or self._vectors is None:
+                return 1.0
+            rng = np.random.default_rng(seed)
+            picked = rng.choice(live, size=min(queries, live.size), replace=False)
+            q = np.asarray(self._vectors[picked], dtype=np.float32)
+            exact = self._rank(q, live, k)
+            probes = self._nearest_lists(q, self.nprobe)
+            if probes.ndim == 1:
+                probes = probes[:, None]
+            hits = 0.0
+            for qi in range(q.shape[0]):
+                approx = self._rank(q[qi: qi + 1], self._probe(probes[qi]), k)[0][0]
+                truth = exact[qi][0]
+                hits += len(np.intersect1d(approx, truth)) / max(1, truth.size)
+            return hits / q.shape[0]
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int, rng: np.random.Generator, *, spherical: bool) -> np.ndarray:
+    """Lloyd's k-means, vectorized; `spherical` keeps centroids unit-length (cosine)."""
+    centroids = x[rng.choice(x.shape[0], size=k, replace=False)].copy()
+    x_sq = (x * x).sum(axis=1)
+    for _ in range(iterations):
+        if spherical:
+            assign = np.argmax(x @ centroids.T, axis=1)
+        else:
+            d = x_sq[:, None] - 2.0 * (x @ centroids.T) + (centroids * centroids).sum(axis=1)[None, :]
+            assign = np.argmin(d, axis=1)
+        counts = np.bincount(assign, minlength=k)
+        order = np.argsort(assign, kind="stable")
+        starts = np.searchsorted(assign[order], np.arange(k))
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(x[order], starts[filled], axis=0)
+        empty = ~filled
+        centroids = np.where(empty[:, None], centroids, sums / np.maximum(counts, 1)[:, None])
+        if empty.any():
+            # Re-seed empty lists with random points
+            centroids[empty] = x[rng.choice(x.shape[0], size=int(empty.sum()), replace=False)]
+        if spherical:
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
@@ -0,0 +1,70 @@
+import math
+import random
+import re
+import time
+import zlib
+from typing import Callable, List
+
+from search.ports.embeddings import EmbeddingsProvider
+
+
+class LocalEmbeddings(EmbeddingsProvider):
+    """
+    Deterministic, offline embeddings: hashed word and character n-gram features
+    folded into `dim` signed buckets and L2-normalized. Texts sharing words or
+    substrings land close together, which is enough to exercise ingest and query
+    paths end to end without a network. `latency` (seconds per call) can inject
+    a simulated request delay.
+    """
+
+    def __init__(
+            self,
+            dim: int = 256,
+            *,
+            ngram: int = 3,
+            latency: Callable[[], float] | None = None,
+            sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.dim = max(1, int(dim))
+        self.ngram = max(1, int(ngram))
+        self._latency = latency
+        self._sleep = sleep
+
+    @property
+    def model_name(self) -> str:
+        """Identity stamped as embed_model, so local vectors never mix with a real model's."""
+        return f"local-ngram{self.ngram}-{self.dim}"
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self._latency is not None:
+            self._sleep(max(0.0, float(self._latency())))
+        return [self._embed(t) for t in texts]
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        s = (text or "").lower()
+        features = re.findall(r"\w+", s)
+        padded = f" {s} "
+        features.extend(padded[i: i + self.ngram] for i in range(max(0, len(padded) - self.ngram + 1)))
+        for feat in features:
+            h = zlib.crc32(feat.encode("utf-8"))
+            vec[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vec))
+        if norm == 0.0:
+            # Keep vectors non-zero so cosine distance stays defined
+            vec[0] = 1.0
+            return vec
+        return [x / norm for x in vec]
+
+
+def gaussian_latency(mean_ms: float, jitter_ms: float = 0.0, seed: int = 0) -> Callable[[], float]:
+    """Latency sampler in seconds: normal(mean, jitter) clipped at zero, reproducible via `seed`."""
+    rng = random.Random(seed)
+
+    def sample() -> float:
+        ms = rng.gauss(mean_ms, jitter_ms) if jitter_ms > 0 else mean_ms
+        return max(0.0, ms) / 1000.0
+
+    return sample
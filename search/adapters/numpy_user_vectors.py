@@ -0,0 +1,494 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from search.models.collection_item import CollectionItem
+from search.ports.user_vectors import WITH_DOCUMENTS, Projection, Row, UserVectorRepository
+
+SPACES = ("cosine", "l2", "ip")
+_INITIAL_CAPACITY = 1024
+# Rows packed per step when codes are rebuilt for a collection written before they existed
+_CODE_BLOCK = 65536
+# Set bits in each byte value, for popcount on NumPy builds without np.bitwise_count
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+class DimensionMismatchError(ValueError):
+    """Raised when a vector's dimension differs from the collection's."""
+
+
+def numpy_collection_path(persist_path: str, name: str) -> str:
+    return os.path.join(persist_path, "numpy", name)
+
+
+def open_numpy_collection(
+        persist_path: str,
+        name: str,
+        space: str = "cosine",
+        force_recreate: bool = False,
+        model: str | None = None,
+        extra_meta: Dict[str, Any] | None = None,
+) -> "NumpyUserVectors":
+    """Counterpart of `get_or_create_collection` for the NumPy backend."""
+    path = numpy_collection_path(persist_path, name)
+    if force_recreate:
+        shutil.rmtree(path, ignore_errors=True)
+    md: Dict[str, Any] = {"hnsw:space": space, "model": model}
+    if extra_meta:
+        md.update(extra_meta)
+    return NumpyUserVectors(path, name=name, metadata=md)
+
+
+def delete_numpy_collection(persist_path: str, name: str) -> bool:
+    path = numpy_collection_path(persist_path, name)
+    if not os.path.isdir(path):
+        return False
+    shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+class NumpyUserVectors(UserVectorRepository):
+    """
+    Exact in-process search over a contiguous float32 matrix.
+
+    Vectors live in `<path>/vectors.npy` (opened as a memory map, so a resident process
+    starts without reading them) with their norms in `norms.npy`; ids, documents and
+    metadata live in a SQLite sidecar (`records.sqlite3`). Distances match Chroma's
+    spaces: cosine = 1 - cos, l2 = squared euclidean, ip = 1 - dot. Deleted rows are
+    reused by later upserts; the files grow by doubling.
+
+    `codes.npy` keeps a sign-bit copy of every vector packed into bytes (dim / 8 per row,
+    padded to 64-bit words; 1/32 of the float copy); `query_many_quantized` ranks candidates by Hamming distance over
+    those codes first and re-ranks only the best `k * oversample` exactly.
+    """
+
+    def __init__(self, path: str, *, name: str | None = None, metadata: Dict[str, Any] | None = None) -> None:
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._name = name or os.path.basename(os.path.normpath(path))
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(path, "records.sqlite3"), check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " id TEXT PRIMARY KEY,"
+            " row INTEGER NOT NULL UNIQUE,"
+            " document TEXT NOT NULL,"
+            " metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS collection (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if metadata is not None and self._load_metadata() is None:
+            self._save_metadata(metadata)
+        self._conn.commit()
+
+        self._vectors: np.ndarray | None = None
+        self._norms: np.ndarray | None = None
+        self._codes: np.ndarray | None = None
+        vec_path = os.path.join(path, "vectors.npy")
+        if os.path.exists(vec_path):
+            self._vectors = np.load(vec_path, mmap_mode="r+")
+            self._norms = np.load(os.path.join(path, "norms.npy"), mmap_mode="r+")
+            self._codes = self._load_codes()
+        self._row_of: Dict[str, int] = dict(self._conn.execute("SELECT id, row FROM records").fetchall())
+        capacity = 0 if self._vectors is None else int(self._vectors.shape[0])
+        self._live = np.zeros(capacity, dtype=bool)
+        if self._row_of:
+            self._live[np.fromiter(self._row_of.values(), dtype=np.int64)] = True
+        self._size = int(max(self._row_of.values()) + 1) if self._row_of else 0
+        self._free = [r for r in range(self._size) if not self._live[r]]
+
+    # ---- collection -------------------------------------------------------------
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def metadata(self) -> Dict[str, Any] | None:
+        with self._lock:
+            return self._load_metadata()
+
+    @property
+    def space(self) -> str:
+        space = str((self.metadata or {}).get("hnsw:space") or "cosine").lower()
+        return space if space in SPACES else "cosine"
+
+    @property
+    def dimension(self) -> int | None:
+        return None if self._vectors is None else int(self._vectors.shape[1])
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def update_metadata(self, values: Dict[str, Any]) -> None:
+        """Merge `values` into the collection metadata (hnsw:space is fixed at creation)."""
+        with self._lock:
+            current = self._load_metadata() or {}
+            current.update({k: v for k, v in values.items() if not k.startswith("hnsw:")})
+            self._save_metadata(current)
+            self._conn.commit()
+
+    def _load_metadata(self) -> Dict[str, Any] | None:
+        return self._get_value("metadata")
+
+    def _save_metadata(self, md: Dict[str, Any]) -> None:
+        self._put_value("metadata", md)
+
+    def _get_value(self, key: str) -> Any:
+        row = self._conn.execute("SELECT value FROM collection WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put_value(self, key: str, value: Any) -> None:
+        """Store a collection-level value (committed with the caller's next commit)."""
+        self._conn.execute("INSERT OR REPLACE INTO collection (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    # ---- writes -----------------------------------------------------------------
+
+    def upsert(
+            self,
+            ids: List[str],
+            documents: List[str],
+            vectors: List[List[float]],
+            metadatas: List[Dict[str, Any]] | None = None,
+    ) -> None:
+        if not ids:
+            return
+        mat = np.asarray(vectors, dtype=np.float32)
+        if mat.ndim != 2 or mat.shape[0] != len(ids):
+            raise ValueError("vectors must be a list of equal-length vectors aligned with ids")
+        with self._lock:
+            dim = self.dimension
+            if dim is not None and mat.shape[1] != dim:
+                raise DimensionMismatchError(
+                    f"Embedding dimension {mat.shape[1]} does not match collection dimensionality {dim}"
+                )
+            rows = np.fromiter((self._row_for(rid) for rid in ids), dtype=np.int64, count=len(ids))
+            self._ensure_capacity(int(rows.max()) + 1, mat.shape[1])
+            assert self._vectors is not None and self._norms is not None
+            assert self._codes is not None
+            self._vectors[rows] = mat
+            self._norms[rows] = np.linalg.norm(mat, axis=1)
+            self._codes[rows] = _sign_codes(mat)
+            self._vectors.flush()
+            self._norms.flush()
+            self._codes.flush()
+            # Vectors are on disk before the sidecar references them
+            metas = metadatas or [{} for _ in ids]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (id, row, document, metadata) VALUES (?, ?, ?, ?)",
+                [(rid, int(r), documents[i] or "", json.dumps(metas[i] or {})) for i, (rid, r) in
+                 enumerate(zip(ids, rows))],
+            )
+            self._conn.commit()
+            for rid, r in zip(ids, rows):
+                self._row_of[rid] = int(r)
+            self._live[rows] = True
+
+    def _row_for(self, rid: str) -> int:
+        row = self._row_of.get(rid)
+        if row is not None:
+            return row
+        if self._free:
+            row = self._free.pop()
+        else:
+            row = self._size
+            self._size += 1
+        # Claim it now so duplicates within one batch share the row
+        self._row_of[rid] = row
+        return row
+
+    def _ensure_capacity(self, needed: int, dim: int) -> None:
+        capacity = 0 if self._vectors is None else int(self._vectors.shape[0])
+        if needed <= capacity:
+            return
+        new_cap = max(_INITIAL_CAPACITY, capacity)
+        while new_cap < needed:
+            new_cap *= 2
+        vectors = self._grow("vectors.npy", (new_cap, dim), self._vectors)
+        norms = self._grow("norms.npy", (new_cap,), self._norms)
+        codes = self._grow("codes.npy", (new_cap, _code_width(dim)), self._codes, dtype=np.uint8)
+        self._vectors, self._norms, self._codes = vectors, norms, codes
+        live = np.zeros(new_cap, dtype=bool)
+        live[: self._live.shape[0]] = self._live
+        self._live = live
+
+    def _grow(
+            self, filename: str, shape: Tuple[int, ...], old: np.ndarray | None, dtype: Any = np.float32, fill: Any = 0
+    ) -> np.ndarray:
+        """Copy `old` into a larger `.npy` memory map (new rows set to `fill`) and swap it in."""
+        final = os.path.join(self._path, filename)
+        tmp = f"{final}.tmp"
+        new = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+        if fill:
+            new[:] = fill
+        if old is not None:
+            new[: old.shape[0]] = old
+        new.flush()
+        del new
+        os.replace(tmp, final)
+        return np.load(final, mmap_mode="r+")
+
+    def _load_codes(self) -> np.ndarray:
+        """Open `codes.npy`, packing it from the vectors first if it is missing or stale."""
+        assert self._vectors is not None
+        path = os.path.join(self._path, "codes.npy")
+        shape = (self._vectors.shape[0], _code_width(self._vectors.shape[1]))
+        if os.path.exists(path):
+            codes = np.load(path, mmap_mode="r+")
+            if codes.shape == shape:
+                return codes
+            del codes
+        tmp = f"{path}.tmp"
+        codes = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint8, shape=shape)
+        for start in range(0, shape[0], _CODE_BLOCK):
+            codes[start: start + _CODE_BLOCK] = _sign_codes(self._vectors[start: start + _CODE_BLOCK])
+        codes.flush()
+        del codes
+        os.replace(tmp, path)
+        return np.load(path, mmap_mode="r+")
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            rows = [(rid, self._row_of[rid]) for rid in dict.fromkeys(ids) if rid in self._row_of]
+            if not rows:
+                return
+            self._conn.executemany("DELETE FROM records WHERE id = ?", [(rid,) for rid, _ in rows])
+            self._conn.commit()
+            for rid, r in rows:
+                del self._row_of[rid]
+                self._live[r] = False
+                self._free.append(r)
+
+    # ---- reads ------------------------------------------------------------------
+
+    def query(
+            self, vector: List[float], k: int, where_document: str | None = None,
+            include: Projection = WITH_DOCUMENTS,
+    ) -> tuple[List[Row], List[float]]:
+        if not vector:
+            return [], []
+        return self.query_many([vector], k, where_document, include)[0]
+
+    def query_many(
+            self, vectors: List[List[float]], k: int, where_document: str | None = None,
+            include: Projection = WITH_DOCUMENTS,
+    ) -> List[tuple[List[Row], List[float]]]:
+        return self._query_many(vectors, k, where_document, None, include)
+
+    def query_quantized(
+            self, vector: List[float], k: int, where_document: str | None = None, oversample: int = 8,
+            include: Projection = WITH_DOCUMENTS,
+    ) -> tuple[List[Row], List[float]]:
+        if not vector:
+            return [], []
+        return self.query_many_quantized([vector], k, where_document, oversample, include)[0]
+
+    def query_many_quantized(
+            self, vectors: List[List[float]], k: int, where_document: str | None = None, oversample: int = 8,
+            include: Projection = WITH_DOCUMENTS,
+    ) -> List[tuple[List[Row], List[float]]]:
+        """
+        `query_many` with a binary first pass: candidates are ranked by Hamming distance
+        between sign-bit codes, and the nearest `k * oversample` are re-ranked exactly.
+        Distances returned are exact; only the shortlist is approximate.
+        """
+        return self._query_many(vectors, k, where_document, max(1, int(oversample)), include)
+
+    def _query_many(
+            self, vectors: List[List[float]], k: int, where_document: str | None, oversample: int | None,
+            include: Projection,
+    ) -> List[tuple[List[Row], List[float]]]:
+        if not vectors:
+            return []
+        with self._lock:
+            q = self._query_matrix(vectors)
+            if q is None:
+                return [([], []) for _ in vectors]
+            return self._to_rows(self._search(q, where_document, max(1, k), oversample), include)
+
+    def _search(
+            self, q: np.ndarray, where_document: str | None, k: int, oversample: int | None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Rank every query against the candidate rows, exactly or through the binary first pass."""
+        candidates = self._candidate_rows(where_document)
+        if oversample is None:
+            return self._rank(q, candidates, k)
+        return [self._rank_quantized(q[qi: qi + 1], candidates, k, oversample) for qi in range(q.shape[0])]
+
+    def _query_matrix(self, vectors: List[List[float]]) -> np.ndarray | None:
+        """Queries as a float32 matrix; None while the collection is empty."""
+        q = np.asarray(vectors, dtype=np.float32)
+        if self._vectors is None or not self._row_of:
+            return None
+        if q.shape[1] != self._vectors.shape[1]:
+            raise DimensionMismatchError(
+                f"Query dimension {q.shape[1]} does not match collection dimensionality {self._vectors.shape[1]}"
+            )
+        return q
+
+    def _rank(self, q: np.ndarray, candidates: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Per query: (rows, distances) of the k nearest `candidates`, nearest first."""
+        if candidates.size == 0:
+            return [(candidates, np.zeros(0, dtype=np.float32)) for _ in range(q.shape[0])]
+        dists = self._distances(q, candidates)
+        return [(candidates[idx], dists[qi, idx]) for qi, idx in enumerate(_top_k(dists, k))]
+
+    def _rank_quantized(
+            self, q: np.ndarray, candidates: np.ndarray, k: int, oversample: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, distances) for one query: Hamming shortlist of k * oversample, then exact `_rank`."""
+        assert self._codes is not None
+        width = k * oversample
+        if candidates.size > width:
+            full = candidates.size == self._size
+            codes = self._codes[: self._size] if full else self._codes[candidates]
+            hamming = _hamming(codes, _sign_codes(q))
+            shortlist = np.argpartition(hamming, width - 1)[:width]
+            candidates = candidates[np.sort(shortlist)]
+        return self._rank(q, candidates, k)[0]
+
+    def _to_rows(
+            self, ranked: List[Tuple[np.ndarray, np.ndarray]], include: Projection = WITH_DOCUMENTS
+    ) -> List[tuple[List[Row], List[float]]]:
+        records = self._records(sorted({int(r) for rows, _ in ranked for r in rows}), include)
+        out: List[tuple[List[Row], List[float]]] = []
+        for rows, dists in ranked:
+            result: List[Row] = []
+            for r, d in zip(rows, dists):
+                rid, doc, meta = records[int(r)]
+                result.append((rid, float(d), doc, meta))
+            out.append((result, [row[1] for row in result]))
+        return out
+
+    def _candidate_rows(self, where_document: str | None) -> np.ndarray:
+        if where_document:
+            found = self._conn.execute(
+                "SELECT row FROM records WHERE instr(document, ?) > 0", (where_document,)
+            ).fetchall()
+            return np.sort(np.fromiter((r for (r,) in found), dtype=np.int64, count=len(found)))
+        return np.flatnonzero(self._live[: self._size])
+
+    def _distances(self, q: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """(queries, candidates) distance matrix in this collection's space."""
+        assert self._vectors is not None and self._norms is not None
+        full = rows.size == self._size
+        # A contiguous slice of the memmap avoids copying the candidates when nothing is filtered
+        mat = self._vectors[: self._size] if full else self._vectors[rows]
+        norms = self._norms[: self._size] if full else self._norms[rows]
+        dots = q @ mat.T
+        space = self.space
+        if space == "ip":
+            return 1.0 - dots
+        q_norms = np.linalg.norm(q, axis=1)
+        if space == "l2":
+            return np.maximum(norms[None, :] ** 2 - 2.0 * dots + q_norms[:, None] ** 2, 0.0)
+        denom = np.maximum(norms[None, :] * q_norms[:, None], 1e-12)
+        return 1.0 - dots / denom
+
+    def _records(
+            self, rows: Sequence[int], include: Projection = WITH_DOCUMENTS
+    ) -> Dict[int, Tuple[str, str, Dict[str, Any]]]:
+        """(id, document, metadata) per row; fields outside `include` are not read ("" / {})."""
+        doc_col = "document" if "documents" in include else "''"
+        meta_col = "metadata" if "metadata" in include else "'{}'"
+        out: Dict[int, Tuple[str, str, Dict[str, Any]]] = {}
+        for i in range(0, len(rows), 500):
+            part = list(rows[i: i + 500])
+            marks = ",".join("?" * len(part))
+            for rid, row, doc, meta in self._conn.execute(
+                    f"SELECT id, row, {doc_col}, {meta_col} FROM records WHERE row IN ({marks})", part
+            ).fetchall():
+                out[int(row)] = (rid, doc, json.loads(meta))
+        return out
+
+    def get_by_ids(
+            self, ids: List[str], include_embeddings: bool = False, include_documents: bool = False
+    ) -> Dict[str, CollectionItem]:
+        if not ids:
+            return {}
+        out: Dict[str, CollectionItem] = {}
+        with self._lock:
+            wanted = list(dict.fromkeys(ids))
+            for i in range(0, len(wanted), 500):
+                part = wanted[i: i + 500]
+                marks = ",".join("?" * len(part))
+                for rid, row, meta, doc in self._conn.execute(
+                        f"SELECT id, row, metadata, {'document' if include_documents else 'NULL'} "
+                        f"FROM records WHERE id IN ({marks})", part
+                ).fetchall():
+                    item: CollectionItem = {"metadata": json.loads(meta)}
+                    if include_documents:
+                        item["document"] = doc
+                    if include_embeddings and self._vectors is not None:
+                        item["embedding"] = self._vectors[int(row)].tolist()
+                    out[rid] = item
+        return out
+
+    def iter_metadata(self, page_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        page_size = max(1, page_size)
+        last = ""
+        while True:
+            with self._lock:
+                page = self._conn.execute(
+                    "SELECT id, metadata FROM records WHERE id > ? ORDER BY id LIMIT ?", (last, page_size)
+                ).fetchall()
+            for rid, meta in page:
+                yield rid, json.loads(meta)
+            if len(page) < page_size:
+                return
+            last = page[-1][0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _code_width(dim: int) -> int:
+    """Bytes per code: one bit per dimension, rounded up to whole 64-bit words."""
+    return (dim + 63) // 64 * 8
+
+
+def _sign_codes(vectors: np.ndarray) -> np.ndarray:
+    """One bit per dimension (set when positive), packed into zero-padded uint8 rows."""
+    vectors = np.asarray(vectors)
+    packed = np.packbits(vectors > 0, axis=1)
+    width = _code_width(vectors.shape[1])
+    if packed.shape[1] == width:
+        return packed
+    out = np.zeros((packed.shape[0], width), dtype=np.uint8)
+    out[:, : packed.shape[1]] = packed
+    return out
+
+
+def _hamming(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Hamming distance from one query code to every row of `codes`."""
+    bitwise_count = getattr(np, "bitwise_count", None)
+    if bitwise_count is None:
+        # NumPy < 2.0 has no popcount ufunc; count bits per byte through a lookup table
+        return _POPCOUNT[codes ^ query_code].sum(axis=1, dtype=np.int32)
+    # Codes are padded to whole 64-bit words, so popcount runs over 8 bytes at a time
+    words = np.ascontiguousarray(codes).view(np.uint64)
+    return bitwise_count(words ^ query_code.view(np.uint64)).sum(axis=1, dtype=np.int32)
+
+
+def _top_k(dists: np.ndarray, k: int) -> List[np.ndarray]:
+    """Per row: indices of the k smallest distances, nearest first."""
+    n = dists.shape[1]
+    if k >= n:
+        return [np.argsort(d, kind="stable") for d in dists]
+    part = np.argpartition(dists, k - 1, axis=1)[:, :k]
+    out: List[np.ndarray] = []
+    for qi in range(dists.shape[0]):
+        idx = part[qi]
+        out.append(idx[np.argsort(dists[qi, idx], kind="stable")])
+    return out
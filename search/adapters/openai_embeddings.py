@@ -1,19 +1,126 @@
-from typing import List
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
 
+import openai
 from openai import OpenAI
 
 from search.ports.embeddings import EmbeddingsProvider
+from search.utils.ingest import batched
+from search.utils.rate_limit import AimdLimiter, backoff_delay
 
 
 class OpenAIEmbeddings(EmbeddingsProvider):
-    def __init__(self, client: OpenAI, model: str) -> None:
+    """
+    Splits input into requests of at most `batch_size` texts and runs them on a bounded
+    thread pool, preserving output order. 429 and 5xx responses (and connection errors)
+    are retried with jittered exponential backoff, honouring Retry-After; 429s also halve
+    the number of requests allowed in flight, which then recovers additively (AIMD).
+    """
+
+    def __init__(
+            self,
+            client: OpenAI,
+            model: str,
+            *,
+            batch_size: int = 128,
+            max_concurrency: int = 4,
+            max_retries: int = 5,
+            backoff_base: float = 0.5,
+            backoff_cap: float = 30.0,
+            sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
         self._client = client
         self._model = model
+        self._batch_size = max(1, batch_size)
+        self._limiter = AimdLimiter(max_concurrency)
+        self._max_retries = max(0, max_retries)
+        self._backoff_base = backoff_base
+        self._backoff_cap = backoff_cap
+        self._sleep = sleep
+
+    @property
+    def concurrency_limit(self) -> int:
+        return self._limiter.limit
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = [list(b) for b in batched(texts, self._batch_size)]
+        return [vec for vecs in self.embed_batches(batches) for vec in vecs]
+
+    def embed_batches(self, batches: List[List[str]]) -> List[List[List[float]]]:
+        """Embed pre-formed request batches concurrently; results align with `batches`."""
+        if not batches:
+            return []
+        # Batches over `batch_size` texts are split into several requests and regrouped
+        requests: List[List[str]] = []
+        spans: List[int] = []
+        for b in batches:
+            parts = [list(p) for p in batched(b, self._batch_size)] if b else [[]]
+            requests.extend(parts)
+            spans.append(len(parts))
+        if len(requests) == 1:
+            results = [self._create_with_retry(requests[0])]
+        else:
+            workers = min(self._limiter.max_limit, len(requests))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self._create_with_retry, requests))
+        out: List[List[List[float]]] = []
+        pos = 0
+        for n in spans:
+            out.append([vec for vecs in results[pos: pos + n] for vec in vecs])
+            pos += n
+        return out
+
+    def _create(self, texts: List[str]) -> List[List[float]]:
         if not texts:
             return []
         resp = self._client.embeddings.create(
             model=self._model, input=texts, encoding_format="float"
         )
         return [d.embedding for d in resp.data]
+
+    def _create_with_retry(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            with self._limiter.slot():
+                try:
+                    vecs = self._create(texts)
+                except Exception as e:
+                    status = _status_code(e)
+                    if status == 429:
+                        self._limiter.on_throttle()
+                    retryable = status == 429 or (status is not None and status >= 500) or isinstance(
+                        e, openai.APIConnectionError
+                    )
+                    if not retryable or attempt >= self._max_retries:
+                        raise
+                    delay = _retry_after(e)
+                    if delay is None:
+                        delay = backoff_delay(attempt, self._backoff_base, self._backoff_cap, random.random)
+                    delay = min(delay, self._backoff_cap)
+                else:
+                    self._limiter.on_success()
+                    return vecs
+            # Sleep outside the slot so waiting requests do not hold concurrency
+            self._sleep(delay)
+            attempt += 1
+
+
+def _status_code(e: Exception) -> int | None:
+    status = getattr(e, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(e: Exception) -> float | None:
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after")
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
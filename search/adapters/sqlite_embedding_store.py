@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Mapping
+
+from search.ports.embedding_store import EmbeddingStore
+
+
+class SqliteEmbeddingStore(EmbeddingStore):
+    """
+    Vectors keyed by (model, text hash) in a single SQLite file, stored as float32 (the
+    precision every vector backend keeps; rows written as float64 by older versions are
+    still read). With `max_entries`, least recently used rows are evicted once the table
+    grows past it; without it the table only grows.
+    """
+
+    def __init__(self, path: str, max_entries: int | None = None) -> None:
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._path = path
+        self._max_entries = max_entries if max_entries and max_entries > 0 else None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "width" not in columns:
+            # Bytes per component; rows from before this column are float64
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN width INTEGER NOT NULL DEFAULT 8")
+        self._conn.commit()
+        # Row count for eviction, counted once here and kept up to date by this instance's writes
+        self._count = len(self) if self._max_entries is not None else 0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0])
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        wanted = list(dict.fromkeys(hashes))
+        out: Dict[str, List[float]] = {}
+        if not wanted:
+            return out
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(wanted), 500):
+                part = wanted[i: i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector, width FROM embeddings WHERE model = ? AND text_hash IN ({marks})",
+                    [model, *part],
+                ).fetchall()
+                for h, blob, width in rows:
+                    out[h] = array("f" if width == 4 else "d", blob).tolist()
+            if out and self._max_entries is not None:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in out],
+                )
+                self._conn.commit()
+        return out
+
+    def put_many(self, model: str, vectors: Mapping[str, List[float]]) -> None:
+        if not vectors:
+            return
+        now = time.time()
+        rows = [(model, h, array("f", vec).tobytes(), now) for h, vec in vectors.items() if vec]
+        with self._lock:
+            # Insert new keys first so the row count is known without a COUNT(*) over the table
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used, width) VALUES (?, ?, ?, ?, 4)",
+                rows,
+            ).rowcount
+            if inserted < len(rows):
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_used = ?, width = 4 WHERE model = ? AND text_hash = ?",
+                    [(blob, used, m, h) for m, h, blob, used in rows],
+                )
+            if self._max_entries is not None:
+                self._count += max(0, inserted)
+                self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        excess = self._count - int(self._max_entries or 0)
+        if excess <= 0:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN"
+            " (SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        ).rowcount
+        self._count -= max(0, deleted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
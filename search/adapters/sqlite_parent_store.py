@@ -0,0 +1,100 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Mapping
+
+from search.ports.parent_store import ParentRecord, ParentStore
+
+
+class SqliteParentStore(ParentStore):
+    """Parent records of one collection, in a SQLite file shared by all collections under --persist."""
+
+    def __init__(self, path: str, collection: str) -> None:
+        self._collection = collection
+        self._open(path)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"path": self._path, "collection": self._collection}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._collection = state["collection"]
+        self._open(state["path"])
+
+    def _open(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parents ("
+            " collection TEXT NOT NULL,"
+            " parent_id TEXT NOT NULL,"
+            " record TEXT NOT NULL,"
+            " PRIMARY KEY (collection, parent_id))"
+        )
+        self._conn.commit()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def collection(self) -> str:
+        return self._collection
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM parents WHERE collection = ?", (self._collection,)
+            ).fetchone()
+            return int(row[0])
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, ParentRecord]:
+        wanted = list(dict.fromkeys(ids))
+        out: Dict[str, ParentRecord] = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(wanted), 500):
+                part = wanted[i: i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT parent_id, record FROM parents WHERE collection = ? AND parent_id IN ({marks})",
+                    [self._collection, *part],
+                ).fetchall()
+                for pid, blob in rows:
+                    out[pid] = json.loads(blob)
+        return out
+
+    def put_many(self, records: Mapping[str, ParentRecord]) -> None:
+        if not records:
+            return
+        rows = [(self._collection, pid, json.dumps(rec)) for pid, rec in records.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parents (collection, parent_id, record) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def delete(self, ids: Iterable[str]) -> None:
+        wanted = list(dict.fromkeys(ids))
+        if not wanted:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM parents WHERE collection = ? AND parent_id = ?",
+                [(self._collection, pid) for pid in wanted],
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop every record of this collection (e.g. when the collection itself is deleted)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM parents WHERE collection = ?", (self._collection,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
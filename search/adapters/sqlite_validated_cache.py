@@ -0,0 +1,115 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Mapping
+
+from search.ports.validated_cache import ValidatedRecordCache
+
+
+class SqliteValidatedCache(ValidatedRecordCache):
+    """
+    Validated record fields keyed by (schema version, raw record hash) in a single SQLite file.
+    With `max_entries`, least recently used rows are evicted once the table grows past it.
+    """
+
+    def __init__(self, path: str, max_entries: int | None = None) -> None:
+        self._open(path, max_entries)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Worker processes reopen the same file (WAL allows concurrent readers and writers)
+        return {"path": self._path, "max_entries": self._max_entries}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._open(state["path"], state.get("max_entries"))
+
+    def _open(self, path: str, max_entries: int | None) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._path = path
+        self._max_entries = max_entries if max_entries and max_entries > 0 else None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS validated ("
+            " schema TEXT NOT NULL,"
+            " record_hash TEXT NOT NULL,"
+            " fields TEXT NOT NULL,"
+            " PRIMARY KEY (schema, record_hash))"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(validated)")}
+        if "last_used" not in columns:
+            # Rows from before eviction existed are the first to go
+            self._conn.execute("ALTER TABLE validated ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS validated_last_used ON validated (last_used)")
+        self._conn.commit()
+        # Row count for eviction, counted once here and kept up to date by this instance's writes
+        self._count = len(self) if self._max_entries is not None else 0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM validated").fetchone()[0])
+
+    def get_many(self, schema: str, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        wanted = list(dict.fromkeys(keys))
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(wanted), 500):
+                part = wanted[i: i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT record_hash, fields FROM validated WHERE schema = ? AND record_hash IN ({marks})",
+                    [schema, *part],
+                ).fetchall()
+                for h, blob in rows:
+                    out[h] = json.loads(blob)
+            if out and self._max_entries is not None:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE validated SET last_used = ? WHERE schema = ? AND record_hash = ?",
+                    [(now, schema, h) for h in out],
+                )
+                self._conn.commit()
+        return out
+
+    def put_many(self, schema: str, records: Mapping[str, Dict[str, Any]]) -> None:
+        if not records:
+            return
+        now = time.time()
+        rows = [(schema, h, json.dumps(fields), now) for h, fields in records.items()]
+        with self._lock:
+            # Insert new keys first so the row count is known without a COUNT(*) over the table
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO validated (schema, record_hash, fields, last_used) VALUES (?, ?, ?, ?)", rows
+            ).rowcount
+            if inserted < len(rows):
+                self._conn.executemany(
+                    "UPDATE validated SET fields = ?, last_used = ? WHERE schema = ? AND record_hash = ?",
+                    [(fields, used, sc, h) for sc, h, fields, used in rows],
+                )
+            if self._max_entries is not None:
+                self._count += max(0, inserted)
+                self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        excess = self._count - int(self._max_entries or 0)
+        if excess <= 0:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM validated WHERE rowid IN"
+            " (SELECT rowid FROM validated ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        ).rowcount
+        self._count -= max(0, deleted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
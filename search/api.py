@@ -1,134 +1,33 @@
+from __future__ import annotations
+
+import argparse
 import json
-from typing import Any, Dict, List
+import os
+import socketserver
+import sys
+from itertools import tee
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, NoReturn, Tuple
 
-from chromadb.errors import InvalidArgumentError
-from openai import OpenAI
-from dotenv import load_dotenv
+from search.ports.user_vectors import Row
+from search.utils.load_data import build_parser, parse_args
 
-from search.adapters.chroma_user_vectors import ChromaUserVectors, get_or_create_collection
-from search.adapters.openai_embeddings import OpenAIEmbeddings
-from search.services.ingest_users import ingest
-from search.services.query_users import search as svc_search
-from search.utils.export_user_schema import export_user_schema
-from search.utils.load_data import parse_args
-from search.utils.load_env import load_env
+# Heavy modules (chromadb, openai, pydantic, dotenv) are imported only on the paths that
+# need them: every spawned query pays this module's import time before doing any work.
+if TYPE_CHECKING:
+    from search.session import SearchSession
 
+# Options fixed for the lifetime of a server; requests may not override them.
+_SERVER_ONLY = frozenset({"serve", "socket", "export_user_schema", "queries_file", "vacuum_orphans"})
 
-def main() -> None:
-    # Load environment variables from .env if present
-    load_dotenv()
-    args = parse_args()
 
-    # If only schema is requested, print and exit before any network/env requirements
-    if getattr(args, "export_user_schema", False):
-        export_user_schema()
-        return
+def _write_stdout(s: str) -> None:
+    sys.stdout.write(s)
+    sys.stdout.flush()
 
-    api_key, base_url = load_env()
-    client = OpenAI(base_url=base_url, api_key=api_key)
-    embeddings = OpenAIEmbeddings(client, args.model)
-    extra_meta = {
-        "index_chunks": bool(args.index_chunks),
-        "chunking_mode": getattr(args, "chunking_mode", "sentence"),
-        "sentences_per_chunk": int(args.sentences_per_chunk),
-        "sentence_overlap": int(args.sentence_overlap),
-        "tokens_per_chunk": int(getattr(args, "tokens_per_chunk", 200)),
-        "token_overlap": int(getattr(args, "token_overlap", 50)),
-    }
-
-    col = get_or_create_collection(
-        args.persist, args.collection, args.space, args.force_recreate, args.model, extra_meta
-    )
-    repo = ChromaUserVectors(col)
-    reindexed = False
-    # If metadata does not match requested chunking settings, recreate collection
-    try:
-        meta = repo.metadata or {}
-
-        def _as_bool(v: Any) -> bool:
-            if isinstance(v, bool):
-                return v
-            if isinstance(v, (int, float)):
-                return v != 0
-            if isinstance(v, str):
-                return v.strip().lower() in ("1", "true", "yes", "on")
-            return bool(v)
-
-        def _as_int(v: Any, default: int = 0) -> int:
-            try:
-                return int(v)
-            except Exception:
-                return default
-
-        mismatch = (
-            _as_bool(meta.get("index_chunks")) != bool(args.index_chunks)
-            or str(meta.get("chunking_mode") or "sentence").lower() != str(getattr(args, "chunking_mode", "sentence")).lower()
-            or _as_int(meta.get("sentences_per_chunk"), -1) != int(args.sentences_per_chunk)
-            or _as_int(meta.get("sentence_overlap"), -1) != int(args.sentence_overlap)
-            or _as_int(meta.get("tokens_per_chunk"), -1) != int(getattr(args, "tokens_per_chunk", 200))
-            or _as_int(meta.get("token_overlap"), -1) != int(getattr(args, "token_overlap", 50))
-        )
-        if mismatch and not args.force_recreate:
-            col = get_or_create_collection(
-                args.persist, args.collection, args.space, True, args.model, extra_meta
-            )
-            repo = ChromaUserVectors(col)
-            reindexed = True
-    except Exception:
-        pass
-    try:
-        ingest(
-            embeddings,
-            repo,
-            args.data,
-            args.normalize,
-            args.min_chars,
-            embed_model=args.model,
-            index_chunks=args.index_chunks,
-            sentences_per_chunk=args.sentences_per_chunk,
-            sentence_overlap=args.sentence_overlap,
-            chunking_mode=getattr(args, "chunking_mode", "sentence"),
-            tokens_per_chunk=getattr(args, "tokens_per_chunk", 200),
-            token_overlap=getattr(args, "token_overlap", 50),
-            verbose=False,
-        )
-    except InvalidArgumentError as e:
-        if "dimension" in str(e).lower():
-            col = get_or_create_collection(
-                args.persist, args.collection, args.space, True, args.model, extra_meta
-            )
-            repo = ChromaUserVectors(col)
-            ingest(
-                embeddings,
-                repo,
-                args.data,
-                args.normalize,
-                args.min_chars,
-                embed_model=args.model,
-                index_chunks=args.index_chunks,
-                sentences_per_chunk=args.sentences_per_chunk,
-                sentence_overlap=args.sentence_overlap,
-                chunking_mode=getattr(args, "chunking_mode", "sentence"),
-                tokens_per_chunk=getattr(args, "tokens_per_chunk", 200),
-                token_overlap=getattr(args, "token_overlap", 50),
-                verbose=False,
-            )
-            reindexed = True
-        else:
-            raise
-
-    rows, dists = svc_search(
-        embeddings,
-        repo,
-        args.query,
-        args.k,
-        phrase_prefilter=args.phrase_prefilter,
-        threshold=args.threshold,
-        normalize=args.normalize,
-        index_chunks=args.index_chunks,
-        chunk_query_multiplier=args.chunk_query_multiplier,
-    )
 
+def build_response(
+        args: argparse.Namespace, rows: List[Row], dists: List[float], repo: Any, reindexed: bool
+) -> Dict[str, Any]:
     result_rows: List[Dict[str, Any]] = []
     for rid, dist, _doc, meta in rows:
         m = meta or {}
@@ -145,7 +44,7 @@ def main() -> None:
         }
         result_rows.append(item)
 
-    out = {
+    return {
         "query": args.query,
         "k": args.k,
         "count": len(result_rows),
@@ -156,7 +55,158 @@ def main() -> None:
         "model": (repo.metadata or {}).get("model") if getattr(repo, "metadata", None) else None,
         "reindexed": reindexed,
     }
-    print(json.dumps(out))
+
+
+def run_query(session: SearchSession, args: argparse.Namespace) -> Dict[str, Any]:
+    repo, reindexed, _count = session.open_index(args)
+    rows, dists = session.search(repo, args)
+    return build_response(args, rows, dists, repo, reindexed)
+
+
+def read_queries(path: str) -> Iterator[Tuple[Any, str]]:
+    """Yield (id, query) from a JSONL file; lines are JSON strings or {"query": ..., "id": ...}."""
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                yield None, item
+            elif isinstance(item, dict) and isinstance(item.get("query"), str):
+                yield item.get("id"), item["query"]
+            else:
+                raise ValueError(f"{path}:{n}: expected a string or an object with a 'query' string")
+
+
+def run_batch(session: SearchSession, args: argparse.Namespace, write: Callable[[str], None]) -> None:
+    """Answer every query in --queries-file, streaming one JSON line per query in input order."""
+    repo, reindexed, _count = session.open_index(args)
+    for_ids, for_texts = tee(read_queries(args.queries_file))
+    results = session.search_many(repo, args, (q for _id, q in for_texts))
+    for (qid, q), (rows, dists) in zip(for_ids, results):
+        out = build_response(argparse.Namespace(**{**vars(args), "query": q}), rows, dists, repo, reindexed)
+        if qid is not None:
+            out["id"] = qid
+        write(json.dumps(out) + "\n")
+
+
+class _RequestParser(argparse.ArgumentParser):
+    """Reports bad request options as ValueError instead of printing usage and exiting."""
+
+    def error(self, message: str) -> NoReturn:
+        raise ValueError(message)
+
+
+def request_args(base: argparse.Namespace, payload: Dict[str, Any]) -> argparse.Namespace:
+    """Overlay one serve-mode request (CLI option names as keys) on the server's startup args."""
+    known = vars(base)
+    argv: List[str] = []
+    overrides: Dict[str, Any] = {}
+    for key, value in payload.items():
+        if key == "id":
+            continue
+        if key not in known or key in _SERVER_ONLY:
+            raise ValueError(f"Unknown request field: {key}")
+        flag = "--" + key.replace("_", "-")
+        if value is None or value is False:
+            # Clearing an option or switching off a flag enabled at startup
+            overrides[key] = value
+        elif value is True:
+            argv.append(flag)
+        else:
+            # One token, so values starting with "-" (queries, negative numbers) are not read as options
+            argv.append(f"{flag}={value}")
+    ns = argparse.Namespace(**known)
+    build_parser(_RequestParser).parse_args(argv, namespace=ns)
+    for key, value in overrides.items():
+        setattr(ns, key, value)
+    return ns
+
+
+def handle_request(session: SearchSession, base: argparse.Namespace, line: str) -> Dict[str, Any]:
+    req_id = None
+    try:
+        payload = json.loads(line)
+        if not isinstance(payload, dict):
+            raise ValueError("Request must be a JSON object")
+        req_id = payload.get("id")
+        out = run_query(session, request_args(base, payload))
+    except Exception as e:
+        out = {"error": str(e) or type(e).__name__}
+    if req_id is not None:
+        out["id"] = req_id
+    return out
+
+
+def serve_lines(
+        session: SearchSession, base: argparse.Namespace, lines: Iterable[str], write: Callable[[str], None]
+) -> None:
+    for line in lines:
+        if not line.strip():
+            continue
+        write(json.dumps(handle_request(session, base, line)) + "\n")
+
+
+def serve(args: argparse.Namespace) -> None:
+    from search.session import SearchSession
+
+    session = SearchSession()
+    if not args.socket:
+        serve_lines(session, args, sys.stdin, _write_stdout)
+        return
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            def write(s: str) -> None:
+                self.wfile.write(s.encode("utf-8"))
+                self.wfile.flush()
+
+            serve_lines(session, args, (raw.decode("utf-8") for raw in self.rfile), write)
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    with socketserver.ThreadingUnixStreamServer(args.socket, Handler) as server:
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(args.socket)
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env if present
+    load_dotenv()
+    args = parse_args()
+
+    # If only schema is requested, print and exit before any network/env requirements
+    if getattr(args, "export_user_schema", False):
+        from search.utils.export_user_schema import export_user_schema
+
+        export_user_schema()
+        return
+
+    if args.serve:
+        serve(args)
+        return
+
+    from search.session import SearchSession
+
+    if args.vacuum_orphans:
+        try:
+            repo, deleted = SearchSession().vacuum_orphans(args)
+        except LookupError as e:
+            print(json.dumps({"error": str(e)}))
+            raise SystemExit(1)
+        print(json.dumps({"collection": repo.name, "deleted": len(deleted)}))
+        return
+
+    if args.queries_file:
+        run_batch(SearchSession(), args, _write_stdout)
+        return
+
+    print(json.dumps(run_query(SearchSession(), args)))
 
 
 if __name__ == "__main__":
@@ -1,5 +1,8 @@
 __all__ = [
     "embeddings",
+    "embedding_store",
     "user_vectors",
+    "validated_cache",
+    "parent_store",
 ]
 
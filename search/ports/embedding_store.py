@@ -0,0 +1,12 @@
+from typing import Dict, Iterable, List, Mapping, Protocol
+
+
+class EmbeddingStore(Protocol):
+    """Port for vectors addressed by content: (embedding model, hash of the embedded text)."""
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the stored vectors for the hashes that are present."""
+        ...
+
+    def put_many(self, model: str, vectors: Mapping[str, List[float]]) -> None:
+        ...
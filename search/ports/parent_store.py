@@ -0,0 +1,19 @@
+from typing import Any, Dict, Iterable, Mapping, Protocol
+
+# {"description": str, "document": str, "metadata": {...}} per parent id
+ParentRecord = Dict[str, Any]
+
+
+class ParentStore(Protocol):
+    """Port for the parent (user) records that compact chunk records point to."""
+
+    def put_many(self, records: Mapping[str, ParentRecord]) -> None:
+        ...
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, ParentRecord]:
+        """Return the records for the ids that are present."""
+        ...
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """Remove records by parent id; unknown ids are ignored."""
+        ...
@@ -1,9 +1,17 @@
-from typing import Any, Dict, List, Protocol, Tuple
+from typing import Any, Dict, FrozenSet, Iterator, List, Protocol, Tuple
 
 from search.models.collection_item import CollectionItem
 
 Row = Tuple[str, float, str, Dict[str, Any]]
 
+# Query projection: the fields filled in besides id and distance. Fields left out come back
+# empty ("" document, {} metadata); embeddings are never part of a Row, fetch them with
+# `get_by_ids(include_embeddings=True)`.
+Projection = FrozenSet[str]
+IDS_ONLY: Projection = frozenset()
+WITH_METADATA: Projection = frozenset({"metadata"})
+WITH_DOCUMENTS: Projection = frozenset({"metadata", "documents"})
+
 
 class UserVectorRepository(Protocol):
     """Port for persisting and querying user vectors."""
@@ -18,12 +26,28 @@ class UserVectorRepository(Protocol):
         ...
 
     def query(
-        self, vector: List[float], k: int, where_document: str | None = None
+        self, vector: List[float], k: int, where_document: str | None = None,
+        include: Projection = WITH_DOCUMENTS,
     ) -> tuple[List[Row], List[float]]:
         ...
 
+    def query_many(
+        self, vectors: List[List[float]], k: int, where_document: str | None = None,
+        include: Projection = WITH_DOCUMENTS,
+    ) -> List[tuple[List[Row], List[float]]]:
+        """Batched `query`: one result pair per input vector, in order."""
+        ...
+
     def get_by_ids(
-        self, ids: List[str], include_embeddings: bool = False
+        self, ids: List[str], include_embeddings: bool = False, include_documents: bool = False
     ) -> Dict[str, CollectionItem]:
-        """Return mapping from id to stored data (embedding/metadata/document if available)."""
+        """Return mapping from id to stored data (metadata, plus embedding/document when asked)."""
+        ...
+
+    def delete(self, ids: List[str]) -> None:
+        """Remove records by id; unknown ids are ignored."""
+        ...
+
+    def iter_metadata(self, page_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (id, metadata) for every stored record, paging through the store."""
         ...
@@ -0,0 +1,12 @@
+from typing import Any, Dict, Iterable, Mapping, Protocol
+
+
+class ValidatedRecordCache(Protocol):
+    """Port for validated record fields addressed by (schema version, hash of the raw record)."""
+
+    def get_many(self, schema: str, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the cached fields for the keys that are present."""
+        ...
+
+    def put_many(self, schema: str, records: Mapping[str, Dict[str, Any]]) -> None:
+        ...
@@ -1,5 +1,8 @@
 __all__ = [
     "ingest_users",
+    "ingest_pipeline",
     "query_users",
+    "vacuum",
+    "validate_users",
 ]
 
@@ -0,0 +1,113 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Tuple
+
+from search.ports.embeddings import EmbeddingsProvider
+from search.ports.user_vectors import UserVectorRepository
+from search.services.ingest_strategies import IngestPayloads, IngestStrategy, PreparedWindow
+
+_DONE = object()
+
+
+def run_pipeline(
+        strategy: IngestStrategy,
+        embeddings: EmbeddingsProvider,
+        repo: UserVectorRepository,
+        windows: Iterable[IngestPayloads | PreparedWindow],
+        *,
+        embed_model: str | None,
+        verbose: bool = False,
+        depth: int = 2,
+        on_write: Callable[[int, List[str]], None] | None = None,
+) -> Tuple[int, List[str]]:
+    """
+    Run the strategy's prepare / embed / write stages on consecutive windows at once:
+    one thread reads and prepares windows, one embeds them, and the calling thread writes.
+    Stages hand windows over through queues of at most `depth` items, so memory stays
+    bounded and total time approaches that of the slowest stage. Windows are written in
+    order; the first error in any stage stops the pipeline and is re-raised here.
+    `windows` may already be prepared (e.g. by a process pool). `on_write` is called with
+    (parents, parent ids) after each window is written.
+    """
+    depth = max(1, int(depth))
+    prepared: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    embedded: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def put(q: "queue.Queue[Any]", item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q: "queue.Queue[Any]") -> Any:
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return _DONE
+
+    def fail(e: BaseException) -> None:
+        errors.append(e)
+        stop.set()
+
+    def prepare_stage() -> None:
+        try:
+            for window in windows:
+                if isinstance(window, IngestPayloads):
+                    window = strategy.prepare(window, embed_model=embed_model)
+                if not put(prepared, window):
+                    return
+        except BaseException as e:
+            fail(e)
+        finally:
+            put(prepared, _DONE)
+
+    def embed_stage() -> None:
+        try:
+            while True:
+                window = get(prepared)
+                if window is _DONE:
+                    return
+                if not put(embedded, strategy.embed(embeddings, repo, window, embed_model=embed_model, verbose=verbose)):
+                    return
+        except BaseException as e:
+            fail(e)
+        finally:
+            put(embedded, _DONE)
+
+    # Start the shared clock before the stages touch the counters
+    _ = strategy.progress
+    threads = [
+        threading.Thread(target=prepare_stage, name="ingest-prepare", daemon=True),
+        threading.Thread(target=embed_stage, name="ingest-embed", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    count = 0
+    ingested: List[str] = []
+    try:
+        while not stop.is_set():
+            window = get(embedded)
+            if window is _DONE:
+                break
+            n, ids = strategy.write(repo, window, verbose=verbose)
+            count += n
+            ingested.extend(ids)
+            if on_write is not None:
+                on_write(n, ids)
+    except BaseException as e:
+        fail(e)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    return count, ingested
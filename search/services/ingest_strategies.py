@@ -1,20 +1,30 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+import json
 from typing import Any, Dict, List, Mapping, Sequence, Tuple, Callable
 import re
+import threading
+import time
 
+from search.ports.embedding_store import EmbeddingStore
 from search.ports.embeddings import EmbeddingsProvider
+from search.ports.parent_store import ParentRecord, ParentStore
 from search.ports.user_vectors import UserVectorRepository
 from search.utils.ingest import (
     normalize_text,
     hash_text,
     coerce_embedding,
-    batched,
+    batched_by_tokens,
     safe_join_fields,
 )
 
 
+def chunk_parent_id(record_id: str) -> str:
+    """Parent id encoded in a chunk record id (`<parent>#<prefix><index>`, see `_chunk_id`)."""
+    return record_id.rsplit("#", 1)[0]
+
+
 @dataclass
 class IngestPayloads:
     ids: List[str]
@@ -32,9 +42,69 @@ class IngestPayloads:
             )
 
 
+@dataclass
+class IngestProgress:
+    """Cumulative ingest counters, reported after every write."""
+    parents: int = 0
+    records: int = 0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+ProgressCallback = Callable[[IngestProgress], None]
+
+
+@dataclass
+class PreparedWindow:
+    """Records built from one payload window, completed stage by stage (see IngestStrategy)."""
+    parent_ids: List[str]
+    ids: List[str]
+    documents: List[str]
+    texts: List[str]
+    metadatas: List[Dict[str, Any]]
+    # Records built per parent (chunked strategies)
+    chunk_counts: Dict[str, int] = field(default_factory=dict)
+    vectors: List[List[float]] | None = None
+    stale_ids: List[str] = field(default_factory=list)
+    # Parent records for the parent store (compact chunked layout)
+    parents: Dict[str, ParentRecord] = field(default_factory=dict)
+
+    def select(self, keep: Sequence[int]) -> "PreparedWindow":
+        """Copy restricted to the records at `keep` (parents and stale ids are kept)."""
+        return replace(
+            self,
+            ids=[self.ids[i] for i in keep],
+            documents=[self.documents[i] for i in keep],
+            texts=[self.texts[i] for i in keep],
+            metadatas=[self.metadatas[i] for i in keep],
+            vectors=[self.vectors[i] for i in keep] if self.vectors is not None else None,
+        )
+
+
 # ---- Strategy API --------------------------------------------------------------
 
 class IngestStrategy:
+    """
+    Ingests a payload window in three stages: `prepare` builds records (CPU only), `embed`
+    reads the repository and obtains vectors, `write` upserts and deletes. `run` chains them
+    for one window; the ingest pipeline overlaps them across consecutive windows.
+    """
+
+    embed_batch_size: int | None = None
+    embed_max_tokens: int | None = None
+    embedding_store: EmbeddingStore | None = None
+    # Diff against stored records: write only added/changed ones
+    incremental: bool = False
+    progress_callback: ProgressCallback | None = None
+    _progress: IngestProgress | None = None
+    _started: float = 0.0
+    _progress_lock = threading.Lock()
+
     def run(
             self,
             embeddings: EmbeddingsProvider,
@@ -44,8 +114,136 @@ class IngestStrategy:
             embed_model: str | None,
             verbose: bool = False,
     ) -> Tuple[int, List[str]]:
+        window = self.prepare(payloads, embed_model=embed_model)
+        window = self.embed(embeddings, repo, window, embed_model=embed_model, verbose=verbose)
+        return self.write(repo, window, verbose=verbose)
+
+    def prepare(self, payloads: IngestPayloads, *, embed_model: str | None) -> PreparedWindow:
         raise NotImplementedError
 
+    def embed(
+            self,
+            embeddings: EmbeddingsProvider,
+            repo: UserVectorRepository,
+            window: PreparedWindow,
+            *,
+            embed_model: str | None,
+            verbose: bool = False,
+    ) -> PreparedWindow:
+        """Attach vectors (reusing where possible); incremental mode drops unchanged records."""
+        progress = self.progress
+        t0 = time.perf_counter()
+        window.stale_ids = self._stale_ids(repo, window)
+        if self.incremental and window.ids:
+            keep = _changed_indices(window.ids, window.metadatas, repo, verbose=verbose)
+            if len(keep) < len(window.ids):
+                window = window.select(keep)
+        if window.ids:
+            window.vectors = _reuse_or_compute_embeddings(
+                ids=window.ids,
+                texts=window.texts,
+                metadatas=window.metadatas,
+                repo=repo,
+                embeddings=embeddings,
+                embed_model=embed_model,
+                verbose=verbose,
+                batch_size=self.embed_batch_size,
+                store=self.embedding_store,
+                max_tokens=self.embed_max_tokens,
+            )
+        else:
+            window.vectors = []
+        progress.embed_seconds += time.perf_counter() - t0
+        return window
+
+    def write(
+            self, repo: UserVectorRepository, window: PreparedWindow, *, verbose: bool = False
+    ) -> Tuple[int, List[str]]:
+        """Upsert embedded records and delete stale ones; returns (parents, parent ids)."""
+        if window.vectors is None:
+            raise ValueError("PreparedWindow has no vectors; call embed() before write()")
+        t0 = time.perf_counter()
+        if window.ids:
+            repo.upsert(window.ids, window.documents, window.vectors, window.metadatas)
+        if window.stale_ids:
+            repo.delete(window.stale_ids)
+            if verbose:
+                print(f"Purged stale chunks: {len(window.stale_ids)}")
+        self.progress.write_seconds += time.perf_counter() - t0
+        self._report(len(window.parent_ids), len(window.ids))
+        return len(window.parent_ids), list(window.parent_ids)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Copies sent to worker processes only run `prepare`: drop stores, callbacks and counters
+        state = dict(self.__dict__)
+        for key in ("embedding_store", "parent_store", "progress_callback", "_progress", "_started"):
+            state.pop(key, None)
+        return state
+
+    def _stale_ids(self, repo: UserVectorRepository, window: PreparedWindow) -> List[str]:
+        """Stored records of the window's parents that the new records no longer cover."""
+        return []
+
+    @property
+    def progress(self) -> IngestProgress:
+        """Counters accumulated over every window ingested by this strategy instance."""
+        with self._progress_lock:
+            if self._progress is None:
+                self._progress = IngestProgress()
+                self._started = time.perf_counter()
+            return self._progress
+
+    def _report(self, parents: int, records: int) -> None:
+        progress = self.progress
+        progress.parents += parents
+        progress.records += records
+        progress.elapsed_seconds = time.perf_counter() - self._started
+        if self.progress_callback is not None:
+            self.progress_callback(progress)
+
+
+def format_progress(p: IngestProgress) -> str:
+    return (
+        f"Ingest progress: parents={p.parents}, records={p.records}, rate={p.records_per_second:.1f} rec/s, "
+        f"embed={p.embed_seconds:.2f}s, write={p.write_seconds:.2f}s, elapsed={p.elapsed_seconds:.2f}s"
+    )
+
+
+# ---- Incremental diff ----------------------------------------------------------
+
+def _comparable(meta: Mapping[str, Any] | None) -> Dict[str, Any]:
+    # Stores may drop None-valued keys; ignore them on both sides
+    return {k: v for k, v in (meta or {}).items() if v is not None}
+
+
+def _changed_indices(
+        ids: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+        repo: UserVectorRepository,
+        *,
+        verbose: bool = False,
+) -> List[int]:
+    """
+    Indices of records that are new or whose stored metadata differs. Metadata carries
+    embed_hash and every field the document is built from, so equal metadata means an
+    identical record and the write can be skipped.
+    """
+    existing: Mapping[str, Dict[str, Any]] = repo.get_by_ids(list(ids)) or {}
+    changed: List[int] = []
+    added = 0
+    for i, rid in enumerate(ids):
+        item = existing.get(rid)
+        if not item:
+            added += 1
+            changed.append(i)
+        elif _comparable(item.get("metadata")) != _comparable(metadatas[i]):
+            changed.append(i)
+    if verbose:
+        print(
+            f"Incremental: added={added}, changed={len(changed) - added}, "
+            f"unchanged={len(ids) - len(changed)}")
+    return changed
+
 
 # ---- Shared core for reuse/compute ---------------------------------------------
 
@@ -59,11 +257,16 @@ def _reuse_or_compute_embeddings(
         embed_model: str | None,
         verbose: bool,
         batch_size: int | None = None,
+        store: EmbeddingStore | None = None,
+        max_tokens: int | None = None,
 ) -> List[List[float]]:
     """
     For each id/text/metadata:
       - Try to reuse stored embedding if (hash + model) match.
-      - Otherwise compute with provider (optionally in batches).
+      - Else look it up by (model, hash) in the content-addressed `store`, if given.
+      - Otherwise compute with provider and remember it in `store`. Texts sharing an
+        embed_hash are embedded once. With `batch_size` and/or `max_tokens`, requests are
+        packed to at most that many texts / estimated tokens.
     Returns embeddings aligned with `ids`.
     """
     if not (len(ids) == len(texts) == len(metadatas)):
@@ -102,32 +305,83 @@ def _reuse_or_compute_embeddings(
                 elif not ok_model:
                     reasons.append(f"{rid}: model changed")
 
-    # Compute missing
-    if to_compute_idx:
-        texts_to_compute = [texts[i] for i in to_compute_idx]
-        if batch_size and batch_size > 0:
-            cursor = 0
-            for batch in batched(texts_to_compute, batch_size):
-                new_vecs = embeddings.embed_texts(list(batch))
-                for j, vec in enumerate(new_vecs):
-                    vectors[to_compute_idx[cursor + j]] = list(vec)
-                cursor += len(batch)
+    # Identical texts share one key (embed_hash); used for the store and to embed each text once
+    key_of: Dict[int, str] = {i: metadatas[i].get("embed_hash") or hash_text(texts[i]) for i in to_compute_idx}
+
+    # Content-addressed store: vectors survive collection recreation and id changes
+    from_store: List[int] = []
+    if store is not None and embed_model is not None and to_compute_idx:
+        stored = store.get_many(embed_model, [key_of[i] for i in to_compute_idx])
+        still_missing: List[int] = []
+        for i in to_compute_idx:
+            vec = stored.get(key_of[i])
+            if vec:
+                vectors[i] = list(vec)
+                from_store.append(i)
+            else:
+                still_missing.append(i)
+        to_compute_idx = still_missing
+
+    # Compute missing: one representative per distinct text, fanned back out to every id
+    requests = 0
+    representatives: Dict[str, int] = {}
+
+    def compute(indices: List[int]) -> None:
+        nonlocal requests
+        wanted: Dict[str, int] = {}
+        for i in indices:
+            wanted.setdefault(key_of[i], i)
+        if not wanted:
+            return
+        representatives.update(wanted)
+        texts_to_compute = [texts[i] for i in wanted.values()]
+        if (batch_size and batch_size > 0) or (max_tokens and max_tokens > 0):
+            # Pack requests by estimated tokens (and item count); the provider may run them concurrently
+            batches = [list(b) for b in batched_by_tokens(texts_to_compute, max_tokens or 0, batch_size or 0)]
+            new_vecs = [vec for vecs in _embed_batches(embeddings, batches) for vec in vecs]
+            requests += len(batches)
         else:
             new_vecs = embeddings.embed_texts(texts_to_compute)
-            for j, i in enumerate(to_compute_idx):
-                vectors[i] = list(new_vecs[j])
+            requests += 1
+        by_key = {key: list(vec) for key, vec in zip(wanted, new_vecs)}
+        for i in indices:
+            vectors[i] = list(by_key[key_of[i]])
+        if store is not None and embed_model is not None:
+            store.put_many(embed_model, by_key)
+
+    compute(to_compute_idx)
+    if to_compute_idx and from_store:
+        # Stored vectors of another dimension were computed before the model behind this name
+        # changed; replace them (and their store entries) with the provider's current output
+        dim = len(vectors[to_compute_idx[0]])
+        stale = [i for i in from_store if len(vectors[i]) != dim]
+        if stale:
+            from_store = [i for i in from_store if len(vectors[i]) == dim]
+            compute(stale)
+            to_compute_idx = to_compute_idx + stale
 
     if verbose:
-        reused_count = sum(1 for v in vectors if v)
         computed_count = len(to_compute_idx)
+        reused_count = sum(1 for v in vectors if v) - computed_count - len(from_store)
+        dedup_ratio = computed_count / len(representatives) if representatives else 1.0
         print(
-            f"Embeddings reuse: found={len(existing)}, reused={reused_count}, computed={computed_count}, total={len(ids)}")
+            f"Embeddings reuse: found={len(existing)}, reused={reused_count}, from_store={len(from_store)}, "
+            f"computed={computed_count}, total={len(ids)}, requests={requests}")
+        print(
+            f"Embeddings dedup: texts={computed_count}, unique={len(representatives)}, ratio={dedup_ratio:.2f}x")
         for line in reasons:
             print(f"  {line}")
 
     return vectors
 
 
+def _embed_batches(embeddings: EmbeddingsProvider, batches: List[List[str]]) -> List[List[List[float]]]:
+    embed_batches = getattr(embeddings, "embed_batches", None)
+    if embed_batches is not None:
+        return embed_batches(batches)
+    return [embeddings.embed_texts(b) for b in batches]
+
+
 # ---- Whole-document strategy ---------------------------------------------------
 
 class WholeDocStrategy(IngestStrategy):
@@ -136,18 +390,22 @@ class WholeDocStrategy(IngestStrategy):
     Upserts `documents` as provided, with vectors aligned to `ids`.
     """
 
-    def __init__(self, *, embed_batch_size: int | None = None) -> None:
-        self.embed_batch_size = embed_batch_size
-
-    def run(
+    def __init__(
             self,
-            embeddings: EmbeddingsProvider,
-            repo: UserVectorRepository,
-            payloads: IngestPayloads,
             *,
-            embed_model: str | None,
-            verbose: bool = False,
-    ) -> Tuple[int, List[str]]:
+            embed_batch_size: int | None = None,
+            embed_max_tokens: int | None = None,
+            embedding_store: EmbeddingStore | None = None,
+            incremental: bool = False,
+            progress_callback: ProgressCallback | None = None,
+    ) -> None:
+        self.embed_batch_size = embed_batch_size
+        self.embed_max_tokens = embed_max_tokens
+        self.embedding_store = embedding_store
+        self.incremental = incremental
+        self.progress_callback = progress_callback
+
+    def prepare(self, payloads: IngestPayloads, *, embed_model: str | None) -> PreparedWindow:
         ids = payloads.ids
         descriptions = payloads.descriptions
         documents = payloads.documents
@@ -162,55 +420,64 @@ class WholeDocStrategy(IngestStrategy):
             # Add full description as chunk_text for consistency with chunked strategy
             m["chunk_text"] = descriptions[i]
 
-        vectors = _reuse_or_compute_embeddings(
-            ids=ids,
-            texts=descriptions,
-            metadatas=metadatas,
-            repo=repo,
-            embeddings=embeddings,
-            embed_model=embed_model,
-            verbose=verbose,
-            batch_size=self.embed_batch_size,
+        return PreparedWindow(
+            parent_ids=list(ids), ids=list(ids), documents=list(documents),
+            texts=list(descriptions), metadatas=list(metadatas),
         )
 
-        repo.upsert(ids, documents, vectors, metadatas)
-        return len(ids), list(ids)
-
 
 # ---- Base chunking strategy ----------------------------------------------------
 
+# (chunk text, start, end): the chunk embedded and the span of the description it covers
+ChunkSpan = Tuple[str, int, int]
+
+
 class _BaseChunkedStrategy(IngestStrategy):
     """
     Reusable core for chunk-based ingestion strategies.
     Subclasses must supply `chunker` and `chunk_kind`.
+    With `compact`, chunk records carry only their own fields plus (parent_id, chunk_start,
+    chunk_end); parent fields and the description are written once per parent to
+    `parent_store` and joined back onto the final results at query time.
     """
 
     chunk_kind: str = "sentence"  # override in subclass
     id_prefix: str = "c"  # "c" for sentence chunks, "t" for token chunks
+    compact: bool = False
+    parent_store: ParentStore | None = None
 
     def __init__(
             self,
             *,
-            chunker: Callable[[str], List[str]],
+            chunker: Callable[[str], List[ChunkSpan]],
             embed_batch_size: int | None = None,
+            embed_max_tokens: int | None = None,
+            embedding_store: EmbeddingStore | None = None,
+            incremental: bool = False,
+            progress_callback: ProgressCallback | None = None,
             enrich_parent_fields: Sequence[str] = ("first_name", "last_name", "email", "phone", "phone_digits"),
+            compact: bool = False,
+            parent_store: ParentStore | None = None,
     ) -> None:
         self._chunker = chunker
         self.embed_batch_size = embed_batch_size
+        self.embed_max_tokens = embed_max_tokens
+        self.embedding_store = embedding_store
+        self.incremental = incremental
+        self.progress_callback = progress_callback
         self._enrich_fields = tuple(enrich_parent_fields)
+        self.compact = compact
+        self.parent_store = parent_store
 
-    def run(
-            self,
-            embeddings: EmbeddingsProvider,
-            repo: UserVectorRepository,
-            payloads: IngestPayloads,
-            *,
-            embed_model: str | None,
-            verbose: bool = False,
-    ) -> Tuple[int, List[str]]:
+    def _chunk_id(self, rid: str, index: int) -> str:
+        return f"{rid}#{self.id_prefix}{index:04d}"
+
+    def prepare(self, payloads: IngestPayloads, *, embed_model: str | None) -> PreparedWindow:
         ids = payloads.ids
         descriptions = payloads.descriptions
         metadatas = payloads.metadatas
+        new_counts: Dict[str, int] = {}
+        parents: Dict[str, ParentRecord] = {}
 
         # Build per-chunk records
         all_ids: List[str] = []
@@ -220,28 +487,38 @@ class _BaseChunkedStrategy(IngestStrategy):
 
         for i, rid in enumerate(ids):
             desc = descriptions[i]
-            chunks = self._chunker(desc) or [desc]
+            chunks = self._chunker(desc) or [(desc, 0, len(desc))]
             total = len(chunks)
+            new_counts[rid] = total
 
-            # Pre-resolve enrichment fields from parent metadata (avoid repeated dict lookups)
             parent_meta = metadatas[i]
-            enrich_values = [normalize_text(str(parent_meta.get(k, ""))) for k in self._enrich_fields]
-            enrich_tail = safe_join_fields(rid, *enrich_values)
-
-            for ci, chunk in enumerate(chunks):
-                cid = f"{rid}#{self.id_prefix}{ci:04d}"
-
-                # Document content = chunk + (optionally) enrichment tail.
-                # Keeping your behavior but safer: only append if non-empty.
-                doc = safe_join_fields(chunk, enrich_tail)
-
-                meta = dict(parent_meta)
+            if self.compact:
+                parents[rid] = {"description": desc, "document": payloads.documents[i], "metadata": parent_meta}
+                # Chunks no longer carry parent fields; this makes a parent-only change visible to the diff
+                parent_hash = hash_text(json.dumps(parents[rid], sort_keys=True, default=str))
+            else:
+                # Pre-resolve enrichment fields from parent metadata (avoid repeated dict lookups)
+                enrich_values = [normalize_text(str(parent_meta.get(k, ""))) for k in self._enrich_fields]
+                enrich_tail = safe_join_fields(rid, *enrich_values)
+
+            for ci, (chunk, start, end) in enumerate(chunks):
+                cid = self._chunk_id(rid, ci)
+
+                if self.compact:
+                    # The document is the chunk alone: it is what where_document prefilters match
+                    doc = chunk
+                    meta: Dict[str, Any] = {"chunk_start": start, "chunk_end": end, "parent_hash": parent_hash}
+                else:
+                    # Document content = chunk + (optionally) enrichment tail.
+                    # Keeping your behavior but safer: only append if non-empty.
+                    doc = safe_join_fields(chunk, enrich_tail)
+                    meta = dict(parent_meta)
+                    meta["chunk_text"] = chunk
                 if embed_model is not None:
                     meta["embed_model"] = embed_model
                 meta["parent_id"] = rid
                 meta["chunk_index"] = ci
                 meta["chunk_count"] = total
-                meta["chunk_text"] = chunk
                 meta["chunk_kind"] = self.chunk_kind
                 meta["embed_hash"] = hash_text(chunk)
 
@@ -250,91 +527,130 @@ class _BaseChunkedStrategy(IngestStrategy):
                 all_metas.append(meta)
                 chunk_texts.append(chunk)
 
-        vectors = _reuse_or_compute_embeddings(
-            ids=all_ids,
-            texts=chunk_texts,
-            metadatas=all_metas,
-            repo=repo,
-            embeddings=embeddings,
-            embed_model=embed_model,
-            verbose=verbose,
-            batch_size=self.embed_batch_size,
+        return PreparedWindow(
+            parent_ids=list(ids), ids=all_ids, documents=all_docs, texts=chunk_texts,
+            metadatas=all_metas, chunk_counts=new_counts, parents=parents,
         )
 
-        repo.upsert(all_ids, all_docs, vectors, all_metas)
-
+    def _stale_ids(self, repo: UserVectorRepository, window: PreparedWindow) -> List[str]:
+        # Previous chunk counts come from each parent's first chunk; read before writing, since a
+        # shorter description leaves higher-numbered chunks behind that must be purged
+        first_ids = {self._chunk_id(rid, 0): rid for rid in window.parent_ids}
+        previous = repo.get_by_ids(list(first_ids)) or {}
+        stale: List[str] = []
+        for first_id, item in previous.items():
+            rid = first_ids.get(first_id)
+            old_count = (item.get("metadata") or {}).get("chunk_count") if isinstance(item, dict) else None
+            if rid is None or not isinstance(old_count, int):
+                continue
+            stale.extend(self._chunk_id(rid, ci) for ci in range(window.chunk_counts.get(rid, 0), old_count))
+        return stale
+
+    def write(
+            self, repo: UserVectorRepository, window: PreparedWindow, *, verbose: bool = False
+    ) -> Tuple[int, List[str]]:
+        if self.compact:
+            if self.parent_store is None:
+                raise ValueError("compact chunk records need a parent_store")
+            # Parents first, so no stored chunk ever points at a missing parent
+            self.parent_store.put_many(window.parents)
+        out = super().write(repo, window, verbose=verbose)
         if verbose:
-            print(f"Indexed {self.chunk_kind}-chunks: records={len(all_ids)} from parents={len(ids)}")
-        return len(ids), list(ids)
+            built = sum(window.chunk_counts.values())
+            print(f"Indexed {self.chunk_kind}-chunks: records={built} from parents={len(window.parent_ids)}")
+        return out
+
+
+def _group_spans(s: str, spans: List[Tuple[int, int]], per: int, overlap: int) -> List[ChunkSpan]:
+    """Sliding windows of `per` units (overlapping by `overlap`), joined by single spaces."""
+    step = max(1, per - overlap)
+    out: List[ChunkSpan] = []
+    i = 0
+    n = len(spans)
+    while i < n:
+        group = spans[i: i + per]
+        out.append((" ".join(s[a:b] for a, b in group).strip(), group[0][0], group[-1][1]))
+        if i + per >= n:
+            break
+        i += step
+    return out
 
 
 # ---- Sentence-chunk strategy ---------------------------------------------------
 
 class ChunkedStrategy(_BaseChunkedStrategy):
     def __init__(self, sentences_per_chunk: int = 3, sentence_overlap: int = 1, *,
-                 embed_batch_size: int | None = None) -> None:
+                 embed_batch_size: int | None = None, embed_max_tokens: int | None = None,
+                 embedding_store: EmbeddingStore | None = None, incremental: bool = False,
+                 progress_callback: ProgressCallback | None = None, compact: bool = False,
+                 parent_store: ParentStore | None = None) -> None:
         self.sentences_per_chunk = max(1, sentences_per_chunk)
         self.sentence_overlap = max(0, sentence_overlap)
-        super().__init__(chunker=self._chunk_text_sentences, embed_batch_size=embed_batch_size)
+        super().__init__(chunker=self._chunk_spans_sentences, embed_batch_size=embed_batch_size,
+                         embed_max_tokens=embed_max_tokens, embedding_store=embedding_store,
+                         incremental=incremental, progress_callback=progress_callback,
+                         compact=compact, parent_store=parent_store)
         self.chunk_kind = "sentence"
         self.id_prefix = "c"
 
     def _chunk_text_sentences(self, s: str) -> List[str]:
-        sents = self._split_sentences(s)
-        if not sents:
-            return [s]
-        per = self.sentences_per_chunk
-        ov = self.sentence_overlap
-        step = max(1, per - ov)
-        out: List[str] = []
-        i = 0
-        n = len(sents)
-        while i < n:
-            chunk_sents = sents[i: i + per]
-            out.append(" ".join(chunk_sents).strip())
-            if i + per >= n:
-                break
-            i += step
-        return out
+        return [chunk for chunk, _, _ in self._chunk_spans_sentences(s)]
+
+    def _chunk_spans_sentences(self, s: str) -> List[ChunkSpan]:
+        spans = self._sentence_spans(s)
+        if not spans:
+            return [(s, 0, len(s))]
+        return _group_spans(s, spans, self.sentences_per_chunk, self.sentence_overlap)
 
     @staticmethod
     def _split_sentences(s: str) -> List[str]:
         """Naive sentence splitter on punctuation (., !, ?). Keeps punctuation attached."""
-        s = s.strip()
-        if not s:
-            return []
-        parts = re.split(r"(?<=[.!?])\s+", s)
-        return [p.strip() for p in parts if p and p.strip()]
+        return [s[a:b] for a, b in ChunkedStrategy._sentence_spans(s)]
+
+    @staticmethod
+    def _sentence_spans(s: str) -> List[Tuple[int, int]]:
+        """(start, end) of each sentence in `s`, surrounding whitespace excluded."""
+        bounds: List[Tuple[int, int]] = []
+        start = 0
+        for m in re.finditer(r"(?<=[.!?])\s+", s):
+            bounds.append((start, m.start()))
+            start = m.end()
+        bounds.append((start, len(s)))
+        spans: List[Tuple[int, int]] = []
+        for a, b in bounds:
+            part = s[a:b]
+            stripped = part.strip()
+            if stripped:
+                lead = len(part) - len(part.lstrip())
+                spans.append((a + lead, a + lead + len(stripped)))
+        return spans
 
 
 # ---- Token-chunk strategy ------------------------------------------------------
 
 class TokenChunkStrategy(_BaseChunkedStrategy):
     def __init__(self, tokens_per_chunk: int = 200, token_overlap: int = 50, *,
-                 embed_batch_size: int | None = None) -> None:
+                 embed_batch_size: int | None = None, embed_max_tokens: int | None = None,
+                 embedding_store: EmbeddingStore | None = None, incremental: bool = False,
+                 progress_callback: ProgressCallback | None = None, compact: bool = False,
+                 parent_store: ParentStore | None = None) -> None:
         self.tokens_per_chunk = max(1, tokens_per_chunk)
         self.token_overlap = max(0, token_overlap)
-        super().__init__(chunker=self._chunk_text_tokens, embed_batch_size=embed_batch_size)
+        super().__init__(chunker=self._chunk_spans_tokens, embed_batch_size=embed_batch_size,
+                         embed_max_tokens=embed_max_tokens, embedding_store=embedding_store,
+                         incremental=incremental, progress_callback=progress_callback,
+                         compact=compact, parent_store=parent_store)
         self.chunk_kind = "token"
         self.id_prefix = "t"
 
     def _chunk_text_tokens(self, s: str) -> List[str]:
-        toks = self._tokenize(s)
-        if not toks:
-            return [s]
-        per = self.tokens_per_chunk
-        ov = self.token_overlap
-        step = max(1, per - ov)
-        out: List[str] = []
-        i = 0
-        n = len(toks)
-        while i < n:
-            chunk_toks = toks[i: i + per]
-            out.append(" ".join(chunk_toks).strip())
-            if i + per >= n:
-                break
-            i += step
-        return out
+        return [chunk for chunk, _, _ in self._chunk_spans_tokens(s)]
+
+    def _chunk_spans_tokens(self, s: str) -> List[ChunkSpan]:
+        spans = [m.span() for m in re.finditer(r"\w+|[^\w\s]", s or "")]
+        if not spans:
+            return [(s, 0, len(s))]
+        return _group_spans(s, spans, self.tokens_per_chunk, self.token_overlap)
 
     @staticmethod
     def _tokenize(s: str) -> List[str]:
@@ -1,21 +1,75 @@
-from typing import Any, Dict, List, Tuple
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Set, Tuple
 import hashlib
 
-from search.models.user import User
+from search.ports.embedding_store import EmbeddingStore
 from search.ports.embeddings import EmbeddingsProvider
+from search.ports.parent_store import ParentStore
 from search.ports.user_vectors import UserVectorRepository
+from search.ports.validated_cache import ValidatedRecordCache
 from search.utils.ingest import normalize_text
-from search.utils.load_data import load_json
+from search.utils.ingest_checkpoint import IngestCheckpoint
+from search.utils.load_data import iter_json_records
 from search.utils.map_data import normalize_phone_for_search
+from search.services.ingest_pipeline import run_pipeline
+from search.services.validate_users import UserValidator
 from search.services.ingest_strategies import (
     IngestPayloads,
     IngestStrategy,
+    PreparedWindow,
+    ProgressCallback,
     WholeDocStrategy,
     ChunkedStrategy,
     TokenChunkStrategy,
 )
 
 
+PayloadRow = Tuple[str, str, str, Dict[str, Any]]
+
+
+def _payload_rows(
+    data_path: str,
+    normalize: bool,
+    min_chars: int,
+    strict: bool = False,
+    validator: UserValidator | None = None,
+) -> Iterator[PayloadRow]:
+    """(id, description, document, metadata) per usable record, streamed from `data_path`."""
+    return _rows_from_records(iter_json_records(data_path, strict=strict), normalize, min_chars, validator)
+
+
+def _rows_from_records(
+    records: Iterable[Dict[str, Any]],
+    normalize: bool,
+    min_chars: int,
+    validator: UserValidator | None = None,
+) -> Iterator[PayloadRow]:
+    validator = validator or UserValidator()
+    for raw, user in validator.validate(records):
+        desc = user["description"]
+        if normalize:
+            desc = normalize_text(desc).lower()
+        if not desc or len(desc.strip()) < min_chars:
+            continue
+        phone_display = user["phone"]
+        phone_digits = normalize_phone_for_search(raw.get("phone", "") or phone_display)
+        embed_hash = hashlib.sha256((desc or "").encode("utf-8")).hexdigest()
+        meta = {
+            "first_name": user["first_name"],
+            "last_name": user["last_name"],
+            "email": user["email"],
+            "phone": phone_display,
+            "phone_digits": phone_digits,
+            # Used to decide whether to reuse an existing embedding
+            "embed_hash": embed_hash,
+        }
+        document = (
+            f"{desc} {user['username']} {user['first_name']} {user['last_name']} {user['email']} "
+            f"{phone_display} {phone_digits}"
+        )
+        yield user["username"], desc, document, meta
+
+
 def build_payloads(
     data_path: str, normalize: bool = False, min_chars: int = 0
 ) -> Tuple[List[str], List[str], List[str], List[Dict[str, Any]]]:
@@ -23,35 +77,43 @@ def build_payloads(
     descriptions: List[str] = []
     documents: List[str] = []
     metadatas: List[Dict[str, Any]] = []
-    for raw in load_json(data_path):
-        user = User(**raw)
-        desc = user.description
-        if normalize:
-            desc = normalize_text(desc).lower()
-        if not desc or len(desc.strip()) < min_chars:
-            continue
-        ids.append(user.username)
+    for rid, desc, doc, meta in _payload_rows(data_path, normalize, min_chars):
+        ids.append(rid)
         descriptions.append(desc)
-        phone_display = str(user.phone or "")
-        phone_digits = normalize_phone_for_search(raw.get("phone", "") or phone_display)
-        embed_hash = hashlib.sha256((desc or "").encode("utf-8")).hexdigest()
-        metadatas.append(
-            {
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "email": user.email,
-                "phone": phone_display,
-                "phone_digits": phone_digits,
-                # Used to decide whether to reuse an existing embedding
-                "embed_hash": embed_hash,
-            }
-        )
-        documents.append(
-            f"{desc} {user.username} {user.first_name} {user.last_name} {user.email} {phone_display} {phone_digits}"
-        )
+        documents.append(doc)
+        metadatas.append(meta)
     return ids, descriptions, documents, metadatas
 
 
+def iter_payloads(
+    data_path: str,
+    normalize: bool = False,
+    min_chars: int = 0,
+    window_size: int = 2048,
+    strict: bool = False,
+    validator: UserValidator | None = None,
+) -> Iterator[IngestPayloads]:
+    """Stream the dataset as IngestPayloads windows of at most `window_size` records."""
+    window_size = max(1, int(window_size))
+    rows: List[PayloadRow] = []
+    for row in _payload_rows(data_path, normalize, min_chars, strict, validator):
+        rows.append(row)
+        if len(rows) >= window_size:
+            yield _to_payloads(rows)
+            rows = []
+    if rows:
+        yield _to_payloads(rows)
+
+
+def _to_payloads(rows: List[PayloadRow]) -> IngestPayloads:
+    return IngestPayloads(
+        ids=[r[0] for r in rows],
+        descriptions=[r[1] for r in rows],
+        documents=[r[2] for r in rows],
+        metadatas=[r[3] for r in rows],
+    )
+
+
 def ingest(
     embeddings: EmbeddingsProvider,
     repo: UserVectorRepository,
@@ -66,25 +128,209 @@ def ingest(
     tokens_per_chunk: int = 200,
     token_overlap: int = 50,
     verbose: bool = False,
+    embedding_store: EmbeddingStore | None = None,
+    embed_batch_size: int | None = None,
+    embed_max_tokens: int | None = None,
+    window_size: int = 2048,
+    incremental: bool = False,
+    progress: ProgressCallback | None = None,
+    pipeline: bool = False,
+    pipeline_depth: int = 2,
+    trusted_input: bool = False,
+    validation_cache: ValidatedRecordCache | None = None,
+    workers: int = 0,
+    checkpoint: IngestCheckpoint | None = None,
+    resume: bool = False,
+    compact_chunks: bool = False,
+    parent_store: ParentStore | None = None,
 ) -> Tuple[int, List[str]]:
-    ids, descriptions, documents, metadatas = build_payloads(
-        data_path, normalize, min_chars
-    )
-    payloads = IngestPayloads(
-        ids=ids, descriptions=descriptions, documents=documents, metadatas=metadatas
-    )
+    """
+    Stream `data_path` through the selected strategy one window at a time, so peak memory
+    tracks `window_size` rather than the dataset. Returns (records ingested, their ids).
+    With `incremental`, unchanged records are not rewritten and users missing from the
+    dataset are deleted along with their chunks. `progress` receives cumulative
+    IngestProgress counters after every write. With `pipeline`, reading/chunking,
+    embedding and writing overlap across windows (see `run_pipeline`). Records are
+    validated in bulk through `validation_cache`, or not at all with `trusted_input`.
+    With `workers` > 1, validation, payload building and chunking run in a process pool.
+    Each written window is recorded in `checkpoint`; with `resume`, windows an interrupted
+    run already committed are skipped (not embedded or written). The checkpoint is cleared
+    once the run completes. With `compact_chunks`, chunk records reference parents written
+    once to `parent_store` instead of copying their fields and text. A missing or malformed
+    dataset raises (FileNotFoundError / json.JSONDecodeError) rather than ingesting a prefix.
+    """
+    batching = {
+        "embed_batch_size": embed_batch_size,
+        "embed_max_tokens": embed_max_tokens,
+        "embedding_store": embedding_store,
+        "incremental": incremental,
+        "progress_callback": progress,
+    }
     strategy: IngestStrategy
     if index_chunks:
+        layout = {"compact": compact_chunks, "parent_store": parent_store}
         if (chunking_mode or "sentence").lower() == "token":
-            strategy = TokenChunkStrategy(tokens_per_chunk=tokens_per_chunk, token_overlap=token_overlap)
+            strategy = TokenChunkStrategy(
+                tokens_per_chunk=tokens_per_chunk, token_overlap=token_overlap, **batching, **layout
+            )
         else:
-            strategy = ChunkedStrategy(sentences_per_chunk=sentences_per_chunk, sentence_overlap=sentence_overlap)
+            strategy = ChunkedStrategy(
+                sentences_per_chunk=sentences_per_chunk, sentence_overlap=sentence_overlap, **batching, **layout
+            )
     else:
-        strategy = WholeDocStrategy()
-    return strategy.run(
-        embeddings=embeddings,
-        repo=repo,
-        payloads=payloads,
-        embed_model=embed_model,
-        verbose=verbose,
-    )
+        strategy = WholeDocStrategy(**batching)
+    validator = UserValidator(trusted=trusted_input, cache=validation_cache)
+    skip = checkpoint.committed() if checkpoint is not None and resume else 0
+    if checkpoint is not None and not skip:
+        checkpoint.clear()
+    if skip and verbose:
+        print(f"Resuming ingest after {skip} committed windows")
+    skipped: List[str] = []
+    # The reader is strict: a missing/malformed file must fail, not read as empty or as the
+    # prefix before the error. The session would record a truncated index as synced, and
+    # incremental runs would delete every user after the bad record
+    windows: Iterable[PreparedWindow]
+    if workers > 1:
+        windows = _skip_committed(prepare_windows_parallel(
+            strategy, validator, data_path, normalize, min_chars,
+            window_size=window_size, strict=True, embed_model=embed_model, workers=workers,
+        ), skip, skipped)
+    else:
+        windows = (
+            strategy.prepare(payloads, embed_model=embed_model)
+            for payloads in _skip_committed(iter_payloads(
+                data_path, normalize, min_chars, window_size, strict=True, validator=validator
+            ), skip, skipped)
+        )
+
+    windows_done, parents_done = skip, 0
+
+    def committed(n: int, ids: List[str]) -> None:
+        nonlocal windows_done, parents_done
+        windows_done += 1
+        parents_done += n
+        if checkpoint is not None:
+            checkpoint.commit(windows_done, len(skipped) + parents_done)
+
+    if pipeline:
+        count, ingested = run_pipeline(
+            strategy, embeddings, repo, windows, embed_model=embed_model, verbose=verbose, depth=pipeline_depth,
+            on_write=committed,
+        )
+    else:
+        count = 0
+        ingested: List[str] = []
+        for window in windows:
+            window = strategy.embed(embeddings, repo, window, embed_model=embed_model, verbose=verbose)
+            n, ids = strategy.write(repo, window, verbose=verbose)
+            count += n
+            ingested.extend(ids)
+            committed(n, ids)
+    # Parents of skipped windows are already in the collection
+    count += len(skipped)
+    ingested = skipped + ingested
+    if incremental:
+        delete_missing_parents(
+            repo, set(ingested), verbose=verbose, parent_store=parent_store if index_chunks else None
+        )
+    if checkpoint is not None:
+        checkpoint.clear()
+    return count, ingested
+
+
+def _skip_committed(
+    windows: Iterable[Any], skip: int, skipped_ids: List[str]
+) -> Iterator[Any]:
+    """Drop the first `skip` windows (payloads or prepared), collecting their parent ids."""
+    for i, window in enumerate(windows):
+        if i < skip:
+            skipped_ids.extend(window.parent_ids if isinstance(window, PreparedWindow) else window.ids)
+            continue
+        yield window
+
+
+def prepare_windows_parallel(
+    strategy: IngestStrategy,
+    validator: UserValidator,
+    data_path: str,
+    normalize: bool,
+    min_chars: int,
+    *,
+    window_size: int,
+    strict: bool,
+    embed_model: str | None,
+    workers: int,
+) -> Iterator[PreparedWindow]:
+    """
+    Shard validation, payload building and `strategy.prepare` across a process pool, one
+    window of `window_size` raw records per task. The file is parsed here; windows come back
+    in input order, so ids, chunk ids and their order match the serial path. At most
+    2 * `workers` windows are in flight.
+    """
+    from concurrent.futures import Future, ProcessPoolExecutor
+    import multiprocessing
+
+    window_size = max(1, int(window_size))
+    records = iter_json_records(data_path, strict=strict)
+    # spawn: the pipeline may already run threads, which fork does not carry over safely
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending: Deque[Future] = deque()
+
+        def submit(batch: List[Dict[str, Any]]) -> None:
+            pending.append(pool.submit(
+                _prepare_records, strategy, validator, batch, normalize, min_chars, embed_model
+            ))
+
+        batch: List[Dict[str, Any]] = []
+        for raw in records:
+            batch.append(raw)
+            if len(batch) >= window_size:
+                submit(batch)
+                batch = []
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+        if batch:
+            submit(batch)
+        while pending:
+            yield pending.popleft().result()
+
+
+def _prepare_records(
+    strategy: IngestStrategy,
+    validator: UserValidator,
+    records: List[Dict[str, Any]],
+    normalize: bool,
+    min_chars: int,
+    embed_model: str | None,
+) -> PreparedWindow:
+    """Process-pool task: raw records -> prepared window."""
+    rows = list(_rows_from_records(records, normalize, min_chars, validator))
+    return strategy.prepare(_to_payloads(rows), embed_model=embed_model)
+
+
+def delete_missing_parents(
+    repo: UserVectorRepository,
+    keep: Set[str],
+    *,
+    verbose: bool = False,
+    parent_store: ParentStore | None = None,
+) -> int:
+    """
+    Delete every record whose parent user (parent_id, else the record id) is not in `keep`,
+    and those parents' rows in `parent_store`.
+    """
+    stale: List[str] = []
+    gone: Set[str] = set()
+    for rid, meta in repo.iter_metadata():
+        parent = str(meta.get("parent_id") or rid)
+        if parent not in keep:
+            stale.append(rid)
+            gone.add(parent)
+    if stale:
+        repo.delete(stale)
+    if parent_store is not None and gone:
+        parent_store.delete(gone)
+    if verbose:
+        print(f"Incremental: removed records={len(stale)}")
+    return len(stale)
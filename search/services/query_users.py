@@ -1,7 +1,10 @@
-from typing import List, Tuple, Dict
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, Dict
 
 from search.ports.embeddings import EmbeddingsProvider
-from search.ports.user_vectors import Row, UserVectorRepository
+from search.ports.parent_store import ParentStore
+from search.ports.user_vectors import IDS_ONLY, Row, UserVectorRepository
+from search.services.rerank import aggregate_by_parent, parent_key, rerank, space_of
 from search.utils.ingest import normalize_text
 
 
@@ -15,22 +18,176 @@ def search(
     normalize: bool,
     index_chunks: bool = False,
     chunk_query_multiplier: int = 5,
+    parents: ParentStore | None = None,
+    quantized_first_pass: bool = False,
+    quantized_oversample: int = 8,
+    exact_rerank: bool = False,
+    rerank_oversample: int = 4,
+    aggregation: str = "max",
+    aggregation_top_n: int = 3,
+    aggregation_temperature: float = 0.05,
 ) -> Tuple[List[Row], List[float]]:
-    q = normalize_text(query_text).lower() if normalize else query_text
+    """
+    Embed `query_text` and return the k best rows (parents when chunked) with their distances.
+    With `quantized_first_pass`, repositories that keep binary codes (NumPy / IVF backends)
+    shortlist k_eff * `quantized_oversample` candidates by Hamming distance and re-rank them
+    exactly; other repositories search as usual. With `exact_rerank`, approximate (HNSW)
+    repositories return k_eff * `rerank_oversample` candidates with their embeddings, and the
+    k_eff nearest by exact distance are kept. Chunks are combined per parent by `aggregation`
+    (see `rerank.aggregate_by_parent`); `threshold` applies to the aggregated score.
+    Candidates are fetched as ids and distances only; metadata and documents are read for
+    the final rows alone (see `_with_fields`).
+    """
+    q = _prepare_query(query_text, normalize)
     q_vecs = embeddings.embed_texts([q])
     q_vec = q_vecs[0] if q_vecs else []
     if not q_vec:
         return [], []
 
+    k_eff = _k_eff(k, index_chunks, chunk_query_multiplier)
+    oversample = _oversample(quantized_first_pass, quantized_oversample)
+    widen = _oversample(exact_rerank, rerank_oversample)
+    rows = _query_prefiltered(repo, q, q_vec, k_eff, phrase_prefilter, oversample, widen)
+    aggregate = (aggregation, aggregation_top_n, aggregation_temperature)
+    result = _with_fields(repo, [(rows, _finalize(rows, k, threshold, index_chunks, aggregate))], index_chunks)[0]
+    return _hydrate(result, parents)
+
+
+def search_many(
+    embeddings: EmbeddingsProvider,
+    repo: UserVectorRepository,
+    queries: Iterable[str],
+    k: int,
+    phrase_prefilter: bool,
+    threshold: float | None,
+    normalize: bool,
+    index_chunks: bool = False,
+    chunk_query_multiplier: int = 5,
+    batch_size: int = 256,
+    parents: ParentStore | None = None,
+    quantized_first_pass: bool = False,
+    quantized_oversample: int = 8,
+    exact_rerank: bool = False,
+    rerank_oversample: int = 4,
+    aggregation: str = "max",
+    aggregation_top_n: int = 3,
+    aggregation_temperature: float = 0.05,
+) -> Iterator[Tuple[List[Row], List[float]]]:
+    """
+    Like `search` for many queries: each batch of `batch_size` queries costs one
+    embeddings call and (without phrase prefilter) one repository query.
+    Yields one (rows, distances) pair per query, in input order, as batches complete.
+    """
+    k_eff = _k_eff(k, index_chunks, chunk_query_multiplier)
+    oversample = _oversample(quantized_first_pass, quantized_oversample)
+    widen = _oversample(exact_rerank, rerank_oversample)
+    aggregate = (aggregation, aggregation_top_n, aggregation_temperature)
+    it = iter(queries)
+    while True:
+        batch = [_prepare_query(q, normalize) for q in islice(it, max(1, batch_size))]
+        if not batch:
+            return
+        q_vecs = embeddings.embed_texts(batch)
+        vec_at = [q_vecs[i] if i < len(q_vecs) and q_vecs[i] else [] for i in range(len(batch))]
+        results: Dict[int, List[Row]] = {}
+
+        if phrase_prefilter:
+            # Each query has its own where_document filter, so these cannot share a call
+            for i, q in enumerate(batch):
+                if vec_at[i]:
+                    results[i] = _query_prefiltered(repo, q, vec_at[i], k_eff, phrase_prefilter, oversample, widen)
+        else:
+            live = [i for i in range(len(batch)) if vec_at[i]]
+            for i, (rows, _) in zip(live, _query_many(repo, [vec_at[i] for i in live], k_eff, oversample, widen)):
+                results[i] = rows
+
+        # One targeted fetch fills the final rows of the whole batch
+        done = sorted(results)
+        filled = dict(zip(done, _with_fields(repo, [
+            (results[i], _finalize(results[i], k, threshold, index_chunks, aggregate)) for i in done
+        ], index_chunks)))
+        for i in range(len(batch)):
+            if i not in filled:
+                yield [], []
+            else:
+                yield _hydrate(filled[i], parents)
+
+
+def _prepare_query(query_text: str, normalize: bool) -> str:
+    return normalize_text(query_text).lower() if normalize else query_text
+
+
+def _k_eff(k: int, index_chunks: bool, chunk_query_multiplier: int) -> int:
     # If indexing per chunk, query more candidates then aggregate by parent_id
-    k_eff = max(1, (k * max(1, chunk_query_multiplier)) if index_chunks else k)
+    return max(1, (k * max(1, chunk_query_multiplier)) if index_chunks else k)
 
-    rows, _ = repo.query(q_vec, k_eff, where_document=q if phrase_prefilter and q else None)
+
+def _oversample(enabled: bool, factor: int) -> int | None:
+    return max(1, factor) if enabled else None
+
+
+def _query_prefiltered(
+    repo: UserVectorRepository, q: str, q_vec: List[float], k_eff: int, phrase_prefilter: bool,
+    oversample: int | None = None, widen: int | None = None,
+) -> List[Row]:
+    rows = _fetch(repo, q_vec, k_eff, q if phrase_prefilter and q else None, oversample, widen)
     if phrase_prefilter and q and not rows:
-        rows, _ = repo.query(q_vec, k_eff)
+        rows = _fetch(repo, q_vec, k_eff, None, oversample, widen)
+    return rows
+
+
+def _fetch(
+    repo: UserVectorRepository, q_vec: List[float], k_eff: int, where_document: str | None,
+    oversample: int | None, widen: int | None,
+) -> List[Row]:
+    with_embeddings = getattr(repo, "query_many_with_embeddings", None) if widen is not None else None
+    if with_embeddings is None:
+        return _query(repo, q_vec, k_eff, where_document, oversample)[0]
+    rows, embs = with_embeddings([q_vec], k_eff * widen, where_document=where_document, include=IDS_ONLY)[0]
+    return rerank(rows, q_vec, embs, space_of(repo), k_eff)
+
+
+def _query(
+    repo: UserVectorRepository, q_vec: List[float], k_eff: int, where_document: str | None, oversample: int | None
+) -> Tuple[List[Row], List[float]]:
+    query_quantized = getattr(repo, "query_quantized", None) if oversample is not None else None
+    if query_quantized is not None:
+        return query_quantized(q_vec, k_eff, where_document=where_document, oversample=oversample, include=IDS_ONLY)
+    return repo.query(q_vec, k_eff, where_document=where_document, include=IDS_ONLY)
 
+
+def _query_many(
+    repo: UserVectorRepository, vectors: List[List[float]], k_eff: int, oversample: int | None = None,
+    widen: int | None = None,
+) -> List[Tuple[List[Row], List[float]]]:
+    if not vectors:
+        return []
+    if widen is not None:
+        # Only approximate repositories offer embeddings with their hits; exact ones need no re-rank
+        with_embeddings = getattr(repo, "query_many_with_embeddings", None)
+        if with_embeddings is not None:
+            space = space_of(repo)
+            out: List[Tuple[List[Row], List[float]]] = []
+            for v, (rows, embs) in zip(vectors, with_embeddings(vectors, k_eff * widen, include=IDS_ONLY)):
+                rows = rerank(rows, v, embs, space, k_eff)
+                out.append((rows, [r[1] for r in rows]))
+            return out
+    if oversample is not None:
+        query_many_quantized = getattr(repo, "query_many_quantized", None)
+        if query_many_quantized is not None:
+            return query_many_quantized(vectors, k_eff, oversample=oversample, include=IDS_ONLY)
+    query_many = getattr(repo, "query_many", None)
+    if query_many is not None:
+        return query_many(vectors, k_eff, include=IDS_ONLY)
+    return [repo.query(v, k_eff, include=IDS_ONLY) for v in vectors]
+
+
+def _finalize(
+    rows: List[Row], k: int, threshold: float | None, index_chunks: bool,
+    aggregate: Tuple[str, int, float] = ("max", 3, 0.05),
+) -> Tuple[List[Row], List[float]]:
     # Aggregate by parent when chunked; otherwise keep as-is
-    rows = _aggregate_by_parent(rows) if index_chunks else rows
+    rows = aggregate_by_parent(rows, *aggregate) if index_chunks else rows
     # Trim back to requested k
     rows = rows[:k]
 
@@ -41,18 +198,77 @@ def search(
     return filtered, [r[1] for r in rows]
 
 
-def _aggregate_by_parent(rows: List[Row]) -> List[Row]:
-    by_parent: Dict[str, Row] = {}
+def _with_fields(
+    repo: UserVectorRepository, batch: List[Tuple[List[Row], Tuple[List[Row], List[float]]]],
+    index_chunks: bool = False,
+) -> List[Tuple[List[Row], List[float]]]:
+    """
+    Fill in metadata and documents for final rows that came back as ids and distances only,
+    with one `get_by_ids` for the whole batch. Each item pairs a query's candidate rows with
+    its final result. With `index_chunks` a parent row is filled from its best chunk, the
+    first of its chunks among the (distance-ordered) candidates; otherwise rows are whole
+    documents, filled by their own id (which may itself contain '#').
+    """
+    sources: List[List[str | None]] = []
+    for candidates, (rows, _) in batch:
+        if all(meta for _, _, _, meta in rows):
+            sources.append([None] * len(rows))
+            continue
+        if not index_chunks:
+            sources.append([None if meta else rid for rid, _, _, meta in rows])
+            continue
+        first: Dict[str, str] = {}
+        for rid, _, _, meta in candidates:
+            first.setdefault(parent_key(rid, meta), rid)
+        sources.append([None if meta else first.get(rid, rid) for rid, _, _, meta in rows])
+    wanted = list(dict.fromkeys(s for src in sources for s in src if s is not None))
+    get_by_ids = getattr(repo, "get_by_ids", None)
+    if not wanted or get_by_ids is None:
+        return [result for _, result in batch]
+    found = get_by_ids(wanted, include_documents=True)
+    out: List[Tuple[List[Row], List[float]]] = []
+    for (_, (rows, distances)), src in zip(batch, sources):
+        filled: List[Row] = []
+        for (rid, dist, doc, meta), source in zip(rows, src):
+            item = found.get(source) if source is not None else None
+            if item is not None:
+                doc, meta = item.get("document") or "", item.get("metadata") or {}
+            filled.append((rid, dist, doc, meta))
+        out.append((filled, distances))
+    return out
+
+
+def _hydrate(result: Tuple[List[Row], List[float]], parents: ParentStore | None) -> Tuple[List[Row], List[float]]:
+    """
+    Join compact chunk rows (those with chunk_start/chunk_end) with their parent's fields and
+    restore `chunk_text` (the chunk's document, else its span of the parent description).
+    Only the final rows are looked up.
+    """
+    rows, distances = result
+    if parents is None:
+        return result
+    wanted = [
+        str(meta.get("parent_id") or rid) for rid, _, _, meta in rows
+        if isinstance(meta, dict) and "chunk_start" in meta
+    ]
+    if not wanted:
+        return result
+    found = parents.get_many(wanted)
+    out: List[Row] = []
     for rid, dist, doc, meta in rows:
-        parent = meta.get("parent_id") if isinstance(meta, dict) else None
-        key = parent or rid
-        current = by_parent.get(key)
-        if current is None or dist < current[1]:
-            # Prefer the best (smallest distance) chunk per parent
-            if parent:
-                # ensure id reflects parent when aggregating
-                by_parent[key] = (parent, dist, doc, meta)
-            else:
-                by_parent[key] = (rid, dist, doc, meta)
-    # Return sorted by ascending distance
-    return sorted(by_parent.values(), key=lambda r: r[1])
+        parent = found.get(str(meta.get("parent_id") or rid)) if isinstance(meta, dict) else None
+        if parent is None or "chunk_start" not in meta:
+            out.append((rid, dist, doc, meta))
+            continue
+        chunk = {k: v for k, v in meta.items() if k not in ("chunk_start", "chunk_end", "parent_hash")}
+        if doc:
+            # A compact chunk's document is exactly the text that was embedded
+            text = doc
+        else:
+            # Rows fetched without documents: the chunk's span of the description (units joined by
+            # single spaces when embedded, so whitespace and token spacing may differ)
+            start, end = int(meta.get("chunk_start") or 0), int(meta.get("chunk_end") or 0)
+            text = str(parent.get("description") or "")[start:end]
+        merged = {**(parent.get("metadata") or {}), **chunk, "chunk_text": text}
+        out.append((rid, dist, doc, merged))
+    return out, distances
@@ -0,0 +1,130 @@
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from search.ports.user_vectors import Row
+from search.services.ingest_strategies import chunk_parent_id
+
+AGGREGATIONS = ("max", "mean-top-n", "softmax-sum")
+
+
+def exact_distances(query: Sequence[float], candidates: np.ndarray, space: str) -> np.ndarray:
+    """Distances from `query` to every row of `candidates` in one pass, matching Chroma's spaces."""
+    q = np.asarray(query, dtype=np.float32)
+    dots = candidates @ q
+    if space == "ip":
+        return 1.0 - dots
+    norms = np.linalg.norm(candidates, axis=1)
+    q_norm = float(np.linalg.norm(q))
+    if space == "l2":
+        return np.maximum(norms ** 2 - 2.0 * dots + q_norm ** 2, 0.0)
+    return 1.0 - dots / np.maximum(norms * q_norm, 1e-12)
+
+
+def rerank(
+        rows: List[Row], query: Sequence[float], embeddings: Sequence[Any], space: str, keep: int
+) -> List[Row]:
+    """
+    Replace approximate distances with exact ones from the rows' stored embeddings and
+    return the `keep` nearest. Rows without an embedding keep their original distance.
+    """
+    if not rows:
+        return rows
+    dists = np.asarray([r[1] for r in rows], dtype=np.float64)
+    present = [i for i, e in enumerate(embeddings) if e is not None and len(e)]
+    if present:
+        matrix = np.asarray([embeddings[i] for i in present], dtype=np.float32)
+        dists[present] = exact_distances(query, matrix, space)
+    order = np.argsort(dists, kind="stable")[: max(1, keep)]
+    return [(rows[i][0], float(dists[i]), rows[i][2], rows[i][3]) for i in order]
+
+
+def aggregate_by_parent(
+        rows: List[Row], how: str = "max", top_n: int = 3, temperature: float = 0.05
+) -> List[Row]:
+    """
+    Collapse chunk rows into one row per parent, scored from all of the parent's chunks:
+    `max` keeps the best (smallest) chunk distance, `mean-top-n` averages the parent's
+    `top_n` best, and `softmax-sum` is the soft minimum -T * log(sum(exp(-d / T))), which
+    rewards parents matching in several chunks. Each parent keeps its best chunk's document
+    and metadata; rows are returned by ascending score.
+    """
+    if not rows:
+        return []
+    if how not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation {how!r}; expected one of {', '.join(AGGREGATIONS)}")
+    if how == "max":
+        # A single dict pass beats the array path here: there is nothing to combine
+        return _best_chunk_per_parent(rows)
+    # One pass over the rows to number the parents; the scoring below is whole-array
+    index: Dict[Any, int] = {}
+    keys: List[Any] = []
+    groups: List[int] = []
+    for rid, _, _, meta in rows:
+        key = parent_key(rid, meta)
+        g = index.get(key)
+        if g is None:
+            g = index[key] = len(keys)
+            keys.append(key)
+        groups.append(g)
+    group = np.asarray(groups, dtype=np.int64)
+    dists = np.asarray([r[1] for r in rows], dtype=np.float64)
+
+    # Sort by (parent, distance); each parent's run starts with its best chunk
+    order = np.lexsort((dists, group))
+    grouped, sorted_d = group[order], dists[order]
+    starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+    sizes = np.diff(np.r_[starts, order.size])
+    best = order[starts]
+    best_d = dists[best]
+
+    if how == "mean-top-n":
+        rank = np.arange(order.size) - np.repeat(starts, sizes)
+        top = rank < max(1, top_n)
+        idx = np.repeat(np.arange(starts.size), sizes)[top]
+        scores = np.bincount(idx, weights=sorted_d[top]) / np.bincount(idx)
+    else:
+        t = max(float(temperature), 1e-6)
+        idx = np.repeat(np.arange(starts.size), sizes)
+        # Shift by each parent's best distance so exp() cannot overflow
+        sums = np.bincount(idx, weights=np.exp(-(sorted_d - best_d[idx]) / t))
+        scores = best_d - t * np.log(sums)
+
+    # Runs are in parent-number order, so run g belongs to keys[g]
+    best_rows, score_list = best.tolist(), scores.tolist()
+    out: List[Row] = []
+    for g in np.lexsort((best, scores)).tolist():
+        _, _, doc, meta = rows[best_rows[g]]
+        out.append((keys[g], score_list[g], doc, meta))
+    return out
+
+
+def parent_key(rid: str, meta: Any) -> Any:
+    """
+    A chunk row's parent: its `parent_id` metadata, or the part of its chunk id before the
+    last '#' when fetched without metadata. Only meaningful for chunk rows (`index_chunks`).
+    """
+    if isinstance(meta, dict) and meta:
+        return meta.get("parent_id") or rid
+    return chunk_parent_id(rid)
+
+
+def _best_chunk_per_parent(rows: List[Row]) -> List[Row]:
+    by_parent: Dict[str, Row] = {}
+    for rid, dist, doc, meta in rows:
+        key = parent_key(rid, meta)
+        current = by_parent.get(key)
+        if current is None or dist < current[1]:
+            # Prefer the best (smallest distance) chunk per parent; the id reflects the parent
+            by_parent[key] = (key, dist, doc, meta)
+    # Return sorted by ascending distance
+    return sorted(by_parent.values(), key=lambda r: r[1])
+
+
+def space_of(repo: Any) -> str:
+    """The repository's distance space (collection metadata `hnsw:space`), cosine by default."""
+    try:
+        md: Dict[str, Any] = getattr(repo, "metadata", None) or {}
+    except Exception:
+        md = {}
+    return str(md.get("hnsw:space") or "cosine").lower()
@@ -0,0 +1,36 @@
+from typing import Dict, List, Tuple
+
+from search.ports.user_vectors import UserVectorRepository
+
+
+def find_orphan_chunks(repo: UserVectorRepository) -> List[str]:
+    """
+    Ids of chunk records outside their parent's current chunk set. A parent's set is
+    indices 0..chunk_count-1, where chunk_count comes from its chunk 0 (rewritten on
+    every ingest); chunks of a parent without chunk 0 are orphans too.
+    """
+    counts: Dict[str, int] = {}
+    chunks: List[Tuple[str, str, int]] = []
+    for rid, meta in repo.iter_metadata():
+        parent = meta.get("parent_id")
+        if parent is None:
+            continue
+        index = meta.get("chunk_index")
+        index = index if isinstance(index, int) else -1
+        if index == 0:
+            count = meta.get("chunk_count")
+            counts[str(parent)] = count if isinstance(count, int) else 0
+        chunks.append((rid, str(parent), index))
+    return [rid for rid, parent, index in chunks if index < 0 or index >= counts.get(parent, 0)]
+
+
+def vacuum_orphans(repo: UserVectorRepository, *, verbose: bool = False) -> List[str]:
+    """Delete orphaned chunk records in bulk; returns the deleted ids."""
+    orphans = find_orphan_chunks(repo)
+    if orphans:
+        repo.delete(orphans)
+    if verbose:
+        print(f"Vacuum: deleted orphan chunks={len(orphans)}")
+        for rid in orphans:
+            print(f"  {rid}")
+    return orphans
@@ -0,0 +1,114 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from search.ports.validated_cache import ValidatedRecordCache
+
+# Validated fields payload building needs; everything else in a raw record is ignored
+USER_FIELDS = ("username", "description", "first_name", "last_name", "email", "phone")
+
+ValidatedRecord = Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+def record_hash(raw: Any) -> str:
+    """SHA-256 of the record's canonical JSON (sorted keys), independent of key order in the file."""
+    blob = json.dumps(raw, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class UserValidator:
+    """
+    Turns raw user records into validated field dicts (see USER_FIELDS), in batches:
+      - trusted: no validation, fields are taken as given (input already checked upstream,
+        e.g. by the back-end at upload). Phones keep their raw formatting.
+      - otherwise records missing from `cache` are validated together with one
+        TypeAdapter(List[User]) call and remembered under their raw-record hash, so
+        unchanged users skip the email/phone parsing on later runs.
+    Invalid records raise pydantic.ValidationError, as constructing User would.
+    """
+
+    def __init__(
+            self,
+            *,
+            trusted: bool = False,
+            cache: ValidatedRecordCache | None = None,
+            batch_size: int = 1000,
+    ) -> None:
+        self.trusted = trusted
+        self._cache = cache
+        self._batch_size = max(1, batch_size)
+        self._adapter: Any = None
+        self._schema = ""
+        self.validated = 0
+        self.cache_hits = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The TypeAdapter is rebuilt lazily in worker processes
+        state = dict(self.__dict__)
+        state["_adapter"] = None
+        return state
+
+    def validate(self, records: Iterable[Dict[str, Any]]) -> Iterator[ValidatedRecord]:
+        """Yield (raw record, validated fields) in input order."""
+        batch: List[Dict[str, Any]] = []
+        for raw in records:
+            batch.append(raw)
+            if len(batch) >= self._batch_size:
+                yield from self._validate_batch(batch)
+                batch = []
+        if batch:
+            yield from self._validate_batch(batch)
+
+    def _validate_batch(self, batch: List[Dict[str, Any]]) -> List[ValidatedRecord]:
+        if self.trusted:
+            return [(raw, _trusted_fields(raw)) for raw in batch]
+        adapter = self._type_adapter()
+        keys = [record_hash(raw) for raw in batch] if self._cache is not None else []
+        found: Dict[str, Dict[str, Any]] = {}
+        if self._cache is not None:
+            found = self._cache.get_many(self._schema, keys)
+            self.cache_hits += sum(1 for k in keys if k in found)
+        todo = [i for i in range(len(batch)) if not keys or keys[i] not in found]
+        out: List[Dict[str, Any] | None] = [found.get(keys[i]) if keys else None for i in range(len(batch))]
+        if todo:
+            users = adapter.validate_python([batch[i] for i in todo])
+            self.validated += len(todo)
+            fresh: Dict[str, Dict[str, Any]] = {}
+            for i, user in zip(todo, users):
+                fields = _user_fields(user)
+                out[i] = fields
+                if keys:
+                    fresh[keys[i]] = fields
+            if self._cache is not None and fresh:
+                self._cache.put_many(self._schema, fresh)
+        return [(raw, fields or {}) for raw, fields in zip(batch, out)]
+
+    def _type_adapter(self) -> Any:
+        if self._adapter is None:
+            from pydantic import TypeAdapter
+
+            from search.models.user import User
+
+            self._adapter = TypeAdapter(List[User])
+            # Cached fields are only valid for the schema that produced them
+            schema = json.dumps(User.model_json_schema(), sort_keys=True)
+            self._schema = hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+        return self._adapter
+
+
+def _user_fields(user: Any) -> Dict[str, Any]:
+    return {
+        "username": user.username,
+        "description": user.description,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": str(user.email),
+        "phone": str(user.phone or ""),
+    }
+
+
+def _trusted_fields(raw: Dict[str, Any]) -> Dict[str, Any]:
+    fields = {k: raw.get(k) for k in USER_FIELDS}
+    fields["email"] = str(fields["email"] or "")
+    fields["phone"] = str(fields["phone"] or "")
+    return fields
@@ -0,0 +1,596 @@
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from search.adapters.chroma_user_vectors import (
+    ChromaUserVectors,
+    delete_collection,
+    get_collection,
+    get_or_create_collection,
+)
+from search.ports.embedding_store import EmbeddingStore
+from search.ports.embeddings import EmbeddingsProvider
+from search.ports.parent_store import ParentStore
+from search.ports.user_vectors import Row
+from search.ports.validated_cache import ValidatedRecordCache
+from search.services.query_users import search as svc_search, search_many as svc_search_many
+from search.utils.collection_registry import CollectionRegistry, collection_name
+from search.utils.fingerprint import dataset_fingerprint, fingerprint_matches, settings_digest
+from search.utils.ingest_checkpoint import IngestCheckpoint
+from search.utils.load_env import load_env
+
+# openai and the ingest path (pydantic models, payload building) load on first use only,
+# so a query against an already-ingested collection never imports them.
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+    from search.adapters.ivf_user_vectors import IvfUserVectors
+    from search.adapters.numpy_user_vectors import NumpyUserVectors
+
+    VectorIndex = ChromaUserVectors | NumpyUserVectors | IvfUserVectors
+
+
+def chunking_settings(args: argparse.Namespace) -> Dict[str, Any]:
+    """Chunking settings stamped into collection metadata and compared on reuse."""
+    settings = {
+        "index_chunks": bool(args.index_chunks),
+        "chunking_mode": getattr(args, "chunking_mode", "sentence"),
+        "sentences_per_chunk": int(args.sentences_per_chunk),
+        "sentence_overlap": int(args.sentence_overlap),
+        "tokens_per_chunk": int(getattr(args, "tokens_per_chunk", 200)),
+        "token_overlap": int(getattr(args, "token_overlap", 50)),
+    }
+    # Only present when on, so existing collection names and fingerprints stay valid
+    if compact_chunks(args):
+        settings["compact_chunks"] = True
+    return settings
+
+
+def compact_chunks(args: argparse.Namespace) -> bool:
+    return bool(getattr(args, "compact_chunks", False)) and bool(args.index_chunks)
+
+
+def _as_bool(v: Any) -> bool:
+    if isinstance(v, bool):
+        return v
+    if isinstance(v, (int, float)):
+        return v != 0
+    if isinstance(v, str):
+        return v.strip().lower() in ("1", "true", "yes", "on")
+    return bool(v)
+
+
+def _as_int(v: Any, default: int = 0) -> int:
+    try:
+        return int(v)
+    except Exception:
+        return default
+
+
+def chunking_mismatch(meta: Dict[str, Any], extra_meta: Dict[str, Any]) -> bool:
+    return (
+        _as_bool(meta.get("index_chunks")) != bool(extra_meta["index_chunks"])
+        or str(meta.get("chunking_mode") or "sentence").lower() != str(extra_meta["chunking_mode"]).lower()
+        or _as_int(meta.get("sentences_per_chunk"), -1) != int(extra_meta["sentences_per_chunk"])
+        or _as_int(meta.get("sentence_overlap"), -1) != int(extra_meta["sentence_overlap"])
+        or _as_int(meta.get("tokens_per_chunk"), -1) != int(extra_meta["tokens_per_chunk"])
+        or _as_int(meta.get("token_overlap"), -1) != int(extra_meta["token_overlap"])
+        or _as_bool(meta.get("compact_chunks")) != bool(extra_meta.get("compact_chunks", False))
+    )
+
+
+def vector_backend(args: argparse.Namespace) -> str:
+    return str(getattr(args, "backend", "chroma") or "chroma").lower()
+
+
+def collection_settings(args: argparse.Namespace) -> Dict[str, Any]:
+    """Settings a derived collection name covers: chunking plus a non-default backend."""
+    settings = chunking_settings(args)
+    if vector_backend(args) != "chroma":
+        settings["backend"] = vector_backend(args)
+    return settings
+
+
+def _is_dimension_error(e: Exception) -> bool:
+    from chromadb.errors import InvalidArgumentError
+
+    from search.adapters.numpy_user_vectors import DimensionMismatchError
+
+    return isinstance(e, (InvalidArgumentError, DimensionMismatchError)) and "dimension" in str(e).lower()
+
+
+def query_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Optional candidate-search and parent-aggregation settings for `query_users.search`."""
+    return {
+        "quantized_first_pass": bool(getattr(args, "quantized_first_pass", False)),
+        "quantized_oversample": int(getattr(args, "quantized_oversample", 8) or 8),
+        "exact_rerank": bool(getattr(args, "exact_rerank", False)),
+        "rerank_oversample": int(getattr(args, "rerank_oversample", 4) or 4),
+        "aggregation": str(getattr(args, "parent_aggregation", "max") or "max"),
+        "aggregation_top_n": int(getattr(args, "aggregation_top_n", 3) or 3),
+        "aggregation_temperature": float(getattr(args, "aggregation_temperature", 0.05) or 0.05),
+    }
+
+
+def embeddings_provider(args: argparse.Namespace) -> str:
+    return str(getattr(args, "embeddings_provider", "openai") or "openai").lower()
+
+
+def _data_stat(path: str) -> Tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class _WriteOnlyStore:
+    """An embedding store that records new vectors but serves none (nothing it holds is trusted)."""
+
+    def __init__(self, store: EmbeddingStore) -> None:
+        self._store = store
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        return {}
+
+    def put_many(self, model: str, vectors: Mapping[str, List[float]]) -> None:
+        self._store.put_many(model, vectors)
+
+
+@dataclass
+class _OpenIndex:
+    repo: VectorIndex
+    data_stat: Tuple[int, int] | None
+    count: int
+
+
+class SearchSession:
+    """
+    Keeps the embeddings client and opened collections alive across queries.
+    One-shot CLIs use a fresh session per process; `search.api --serve` reuses
+    one for its whole lifetime, so repeated queries skip client setup and,
+    while the dataset file is unchanged, re-ingestion. Across processes the
+    dataset fingerprint stored in collection metadata serves the same purpose.
+    """
+
+    def __init__(self, *, log: Callable[[str], None] | None = None) -> None:
+        self._log = log
+        self._client: OpenAI | None = None
+        self._embeddings: Dict[Tuple[Any, ...], EmbeddingsProvider] = {}
+        self._query_embeddings: Dict[Tuple[Any, ...], EmbeddingsProvider] = {}
+        self._stores: Dict[Tuple[str, int], EmbeddingStore] = {}
+        self._validation_caches: Dict[Tuple[str, int], ValidatedRecordCache] = {}
+        self._parent_stores: Dict[Tuple[str, str], ParentStore] = {}
+        self._registries: Dict[str, CollectionRegistry] = {}
+        self._indexes: Dict[Tuple[Any, ...], _OpenIndex] = {}
+        self._lock = threading.RLock()
+
+    def _say(self, msg: str) -> None:
+        if self._log is not None:
+            self._log(msg)
+
+    def embed_model(self, args: argparse.Namespace) -> str:
+        """Model id stamped on vectors: --model for OpenAI, the adapter's own id for local embeddings."""
+        if embeddings_provider(args) == "local":
+            from search.adapters.local_embeddings import LocalEmbeddings
+
+            return LocalEmbeddings(int(getattr(args, "local_dim", 256))).model_name
+        return args.model
+
+    def embeddings(self, args: argparse.Namespace) -> EmbeddingsProvider:
+        if embeddings_provider(args) == "local":
+            return self._local_embeddings(args)
+        batch_size = int(getattr(args, "embed_batch_size", 128))
+        concurrency = int(getattr(args, "embed_concurrency", 4))
+        key = (args.model, batch_size, concurrency)
+        with self._lock:
+            emb = self._embeddings.get(key)
+            if emb is None:
+                from openai import OpenAI
+                from search.adapters.openai_embeddings import OpenAIEmbeddings
+
+                if self._client is None:
+                    api_key, base_url = load_env()
+                    # OpenAIEmbeddings owns retries (backoff, Retry-After, AIMD concurrency);
+                    # SDK retries underneath would multiply its attempts and hide 429s from it
+                    self._client = OpenAI(base_url=base_url, api_key=api_key, max_retries=0)
+                emb = OpenAIEmbeddings(
+                    self._client, args.model, batch_size=batch_size, max_concurrency=concurrency
+                )
+                self._embeddings[key] = emb
+            return emb
+
+    def _local_embeddings(self, args: argparse.Namespace) -> EmbeddingsProvider:
+        dim = int(getattr(args, "local_dim", 256))
+        mean_ms = float(getattr(args, "local_latency_ms", 0.0) or 0.0)
+        jitter_ms = float(getattr(args, "local_latency_jitter_ms", 0.0) or 0.0)
+        key = ("local", dim, mean_ms, jitter_ms)
+        with self._lock:
+            emb = self._embeddings.get(key)
+            if emb is None:
+                from search.adapters.local_embeddings import LocalEmbeddings, gaussian_latency
+
+                latency = gaussian_latency(mean_ms, jitter_ms) if mean_ms > 0 or jitter_ms > 0 else None
+                emb = LocalEmbeddings(dim, latency=latency)
+                self._embeddings[key] = emb
+            return emb
+
+    def query_embeddings(self, args: argparse.Namespace) -> EmbeddingsProvider:
+        """Embeddings for query texts: the model's provider behind the memory/disk query cache."""
+        mem = max(0, int(getattr(args, "query_cache_size", 0) or 0))
+        disk = max(0, int(getattr(args, "query_cache_disk_entries", 0) or 0))
+        if not mem and not disk:
+            return self.embeddings(args)
+        model = self.embed_model(args)
+        key = (model, os.path.abspath(args.persist), mem, disk)
+        with self._lock:
+            emb = self._query_embeddings.get(key)
+            if emb is None:
+                from search.adapters.cached_embeddings import CachedEmbeddings
+                from search.adapters.sqlite_embedding_store import SqliteEmbeddingStore
+
+                store = None
+                if disk:
+                    store = SqliteEmbeddingStore(
+                        os.path.join(args.persist, "query_embeddings.sqlite3"), max_entries=disk
+                    )
+                emb = CachedEmbeddings(self.embeddings(args), model, max_memory_items=mem, store=store)
+                self._query_embeddings[key] = emb
+            return emb
+
+    def embedding_store(self, args: argparse.Namespace) -> EmbeddingStore | None:
+        """
+        Content-addressed corpus vectors under --persist; outlives any one collection.
+        Unbounded unless --embedding-store-max-entries caps it (least recently used first).
+        """
+        if getattr(args, "no_embedding_store", False):
+            return None
+        path = os.path.join(os.path.abspath(args.persist), "embeddings.sqlite3")
+        max_entries = max(0, int(getattr(args, "embedding_store_max_entries", 0) or 0))
+        key = (path, max_entries)
+        with self._lock:
+            store = self._stores.get(key)
+            if store is None:
+                from search.adapters.sqlite_embedding_store import SqliteEmbeddingStore
+
+                store = SqliteEmbeddingStore(path, max_entries=max_entries or None)
+                self._stores[key] = store
+            return store
+
+    def validation_cache(self, args: argparse.Namespace) -> ValidatedRecordCache | None:
+        """
+        Validated user fields under --persist, keyed by raw-record hash, at most
+        --validation-cache-entries of them; unused with --trusted-input or a bound of 0.
+        """
+        entries = max(0, int(getattr(args, "validation_cache_entries", 1_000_000) or 0))
+        if getattr(args, "trusted_input", False) or not entries:
+            return None
+        path = os.path.join(os.path.abspath(args.persist), "validated_users.sqlite3")
+        key = (path, entries)
+        with self._lock:
+            cache = self._validation_caches.get(key)
+            if cache is None:
+                from search.adapters.sqlite_validated_cache import SqliteValidatedCache
+
+                cache = SqliteValidatedCache(path, max_entries=entries)
+                self._validation_caches[key] = cache
+            return cache
+
+    def parent_store(self, args: argparse.Namespace, name: str) -> ParentStore | None:
+        """Parent records of collection `name` under --persist; only used with --compact-chunks."""
+        if not compact_chunks(args):
+            return None
+        return self._parent_store(args.persist, name)
+
+    def _parent_store(self, persist: str, name: str) -> ParentStore:
+        key = (os.path.join(os.path.abspath(persist), "parents.sqlite3"), name)
+        with self._lock:
+            store = self._parent_stores.get(key)
+            if store is None:
+                from search.adapters.sqlite_parent_store import SqliteParentStore
+
+                store = SqliteParentStore(*key)
+                self._parent_stores[key] = store
+            return store
+
+    def collection_name(self, args: argparse.Namespace) -> str:
+        """--collection itself with --fixed-collection; otherwise suffixed with a digest of model + chunking."""
+        if getattr(args, "fixed_collection", False):
+            return args.collection
+        return collection_name(args.collection, self.embed_model(args), args.space, collection_settings(args))
+
+    def _register(self, args: argparse.Namespace, name: str, settings: Dict[str, Any]) -> None:
+        """
+        Record that `name` was opened (created or synced) and, with --max-collections, drop
+        the coldest collections of the same base beyond it. Eviction is opt-in: a dropped
+        collection may still be open in another process sharing --persist.
+        """
+        if getattr(args, "fixed_collection", False):
+            return
+        path = os.path.join(os.path.abspath(args.persist), "collections.json")
+        registry = self._registries.get(path)
+        if registry is None:
+            registry = self._registries[path] = CollectionRegistry(path)
+        keep = max(0, int(getattr(args, "max_collections", 0) or 0))
+        evicted = registry.touch_and_evict(name, args.collection, {
+            **settings, "backend": vector_backend(args), "model": self.embed_model(args), "space": args.space,
+        }, keep)
+        for old, entry in evicted.items():
+            self._say(f"Evicting cold collection {old} (over --max-collections={keep}).")
+            backend = str((entry.get("settings") or {}).get("backend") or "chroma")
+            self._drop_collection(args.persist, old, backend)
+            if os.path.exists(os.path.join(args.persist, "parents.sqlite3")):
+                self._parent_store(args.persist, old).clear()
+        if evicted:
+            for key in [k for k in self._indexes if k[0] == args.persist and k[1] in evicted]:
+                del self._indexes[key]
+
+    def _open_collection(
+            self,
+            args: argparse.Namespace,
+            name: str,
+            recreate: bool,
+            model: str,
+            extra_meta: Dict[str, Any],
+    ) -> VectorIndex:
+        """Open (or create, or with `recreate` replace) collection `name` on the --backend store."""
+        if vector_backend(args) == "numpy":
+            from search.adapters.numpy_user_vectors import open_numpy_collection
+
+            return open_numpy_collection(args.persist, name, args.space, recreate, model, extra_meta)
+        if vector_backend(args) == "ivf":
+            from search.adapters.ivf_user_vectors import open_ivf_collection
+
+            return open_ivf_collection(
+                args.persist, name, args.space, recreate, model, extra_meta,
+                nlist=int(getattr(args, "ivf_nlist", 0) or 0), nprobe=int(getattr(args, "ivf_nprobe", 8) or 8),
+            )
+        return ChromaUserVectors(get_or_create_collection(args.persist, name, args.space, recreate, model, extra_meta))
+
+    def _existing_collection(
+            self, args: argparse.Namespace, name: str, model: str, extra_meta: Dict[str, Any]
+    ) -> VectorIndex | None:
+        """Open collection `name` only if it already exists on the --backend store; None otherwise."""
+        backend = vector_backend(args)
+        if backend == "numpy":
+            from search.adapters.numpy_user_vectors import numpy_collection_path
+
+            exists = os.path.isdir(numpy_collection_path(args.persist, name))
+        elif backend == "ivf":
+            from search.adapters.ivf_user_vectors import ivf_collection_path
+
+            exists = os.path.isdir(ivf_collection_path(args.persist, name))
+        else:
+            collection = get_collection(args.persist, name)
+            return None if collection is None else ChromaUserVectors(collection)
+        return self._open_collection(args, name, False, model, extra_meta) if exists else None
+
+    @staticmethod
+    def _drop_collection(persist: str, name: str, backend: str) -> bool:
+        if backend == "numpy":
+            from search.adapters.numpy_user_vectors import delete_numpy_collection
+
+            return delete_numpy_collection(persist, name)
+        if backend == "ivf":
+            from search.adapters.ivf_user_vectors import delete_ivf_collection
+
+            return delete_ivf_collection(persist, name)
+        return delete_collection(persist, name)
+
+    def open_index(self, args: argparse.Namespace) -> Tuple[VectorIndex, bool, int]:
+        """
+        Open (or reuse) the collection for `args` and make sure it reflects the dataset.
+        Each model + chunking configuration has its own collection, so switching between
+        configurations reopens an existing index instead of rebuilding one.
+        Returns (repo, reindexed, indexed_count).
+        """
+        extra_meta = chunking_settings(args)
+        model = self.embed_model(args)
+        name = self.collection_name(args)
+        key = (
+            args.persist, name, args.space, model, tuple(sorted(extra_meta.items())),
+            args.data, bool(args.normalize), int(args.min_chars), vector_backend(args),
+        )
+        with self._lock:
+            data_stat = _data_stat(args.data)
+            cached = self._indexes.get(key)
+            if cached is not None and not args.force_recreate and cached.data_stat == data_stat:
+                # Already registered when it was opened; serve requests never touch collections.json
+                return cached.repo, False, cached.count
+
+            repo, reindexed, count = self._open_and_sync(args, name, model, extra_meta)
+            self._indexes[key] = _OpenIndex(repo=repo, data_stat=data_stat, count=count)
+            self._register(args, name, extra_meta)
+            return repo, reindexed, count
+
+    def _open_and_sync(
+            self, args: argparse.Namespace, name: str, model: str, extra_meta: Dict[str, Any]
+    ) -> Tuple[VectorIndex, bool, int]:
+        """Open `name`, recreate it on chunking mismatch, and ingest unless the fingerprint matches."""
+        repo = self._open_collection(args, name, args.force_recreate, model, extra_meta)
+        reindexed = False
+        # If metadata does not match requested chunking settings, recreate collection
+        try:
+            if chunking_mismatch(repo.metadata or {}, extra_meta) and not args.force_recreate:
+                self._say("Chunking config changed; recreating collection to reindex embeddings.")
+                repo = self._open_collection(args, name, True, model, extra_meta)
+                reindexed = True
+        except Exception:
+            pass
+
+        # Skip ingestion entirely when this exact dataset was already ingested with these settings
+        ingest_settings = {
+            **extra_meta, "model": model, "normalize": bool(args.normalize), "min_chars": int(args.min_chars),
+        }
+        if getattr(args, "trusted_input", False):
+            # Trusted records keep their raw phone formatting, so they produce different metadata
+            ingest_settings["trusted_input"] = True
+        meta = repo.metadata or {}
+        fp = dataset_fingerprint(args.data, ingest_settings, previous=meta)
+        if not reindexed and not args.force_recreate and fingerprint_matches(meta, fp):
+            count = _as_int(meta.get("dataset_count"))
+            if any(meta.get(k) != fp[k] for k in ("dataset_path", "dataset_size", "dataset_mtime_ns")):
+                # Same content under a new path or mtime (touch, copy): record the new stat
+                # so the next open can reuse the digest instead of re-hashing the file
+                try:
+                    repo.update_metadata({**fp, "dataset_count": count})
+                except Exception:
+                    pass
+            # Settings such as --ivf-nlist may differ from the ones the index was trained with
+            self._train_index(repo)
+            self._report_index(repo, args)
+            return repo, False, count
+
+        embeddings = self.embeddings(args)
+        checkpoint = self._checkpoint(args, name, fp)
+        # A recreated collection holds none of the checkpointed windows
+        resume = bool(getattr(args, "resume", False)) and not reindexed and not args.force_recreate
+        try:
+            count, _ids = self._ingest(embeddings, repo, args, checkpoint=checkpoint, resume=resume)
+        except Exception as e:
+            if not _is_dimension_error(e):
+                raise
+            self._say("Embedding dimension mismatch detected; recreating collection and retrying.")
+            repo = self._open_collection(args, name, True, model, extra_meta)
+            # Stored vectors may have the old dimension too: embed everything afresh and overwrite them
+            count, _ids = self._ingest(
+                embeddings, repo, args, checkpoint=checkpoint, resume=False, refresh_store=True
+            )
+            reindexed = True
+        if fp is not None:
+            try:
+                repo.update_metadata({**fp, "dataset_count": count})
+            except Exception:
+                pass
+        self._train_index(repo)
+        self._report_index(repo, args)
+        return repo, reindexed, count
+
+    def _train_index(self, repo: VectorIndex) -> None:
+        """Train backends that need it (IVF) here, once per sync, so queries stay read-only."""
+        train_if_needed = getattr(repo, "train_if_needed", None)
+        if train_if_needed is not None and train_if_needed():
+            self._say(f"Trained index for {repo.name}.")
+
+    def _report_index(self, repo: VectorIndex, args: argparse.Namespace) -> None:
+        """With --verbose, print IVF build metrics and a sampled recall@10 against exact search."""
+        if not getattr(args, "verbose", False) or self._log is None or not hasattr(repo, "estimate_recall"):
+            return
+        stats = " ".join(f"{k}={v}" for k, v in repo.stats().items())
+        self._say(f"IVF index: {stats} recall@10={repo.estimate_recall(10):.3f}")
+
+    @staticmethod
+    def _checkpoint(
+            args: argparse.Namespace, name: str, fp: Dict[str, Any] | None
+    ) -> IngestCheckpoint | None:
+        """Checkpoint for ingesting this dataset into `name`; windows are only comparable with equal windowing."""
+        if fp is None:
+            return None
+        key = settings_digest({
+            "collection": name,
+            "dataset_digest": fp.get("dataset_digest"),
+            "ingest_settings": fp.get("ingest_settings"),
+            "window_size": int(getattr(args, "ingest_window", 2048) or 2048),
+            "parallel": int(getattr(args, "workers", 0) or 0) > 1,
+        })
+        return IngestCheckpoint(os.path.join(args.persist, "checkpoints", f"{name}.json"), key)
+
+    def vacuum_orphans(self, args: argparse.Namespace) -> Tuple[VectorIndex, List[str]]:
+        """
+        Delete orphaned chunk records from the existing collection without ingesting.
+        Raises LookupError if the collection does not exist; none is created.
+        """
+        from search.services.vacuum import vacuum_orphans
+
+        with self._lock:
+            name = self.collection_name(args)
+            repo = self._existing_collection(args, name, self.embed_model(args), chunking_settings(args))
+            if repo is None:
+                raise LookupError(f"No {vector_backend(args)} collection '{name}' under {args.persist}")
+            deleted = vacuum_orphans(repo, verbose=bool(getattr(args, "verbose", False)) and self._log is not None)
+            return repo, deleted
+
+    def _ingest(
+            self,
+            embeddings: EmbeddingsProvider,
+            repo: VectorIndex,
+            args: argparse.Namespace,
+            *,
+            checkpoint: IngestCheckpoint | None = None,
+            resume: bool = False,
+            refresh_store: bool = False,
+    ) -> Tuple[int, List[str]]:
+        from search.services.ingest_strategies import format_progress
+        from search.services.ingest_users import ingest
+
+        verbose = bool(getattr(args, "verbose", False)) and self._log is not None
+        store = self.embedding_store(args)
+        if refresh_store and store is not None:
+            store = _WriteOnlyStore(store)
+        return ingest(
+            embeddings,
+            repo,
+            args.data,
+            args.normalize,
+            args.min_chars,
+            embed_model=self.embed_model(args),
+            index_chunks=args.index_chunks,
+            sentences_per_chunk=args.sentences_per_chunk,
+            sentence_overlap=args.sentence_overlap,
+            chunking_mode=getattr(args, "chunking_mode", "sentence"),
+            tokens_per_chunk=getattr(args, "tokens_per_chunk", 200),
+            token_overlap=getattr(args, "token_overlap", 50),
+            verbose=verbose,
+            embedding_store=store,
+            embed_batch_size=getattr(args, "embed_batch_size", None),
+            embed_max_tokens=getattr(args, "embed_max_tokens", None),
+            window_size=int(getattr(args, "ingest_window", 2048) or 2048),
+            incremental=bool(getattr(args, "incremental", False)),
+            progress=(lambda p: self._say(format_progress(p))) if verbose else None,
+            pipeline=bool(getattr(args, "pipeline", False)),
+            pipeline_depth=int(getattr(args, "pipeline_depth", 2) or 2),
+            trusted_input=bool(getattr(args, "trusted_input", False)),
+            validation_cache=self.validation_cache(args),
+            workers=int(getattr(args, "workers", 0) or 0),
+            checkpoint=checkpoint,
+            resume=resume,
+            compact_chunks=compact_chunks(args),
+            parent_store=self.parent_store(args, repo.name),
+        )
+
+    def search(self, repo: VectorIndex, args: argparse.Namespace) -> Tuple[List[Row], List[float]]:
+        return svc_search(
+            self.query_embeddings(args),
+            repo,
+            args.query,
+            args.k,
+            phrase_prefilter=args.phrase_prefilter,
+            threshold=args.threshold,
+            normalize=args.normalize,
+            index_chunks=args.index_chunks,
+            chunk_query_multiplier=args.chunk_query_multiplier,
+            parents=self.parent_store(args, repo.name),
+            **query_options(args),
+        )
+
+    def search_many(
+            self, repo: VectorIndex, args: argparse.Namespace, queries: Iterable[str]
+    ) -> Iterator[Tuple[List[Row], List[float]]]:
+        return svc_search_many(
+            self.query_embeddings(args),
+            repo,
+            queries,
+            args.k,
+            phrase_prefilter=args.phrase_prefilter,
+            threshold=args.threshold,
+            normalize=args.normalize,
+            index_chunks=args.index_chunks,
+            chunk_query_multiplier=args.chunk_query_multiplier,
+            batch_size=args.query_batch_size,
+            parents=self.parent_store(args, repo.name),
+            **query_options(args),
+        )
@@ -0,0 +1,99 @@
+from pathlib import Path
+from typing import List
+
+from search.adapters.cached_embeddings import CachedEmbeddings
+from search.adapters.sqlite_embedding_store import SqliteEmbeddingStore
+
+
+class CountingEmbeddings:
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.25] for t in texts]
+
+
+def test_memory_tier_serves_repeats_and_collapses_duplicates():
+    inner = CountingEmbeddings()
+    emb = CachedEmbeddings(inner, "m", max_memory_items=2)
+    assert emb.embed_texts(["bike", "bike ", "music"]) == [[4.0, 0.25], [4.0, 0.25], [5.0, 0.25]]
+    # whitespace-normalized duplicates are embedded once
+    assert inner.calls == [["bike", "music"]]
+
+    assert emb.embed_texts(["music", "bike"]) == [[5.0, 0.25], [4.0, 0.25]]
+    assert len(inner.calls) == 1
+    assert emb.stats()["memory_hits"] == 2 and emb.stats()["misses"] == 2
+
+    # LRU: "travel" evicts the least recently used entry ("music")
+    emb.embed_texts(["travel"])
+    emb.embed_texts(["music"])
+    assert inner.calls[-1] == ["music"]
+
+
+def test_disk_tier_survives_new_instances(tmp_path: Path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = CachedEmbeddings(CountingEmbeddings(), "m", store=SqliteEmbeddingStore(path))
+    first.embed_texts(["bike"])
+
+    inner = CountingEmbeddings()
+    second = CachedEmbeddings(inner, "m", store=SqliteEmbeddingStore(path))
+    assert second.embed_texts(["bike"]) == [[4.0, 0.25]]
+    assert inner.calls == []
+    assert second.stats()["disk_hits"] == 1
+
+    # keyed by model: another model misses
+    other = CachedEmbeddings(inner, "other", store=SqliteEmbeddingStore(path))
+    other.embed_texts(["bike"])
+    assert inner.calls == [["bike"]]
+
+
+def test_sqlite_store_evicts_least_recently_used(tmp_path: Path):
+    store = SqliteEmbeddingStore(str(tmp_path / "s.sqlite3"), max_entries=2)
+    store.put_many("m", {"a": [1.0]})
+    store.put_many("m", {"b": [2.0]})
+    assert store.get_many("m", ["a"]) == {"a": [1.0]}  # touch "a"
+    store.put_many("m", {"c": [3.0]})
+    assert len(store) == 2
+    assert store.get_many("m", ["a", "b", "c"]) == {"a": [1.0], "c": [3.0]}
+
+
+def test_sqlite_store_keeps_float32_and_reads_float64_rows(tmp_path: Path):
+    import sqlite3
+    from array import array
+
+    path = str(tmp_path / "s.sqlite3")
+    conn = sqlite3.connect(path)
+    # Layout written by earlier versions: float64 blobs and no width column
+    conn.execute("CREATE TABLE embeddings (model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+                 " last_used REAL NOT NULL, PRIMARY KEY (model, text_hash))")
+    conn.execute("INSERT INTO embeddings VALUES ('m', 'old', ?, 0)", (array("d", [0.1, 2.0]).tobytes(),))
+    conn.commit()
+    conn.close()
+
+    store = SqliteEmbeddingStore(path)
+    store.put_many("m", {"new": [0.1, 2.0, -3.5]})
+    got = store.get_many("m", ["old", "new"])
+    assert got["old"] == [0.1, 2.0]
+    assert got["new"] == [array("f", [0.1])[0], 2.0, -3.5]
+    store.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT length(vector) FROM embeddings WHERE text_hash = 'new'").fetchone() == (12,)
+
+
+def test_sqlite_store_evicts_without_counting_the_table(tmp_path: Path):
+    path = str(tmp_path / "s.sqlite3")
+    SqliteEmbeddingStore(path).put_many("m", {"old": [0.5]})
+    store = SqliteEmbeddingStore(path, max_entries=3)
+    statements: List[str] = []
+    store._conn.set_trace_callback(statements.append)
+    for _ in range(3):
+        # Rewriting a key replaces it and does not count as a new entry
+        store.put_many("m", {"a": [1.0], "b": [2.0]})
+    store.put_many("m", {"c": [3.0]})
+    store._conn.set_trace_callback(None)
+    assert statements and not any("COUNT(" in s for s in statements)
+
+    assert len(store) == 3
+    assert store.get_many("m", ["old", "a", "b", "c"]) == {"a": [1.0], "b": [2.0], "c": [3.0]}
@@ -5,12 +5,14 @@ chromadb = pytest.importorskip("chromadb")
 from typing import Any, Dict, List
 
 from search.adapters.chroma_user_vectors import ChromaUserVectors
+from search.ports.user_vectors import IDS_ONLY
 
 
 class FakeCollection:
     def __init__(self):
         self._deleted: List[str] = []
         self._added: Dict[str, Any] = {}
+        self.adds: List[Dict[str, Any]] = []
         self.name = "users"
         self._metadata = {"hnsw:space": "cosine", "model": "m"}
 
@@ -23,8 +25,17 @@ class FakeCollection:
 
     def add(self, **kwargs):
         self._added = kwargs
+        self.adds.append(kwargs)
 
     def query(self, **kwargs):
+        if len(kwargs["query_embeddings"]) > 1:
+            n = len(kwargs["query_embeddings"])
+            return {
+                "ids": [[f"x{i}"] for i in range(n)],
+                "documents": [[f"doc {i}"] for i in range(n)],
+                "distances": [[0.1 * i] for i in range(n)],
+                "metadatas": [[{"i": i}] for i in range(n)],
+            }
         # Fake a single-row response
         return {
             "ids": [["x"]],
@@ -60,3 +71,61 @@ def test_chroma_user_vectors_upsert_and_query_and_get():
     assert "x" in got and got["x"]["metadata"] == {"a": 1}
     assert got["x"]["embedding"] == [0.1, 0.2]
 
+
+def test_chroma_user_vectors_query_many_splits_batched_result():
+    repo = ChromaUserVectors(FakeCollection())
+    out = repo.query_many([[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]], k=1)
+    assert [rows for rows, _ in out] == [
+        [("x0", 0.0, "doc 0", {"i": 0})],
+        [("x1", 0.1, "doc 1", {"i": 1})],
+        [("x2", 0.2, "doc 2", {"i": 2})],
+    ]
+    assert repo.query_many([], k=1) == []
+
+
+def test_chroma_user_vectors_fetches_embeddings_only_when_asked(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    repo = ChromaUserVectors(client.create_collection("users"))
+    repo.upsert(["a", "b"], ["A", "B"], [[1.0, 0.0], [0.0, 1.0]], [{"n": 0}, {"n": 1}])
+
+    calls: List[Dict[str, Any]] = []
+    query = repo._col.query
+    repo._col.query = lambda **kw: calls.append(kw) or query(**kw)
+    rows, _ = repo.query([1.0, 0.1], k=2)
+    [(rows_e, embs)] = repo.query_many_with_embeddings([[1.0, 0.1]], k=2)
+    assert "embeddings" not in calls[0]["include"] and "embeddings" in calls[1]["include"]
+    assert rows_e == rows and [list(e) for e in embs] == [[1.0, 0.0], [0.0, 1.0]]
+
+    # Projection: ids and distances only, then documents for chosen ids
+    light, dists = repo.query([1.0, 0.1], k=2, include=IDS_ONLY)
+    assert calls[-1]["include"] == ["distances"]
+    assert [(r[0], r[2], r[3]) for r in light] == [("a", "", {}), ("b", "", {})] and dists == [r[1] for r in rows]
+    assert repo.get_by_ids(["b"], include_documents=True) == {"b": {"metadata": {"n": 1}, "document": "B"}}
+
+
+def test_chroma_user_vectors_delete_and_iter_metadata(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    repo = ChromaUserVectors(client.create_collection("users"))
+    ids = [f"u{i}" for i in range(5)]
+    repo.upsert(ids, ids, [[float(i), 1.0] for i in range(5)], [{"n": i} for i in range(5)])
+
+    assert sorted(repo.iter_metadata(page_size=2)) == [(f"u{i}", {"n": i}) for i in range(5)]
+    repo.delete(["u1", "u3", "missing"])
+    assert sorted(rid for rid, _ in repo.iter_metadata()) == ["u0", "u2", "u4"]
+
+
+def test_chroma_user_vectors_upsert_caps_batch_size():
+    col = FakeCollection()
+    repo = ChromaUserVectors(col, max_batch_size=2)
+    ids = ["a", "b", "c", "d", "e"]
+    repo.upsert(ids, [i.upper() for i in ids], [[float(n)] for n in range(5)], [{"n": n} for n in range(5)])
+    assert [a["ids"] for a in col.adds] == [["a", "b"], ["c", "d"], ["e"]]
+    assert col.adds[2] == {"ids": ["e"], "documents": ["E"], "embeddings": [[4.0]], "metadatas": [{"n": 4}]}
+    # Without a client limit the adapter falls back to a conservative default
+    assert ChromaUserVectors(FakeCollection()).max_batch_size == 1000
+
+
+def test_chroma_user_vectors_max_batch_size_from_client(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    repo = ChromaUserVectors(client.create_collection("users"))
+    assert repo.max_batch_size == client.get_max_batch_size()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from search.adapters.ivf_user_vectors import IvfUserVectors, auto_nlist, delete_ivf_collection, open_ivf_collection
+
+
+def _clustered(n: int, dim: int = 16, clusters: int = 12, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)) * 4
+    vecs = (centers[rng.integers(0, clusters, n)] + rng.normal(size=(n, dim))).astype(np.float32)
+    return [f"u{i}" for i in range(n)], vecs
+
+
+def _insert(repo, ids, vecs, window: int = 256):
+    for s in range(0, len(ids), window):
+        part = ids[s: s + window]
+        repo.upsert(part, [f"doc {i}" for i in part], vecs[s: s + window].tolist(), [{"id": i} for i in part])
+    repo.train_if_needed()
+
+
+@pytest.mark.parametrize("space", ["cosine", "l2", "ip"])
+def test_probed_search_tracks_exact_search(tmp_path, space):
+    ids, vecs = _clustered(2000)
+    repo = open_ivf_collection(str(tmp_path), "users", space=space, model="m", nprobe=4, min_train=500)
+    _insert(repo, ids, vecs)
+    assert repo.trained
+
+    stats = repo.stats()
+    assert stats["nlist"] == auto_nlist(stats["trained_size"]) and stats["build_seconds"] >= 0
+    assert stats["bytes_per_vector"] > 4 * 16 + 8
+    assert repo.estimate_recall(k=10, queries=50) >= 0.9
+
+    rows, dists = repo.query(vecs[3].tolist(), 5)
+    assert dists == sorted(dists)
+    # Under ip a longer vector can out-score the query vector itself
+    assert space == "ip" or rows[0][0] == "u3"
+
+    # The binary first pass shortlists within the probed lists; a wide shortlist keeps them all
+    queries = vecs[:5].tolist()
+    assert repo.query_many_quantized(queries, 5, oversample=1000) == repo.query_many(queries, 5)
+
+
+def test_new_vectors_are_assigned_incrementally_and_survive_reopen(tmp_path):
+    ids, vecs = _clustered(1200)
+    repo = open_ivf_collection(str(tmp_path), "users", space="l2", model="m", min_train=1000, retrain_growth=10)
+    _insert(repo, ids[:1000], vecs[:1000])
+    assert repo.trained and repo.stats()["trained_size"] == 1000
+
+    _insert(repo, ids[1000:], vecs[1000:])
+    # No retrain below the growth factor; the new rows joined existing lists
+    assert repo.stats()["trained_size"] == 1000 and repo.stats()["vectors"] == 1200
+    assert repo.query(vecs[1100].tolist(), 1)[0][0][0] == "u1100"
+
+    repo.delete(["u1100"])
+    reopened = IvfUserVectors(repo.path, nprobe=repo.nprobe, min_train=1000, retrain_growth=10)
+    assert reopened.trained and len(reopened) == 1199
+    assert reopened.query(vecs[1100].tolist(), 1)[0][0][0] != "u1100"
+    rows, _ = reopened.query(vecs[5].tolist(), 3, where_document="doc u5")
+    assert [r[0] for r in rows][0] == "u5" and all(r[0].startswith("u5") for r in rows)
+
+    # Changing nlist retrains at the next explicit training step, never in a query
+    fixed = IvfUserVectors(repo.path, nlist=7, min_train=1000)
+    fixed.query(vecs[0].tolist(), 1)
+    assert fixed.stats()["nlist"] != 7
+    assert fixed.train_if_needed() and fixed.stats()["nlist"] == 7
+    assert not fixed.train_if_needed()
+    assert delete_ivf_collection(str(tmp_path), "users")
+
+
+def test_queries_never_train(tmp_path):
+    ids, vecs = _clustered(600)
+    repo = open_ivf_collection(str(tmp_path), "users", model="m", min_train=500)
+    for s in range(0, len(ids), 200):
+        repo.upsert(ids[s: s + 200], ids[s: s + 200], vecs[s: s + 200].tolist())
+    assert repo.needs_training() and not repo.trained
+    # Untrained queries are exact and leave the index as it was
+    assert repo.query(vecs[7].tolist(), 1)[0][0][0] == "u7"
+    assert repo.query_many_quantized([vecs[8].tolist()], 1, oversample=8)[0][0][0][0] == "u8"
+    assert not repo.trained
+
+
+def test_small_collections_stay_exact(tmp_path):
+    ids, vecs = _clustered(100)
+    repo = open_ivf_collection(str(tmp_path), "users", model="m", min_train=500)
+    _insert(repo, ids, vecs)
+    assert not repo.trained and repo.stats()["trained"] is False
+    assert repo.query(vecs[42].tolist(), 1)[0][0][0] == "u42"
@@ -0,0 +1,32 @@
+import math
+
+from search.adapters.local_embeddings import LocalEmbeddings, gaussian_latency
+
+
+def _cos(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_local_embeddings_are_deterministic_and_normalized():
+    emb = LocalEmbeddings(64)
+    a, b = emb.embed_texts(["Python developer in Berlin", "Python developer in Berlin"])
+    assert a == b
+    assert len(a) == 64
+    assert math.isclose(math.sqrt(sum(x * x for x in a)), 1.0, rel_tol=1e-9)
+    assert LocalEmbeddings(64).embed_texts(["Python developer in Berlin"])[0] == a
+    assert emb.model_name == "local-ngram3-64"
+
+
+def test_local_embeddings_similar_texts_are_closer():
+    emb = LocalEmbeddings(256)
+    q, near, far = emb.embed_texts(["python backend engineer", "senior python engineer", "watercolor painting"])
+    assert _cos(q, near) > _cos(q, far)
+
+
+def test_local_embeddings_empty_text_and_latency():
+    slept = []
+    emb = LocalEmbeddings(8, latency=gaussian_latency(20.0), sleep=slept.append)
+    (vec,) = emb.embed_texts([""])
+    assert any(vec)
+    assert emb.embed_texts([]) == []
+    assert slept == [0.02]
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from search.adapters.numpy_user_vectors import (
+    DimensionMismatchError,
+    NumpyUserVectors,
+    delete_numpy_collection,
+    open_numpy_collection,
+)
+from search.ports.user_vectors import IDS_ONLY, WITH_METADATA
+
+
+def _data(n: int = 40, dim: int = 8, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(size=(n, dim)).astype(np.float32)
+    ids = [f"u{i}" for i in range(n)]
+    docs = [f"doc {i} {'even' if i % 2 == 0 else 'odd'}" for i in range(n)]
+    metas = [{"i": i} for i in range(n)]
+    return ids, docs, vecs, metas
+
+
+@pytest.mark.parametrize("space", ["cosine", "l2", "ip"])
+def test_distances_match_chroma_spaces(tmp_path, space):
+    chromadb = pytest.importorskip("chromadb")
+    from search.adapters.chroma_user_vectors import ChromaUserVectors, get_or_create_collection
+
+    ids, docs, vecs, metas = _data()
+    rng = np.random.default_rng(1)
+    queries = rng.normal(size=(3, vecs.shape[1])).astype(np.float32).tolist()
+
+    npy = open_numpy_collection(str(tmp_path), "users", space=space, model="m")
+    npy.upsert(ids, docs, vecs.tolist(), metas)
+    chroma = ChromaUserVectors(get_or_create_collection(str(tmp_path / "chroma"), "users", space=space, model="m"))
+    chroma.upsert(ids, docs, vecs.tolist(), metas)
+
+    for (rows_n, d_n), (rows_c, d_c) in zip(npy.query_many(queries, 5), chroma.query_many(queries, 5)):
+        assert [r[0] for r in rows_n] == [r[0] for r in rows_c]
+        assert np.allclose(d_n, d_c, atol=1e-4)
+        assert rows_n[0][2:] == rows_c[0][2:]
+
+
+def test_upsert_delete_reopen_and_filters(tmp_path):
+    ids, docs, vecs, metas = _data(n=1500)
+    repo = open_numpy_collection(str(tmp_path), "users", space="l2", model="m", extra_meta={"index_chunks": False})
+    repo.upsert(ids, docs, vecs.tolist(), metas)
+
+    # Exact: the nearest neighbour of a stored vector is itself, at distance 0
+    rows, dists = repo.query(vecs[7].tolist(), 3)
+    assert rows[0][0] == "u7" and dists[0] == pytest.approx(0.0, abs=1e-4)
+    assert dists == sorted(dists)
+    rows, _ = repo.query(vecs[7].tolist(), 3, where_document="odd")
+    assert all(int(r[0][1:]) % 2 == 1 for r in rows)
+
+    # Overwrite one, delete others; freed rows are reused
+    repo.upsert(["u7"], ["new doc"], [(vecs[7] * 2).tolist()], [{"i": "seven"}])
+    repo.delete(["u1", "u2", "missing"])
+    repo.upsert(["extra"], ["extra doc"], [vecs[1].tolist()], [{"i": -1}])
+    repo.update_metadata({"dataset_count": 1499, "hnsw:space": "ip"})
+
+    reopened = NumpyUserVectors(repo.path)
+    assert len(reopened) == 1499
+    assert reopened.metadata == {"hnsw:space": "l2", "model": "m", "index_chunks": False, "dataset_count": 1499}
+    got = reopened.get_by_ids(["u7", "u1", "extra"], include_embeddings=True)
+    assert set(got) == {"u7", "extra"} and got["u7"]["metadata"] == {"i": "seven"}
+    assert np.allclose(got["u7"]["embedding"], vecs[7] * 2)
+    assert reopened.query(vecs[1].tolist(), 1)[0][0][0] == "extra"
+    assert sorted(rid for rid, _ in reopened.iter_metadata(page_size=100)) == sorted(
+        [i for i in ids if i not in ("u1", "u2")] + ["extra"]
+    )
+
+    with pytest.raises(DimensionMismatchError):
+        reopened.upsert(["bad"], [""], [[1.0, 2.0]], [{}])
+    assert delete_numpy_collection(str(tmp_path), "users")
+    assert not delete_numpy_collection(str(tmp_path), "users")
+
+
+def test_empty_collection_returns_no_rows(tmp_path):
+    repo = open_numpy_collection(str(tmp_path), "users")
+    assert repo.query([1.0, 0.0], 3) == ([], [])
+    assert repo.get_by_ids(["x"]) == {}
+
+
+def test_quantized_first_pass_reranks_exactly(tmp_path):
+    ids, docs, noise, metas = _data(n=3000, dim=64)
+    # Clustered, like real embeddings; sign bits say little about near-ties in pure noise
+    vecs = np.repeat(np.random.default_rng(2).normal(size=(30, 64)), 100, axis=0).astype(np.float32) + 0.5 * noise
+    repo = open_numpy_collection(str(tmp_path), "users", model="m")
+    repo.upsert(ids, docs, vecs.tolist(), metas)
+    queries = (vecs[:20] + 0.1).tolist()
+
+    exact = repo.query_many(queries, 10)
+    # A shortlist as large as the collection degenerates to exact search
+    for (rows_q, d_q), (rows_e, d_e) in zip(repo.query_many_quantized(queries, 10, oversample=300), exact):
+        assert [r[0] for r in rows_q] == [r[0] for r in rows_e] and np.allclose(d_q, d_e, atol=1e-5)
+    approx = repo.query_many_quantized(queries, 10, oversample=8)
+    recall = np.mean([
+        len({r[0] for r in a} & {r[0] for r in e}) / 10 for (a, _), (e, _) in zip(approx, exact)
+    ])
+    assert recall >= 0.8
+    # Distances of the re-ranked rows are exact
+    rows, dists = approx[0]
+    cos = vecs[[int(r[0][1:]) for r in rows]] @ np.asarray(queries[0]) / (
+        np.linalg.norm(vecs[[int(r[0][1:]) for r in rows]], axis=1) * np.linalg.norm(queries[0]))
+    assert np.allclose(dists, 1.0 - cos, atol=1e-4)
+
+    rows, _ = repo.query_quantized(queries[0], 5, where_document="odd")
+    assert rows and all(int(r[0][1:]) % 2 == 1 for r in rows)
+
+    # Collections written before codes existed get them packed on open
+    (tmp_path / "numpy" / "users" / "codes.npy").unlink()
+    reopened = NumpyUserVectors(repo.path)
+    assert reopened.query_many_quantized(queries, 10, oversample=8) == approx
+
+
+def test_quantized_first_pass_without_bitwise_count(tmp_path, monkeypatch):
+    ids, docs, vecs, metas = _data(n=500, dim=100)
+    repo = open_numpy_collection(str(tmp_path), "users", model="m")
+    repo.upsert(ids, docs, vecs.tolist(), metas)
+    queries = vecs[:5].tolist()
+    expected = repo.query_many_quantized(queries, 5, oversample=4)
+
+    # NumPy 1.x has no np.bitwise_count; the byte lookup table must rank identically
+    monkeypatch.delattr(np, "bitwise_count", raising=False)
+    assert repo.query_many_quantized(queries, 5, oversample=4) == expected
+
+
+def test_query_projection_and_documents_by_id(tmp_path):
+    ids, docs, vecs, metas = _data()
+    repo = open_numpy_collection(str(tmp_path), "users", model="m")
+    repo.upsert(ids, docs, vecs.tolist(), metas)
+
+    full, _ = repo.query(vecs[3].tolist(), 2)
+    light, dists = repo.query(vecs[3].tolist(), 2, include=IDS_ONLY)
+    assert [r[0] for r in light] == [r[0] for r in full] and dists == [r[1] for r in full]
+    assert all(r[2:] == ("", {}) for r in light)
+    meta_only, _ = repo.query(vecs[3].tolist(), 1, include=WITH_METADATA)
+    assert meta_only[0][2:] == ("", {"i": 3})
+
+    got = repo.get_by_ids(["u3"], include_documents=True)
+    assert got["u3"] == {"metadata": {"i": 3}, "document": "doc 3 odd"}
+    assert "document" not in repo.get_by_ids(["u3"])["u3"]
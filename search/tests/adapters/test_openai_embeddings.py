@@ -24,3 +24,63 @@ def test_openai_embeddings_wraps_client():
     out = emb.embed_texts(["a", "abcd"])  # -> [[1.0], [4.0]]
     assert out == [[1.0], [4.0]]
 
+
+class StatusError(Exception):
+    def __init__(self, status_code: int, retry_after: str | None = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": retry_after} if retry_after is not None else {}
+        self.response = type("R", (), {"headers": headers})()
+
+
+class FlakyClient:
+    """Fails the first `failures[text]` calls for a batch starting with `text`."""
+
+    def __init__(self, failures, status: int = 429, retry_after: str | None = None):
+        self.failures = dict(failures)
+        self.status = status
+        self.retry_after = retry_after
+        self.requests = []
+        self.embeddings = self
+
+    def create(self, model: str, input, encoding_format: str = "float"):
+        texts = list(input)
+        self.requests.append(texts)
+        if self.failures.get(texts[0], 0) > 0:
+            self.failures[texts[0]] -= 1
+            raise StatusError(self.status, self.retry_after)
+        return DummyResp([[float(len(t))] for t in texts])
+
+
+def test_openai_embeddings_batches_concurrently_in_order():
+    client = FlakyClient({})
+    emb = OpenAIEmbeddings(client, model="m", batch_size=2, max_concurrency=3)
+    texts = ["a" * n for n in range(1, 8)]
+    assert emb.embed_texts(texts) == [[float(n)] for n in range(1, 8)]
+    assert sorted(len(r) for r in client.requests) == [1, 2, 2, 2]
+
+
+def test_openai_embeddings_retries_throttling_and_backs_off():
+    sleeps = []
+    client = FlakyClient({"b": 2}, retry_after="1.5")
+    emb = OpenAIEmbeddings(client, model="m", batch_size=1, max_concurrency=4, sleep=sleeps.append)
+    assert emb.embed_texts(["a", "b"]) == [[1.0], [1.0]]
+    assert sleeps == [1.5, 1.5]
+    # 429 halved the in-flight limit (repeat signals within the cooldown count once)
+    assert emb.concurrency_limit < 4
+
+
+def test_openai_embeddings_does_not_retry_client_errors():
+    client = FlakyClient({"a": 1}, status=400)
+    emb = OpenAIEmbeddings(client, model="m", sleep=lambda s: None)
+    with pytest.raises(StatusError):
+        emb.embed_texts(["a"])
+    assert len(client.requests) == 1
+
+
+def test_openai_embeddings_gives_up_after_max_retries():
+    client = FlakyClient({"a": 10}, status=503)
+    emb = OpenAIEmbeddings(client, model="m", max_retries=2, sleep=lambda s: None)
+    with pytest.raises(StatusError):
+        emb.embed_texts(["a"])
+    assert len(client.requests) == 3
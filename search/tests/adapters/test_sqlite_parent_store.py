@@ -0,0 +1,25 @@
+import pickle
+
+from search.adapters.sqlite_parent_store import SqliteParentStore
+
+
+def test_records_are_scoped_to_their_collection(tmp_path):
+    path = str(tmp_path / "parents.sqlite3")
+    a, b = SqliteParentStore(path, "users-a"), SqliteParentStore(path, "users-b")
+    rec = {"description": "Likes tea.", "document": "doc", "metadata": {"first_name": "Ann"}}
+    a.put_many({"ann": rec, "bob": {**rec, "description": "Bikes."}})
+    b.put_many({"ann": {**rec, "description": "Other."}})
+
+    assert a.get_many(["ann", "missing"]) == {"ann": rec}
+    assert b.get_many(["ann"])["ann"]["description"] == "Other."
+    a.delete(["bob", "unknown"])
+    assert len(a) == 1
+    a.clear()
+    assert len(a) == 0 and len(b) == 1
+
+
+def test_pickled_store_reopens_the_same_file(tmp_path):
+    store = SqliteParentStore(str(tmp_path / "parents.sqlite3"), "users")
+    store.put_many({"ann": {"description": "Likes tea.", "document": "", "metadata": {}}})
+    copy = pickle.loads(pickle.dumps(store))
+    assert copy.get_many(["ann"])["ann"]["description"] == "Likes tea."
@@ -22,7 +22,7 @@ class FakeRepo:
     def upsert(self, ids, documents, vectors, metadatas=None):
         raise NotImplementedError
 
-    def query(self, vector: List[float], k: int, where_document: str | None = None):
+    def query(self, vector: List[float], k: int, where_document: str | None = None, include=None):
         # Ignore the vector and where_document for this offline test.
         # Return the top-k rows and dummy distances list.
         sel = self._rows[: max(1, k)]
@@ -0,0 +1,68 @@
+import threading
+from typing import Any, Dict, List
+
+import pytest
+
+from search.services.ingest_pipeline import run_pipeline
+from search.services.ingest_strategies import IngestPayloads, WholeDocStrategy
+
+
+def _windows(n: int, size: int = 2) -> List[IngestPayloads]:
+    out = []
+    for w in range(n):
+        ids = [f"u{w}_{i}" for i in range(size)]
+        out.append(IngestPayloads(ids=ids, descriptions=[f"text {r}" for r in ids],
+                                  documents=list(ids), metadatas=[{} for _ in ids]))
+    return out
+
+
+class Embeddings:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.second_call = threading.Event()
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.calls == 2:
+            self.second_call.set()
+        return [[1.0, 0.0] for _ in texts]
+
+
+class Repo:
+    def __init__(self, wait_for: threading.Event | None = None) -> None:
+        self.upserts: List[List[str]] = []
+        self.wait_for = wait_for
+        self.overlapped = False
+
+    def upsert(self, ids, documents, vectors, metadatas=None):
+        if self.wait_for is not None and not self.upserts:
+            # The first write blocks until the next window is being embedded
+            self.overlapped = self.wait_for.wait(timeout=5)
+        self.upserts.append(list(ids))
+
+    def get_by_ids(self, ids, include_embeddings=False) -> Dict[str, Any]:
+        return {}
+
+
+def test_pipeline_writes_windows_in_order():
+    repo = Repo()
+    count, ids = run_pipeline(WholeDocStrategy(), Embeddings(), repo, iter(_windows(5)), embed_model="m")
+    assert count == 10
+    assert ids == [f"u{w}_{i}" for w in range(5) for i in range(2)]
+    assert repo.upserts == [[f"u{w}_0", f"u{w}_1"] for w in range(5)]
+
+
+def test_pipeline_embeds_next_window_while_writing():
+    emb = Embeddings()
+    repo = Repo(wait_for=emb.second_call)
+    run_pipeline(WholeDocStrategy(), emb, repo, iter(_windows(3)), embed_model="m", depth=1)
+    assert repo.overlapped
+
+
+def test_pipeline_propagates_stage_errors():
+    class Failing(Embeddings):
+        def embed_texts(self, texts):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        run_pipeline(WholeDocStrategy(), Failing(), Repo(), iter(_windows(4)), embed_model="m")
@@ -1,5 +1,7 @@
 from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
 
+import pytest
+
 from search.services.ingest_strategies import (
     IngestPayloads,
     WholeDocStrategy,
@@ -33,7 +35,7 @@ class FakeRepo:
     def upsert(self, ids, documents, vectors, metadatas=None):
         self.upserts.append((list(ids), list(documents), list(vectors), list(metadatas or [])))
 
-    def query(self, vector: List[float], k: int, where_document: str | None = None):
+    def query(self, vector: List[float], k: int, where_document: str | None = None, include=None):
         raise NotImplementedError
 
     def get_by_ids(self, ids: List[str], include_embeddings: bool = False):
@@ -115,3 +117,137 @@ def test_token_chunk_strategy_overlap_and_ids():
     assert metas[0]["chunk_kind"] == "token"
     assert metas[0]["chunk_text"].startswith("alpha beta")
 
+
+class DictStore:
+    def __init__(self, items: Dict[Tuple[str, str], List[float]] | None = None) -> None:
+        self.items = dict(items or {})
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        return {h: self.items[(model, h)] for h in hashes if (model, h) in self.items}
+
+    def put_many(self, model: str, vectors: Mapping[str, List[float]]) -> None:
+        for h, v in vectors.items():
+            self.items[(model, h)] = list(v)
+
+
+def test_embedding_store_consulted_before_provider():
+    ids = ["p1"]
+    payloads = IngestPayloads(ids=ids, descriptions=["One. Two."], documents=[""], metadatas=[{}])
+    store = DictStore({("m", hash_text("One.")): [0.3, 0.3, 0.3]})
+    emb = FakeEmbeddings()
+    repo = FakeRepo()
+    strat = ChunkedStrategy(sentences_per_chunk=1, sentence_overlap=0, embedding_store=store)
+    strat.run(embeddings=emb, repo=repo, payloads=payloads, embed_model="m", verbose=True)
+
+    # Only the unseen chunk goes to the provider; it is then remembered by content
+    assert emb.calls == [["Two."]]
+    _ids, _docs, vectors, _metas = repo.upserts[-1]
+    assert vectors == [[0.3, 0.3, 0.3], [1.0, 1.0, 1.0]]
+    assert store.items[("m", hash_text("Two."))] == [1.0, 1.0, 1.0]
+
+    # A fresh (recreated) collection re-embeds nothing
+    emb2 = FakeEmbeddings()
+    strat.run(embeddings=emb2, repo=FakeRepo(), payloads=payloads, embed_model="m")
+    assert emb2.calls == []
+
+
+class BatchRecordingEmbeddings(FakeEmbeddings):
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches: List[List[List[str]]] = []
+
+    def embed_batches(self, batches: List[List[str]]) -> List[List[List[float]]]:
+        self.batches.append([list(b) for b in batches])
+        return [self.embed_texts(b) for b in batches]
+
+
+def test_token_budget_packs_embedding_requests():
+    descs = ["x" * 400, "y" * 40, "z" * 40, "w" * 40]  # ~100, 10, 10, 10 tokens
+    payloads = IngestPayloads(
+        ids=["a", "b", "c", "d"], descriptions=descs, documents=[""] * 4, metadatas=[{}, {}, {}, {}]
+    )
+    emb = BatchRecordingEmbeddings()
+    WholeDocStrategy(embed_max_tokens=100, embed_batch_size=2).run(
+        embeddings=emb, repo=FakeRepo(), payloads=payloads, embed_model="m"
+    )
+    assert emb.batches == [[[descs[0]], descs[1:3], descs[3:]]]
+
+
+def test_duplicate_texts_embedded_once_and_fanned_out(capsys):
+    ids = ["u1", "u2", "u3"]
+    descs = ["Same template. Unique one.", "Same template. Unique two.", "Same template."]
+    payloads = IngestPayloads(ids=ids, descriptions=descs, documents=[""] * 3, metadatas=[{}, {}, {}])
+    emb = FakeEmbeddings()
+    repo = FakeRepo()
+    ChunkedStrategy(sentences_per_chunk=1, sentence_overlap=0).run(
+        embeddings=emb, repo=repo, payloads=payloads, embed_model="m", verbose=True
+    )
+    assert emb.calls == [["Same template.", "Unique one.", "Unique two."]]
+    up_ids, _docs, vectors, _metas = repo.upserts[-1]
+    assert len(up_ids) == len(vectors) == 5 and all(v == [1.0, 1.0, 1.0] for v in vectors)
+    # Fanned-out vectors are independent lists
+    vectors[0].append(9.9)
+    assert vectors[2] == [1.0, 1.0, 1.0]
+    assert "texts=5, unique=3, ratio=1.67x" in capsys.readouterr().out
+
+
+def test_progress_callback_reports_cumulative_counters():
+    reports = []
+    strat = ChunkedStrategy(sentences_per_chunk=1, sentence_overlap=0,
+                            progress_callback=lambda p: reports.append((p.parents, p.records)))
+    repo = FakeRepo()
+    strat.run(FakeEmbeddings(), repo, _payloads(), embed_model="m")
+    strat.run(FakeEmbeddings(), repo, _payloads(), embed_model="m")
+    assert reports == [(2, 2), (4, 4)]
+    p = strat.progress
+    assert p.embed_seconds >= 0 and p.write_seconds >= 0
+    assert p.elapsed_seconds > 0 and p.records_per_second > 0
+
+
+class DictParents:
+    def __init__(self) -> None:
+        self.records: Dict[str, Dict[str, Any]] = {}
+
+    def put_many(self, records):
+        self.records.update(records)
+
+    def get_many(self, ids):
+        return {i: self.records[i] for i in ids if i in self.records}
+
+    def delete(self, ids):
+        for i in ids:
+            self.records.pop(i, None)
+
+
+def test_compact_chunks_reference_parent_by_offsets():
+    desc = "Hiking  in the hills.\nBakes bread! Plays chess?"
+    parent_meta = {"first_name": "Ann", "email": "ann@x.io", "embed_hash": hash_text(desc)}
+    payloads = IngestPayloads(ids=["p1"], descriptions=[desc], documents=["full doc"], metadatas=[parent_meta])
+    repo, parents = FakeRepo(), DictParents()
+    strat = ChunkedStrategy(sentences_per_chunk=2, sentence_overlap=1, compact=True, parent_store=parents)
+    strat.run(embeddings=FakeEmbeddings(), repo=repo, payloads=payloads, embed_model="m")
+
+    up_ids, docs, _vectors, metas = repo.upserts[-1]
+    assert up_ids == ["p1#c0000", "p1#c0001"]
+    # Chunk records hold no parent fields or text copies; offsets point into the description
+    assert docs == ["Hiking  in the hills. Bakes bread!", "Bakes bread! Plays chess?"]
+    assert all("first_name" not in m and "chunk_text" not in m for m in metas)
+    assert [desc[m["chunk_start"]:m["chunk_end"]] for m in metas] == [
+        "Hiking  in the hills.\nBakes bread!", "Bakes bread! Plays chess?"
+    ]
+    # Embedding keys match the non-compact layout, so stored vectors are shared
+    assert metas[1]["embed_hash"] == hash_text("Bakes bread! Plays chess?")
+    assert parents.records == {"p1": {"description": desc, "document": "full doc", "metadata": parent_meta}}
+
+    # A parent-only change (same description) changes every chunk's metadata
+    before = [m["parent_hash"] for m in metas]
+    payloads = IngestPayloads(ids=["p1"], descriptions=[desc], documents=["full doc"],
+                              metadatas=[{**parent_meta, "email": "ann@y.io"}])
+    window = strat.prepare(payloads, embed_model="m")
+    assert all(m["parent_hash"] != b for m, b in zip(window.metadatas, before))
+
+
+def test_compact_chunks_need_a_parent_store():
+    payloads = IngestPayloads(ids=["p1"], descriptions=["One. Two."], documents=[""], metadatas=[{}])
+    with pytest.raises(ValueError):
+        TokenChunkStrategy(compact=True).run(FakeEmbeddings(), FakeRepo(), payloads, embed_model=None)
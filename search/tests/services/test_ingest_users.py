@@ -2,6 +2,8 @@ import json
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
+import pytest
+
 from search.services.ingest_users import build_payloads, ingest
 
 
@@ -79,3 +81,181 @@ def test_ingest_chunked_token_ids(tmp_path: Path):
     assert ids[0].startswith("alice#t")
     assert metas[0]["parent_id"] == "alice"
 
+
+def test_ingest_streams_fixed_size_windows(tmp_path: Path):
+    p = tmp_path / "users.jsonl"
+    lines = []
+    for i in range(5):
+        lines.append(json.dumps({
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "description": f"Description number {i}",
+            "first_name": "Test",
+            "last_name": "User",
+            "age": 30,
+            "phone": "+12025550123",
+        }))
+    p.write_text("\n".join(lines))
+
+    repo = CaptureRepo()
+    n, out_ids = ingest(FakeEmbeddings(), repo, str(p), normalize=False, min_chars=1, window_size=2)
+    assert n == 5 and out_ids == [f"user{i}" for i in range(5)]
+    assert [c[0] for c in repo.calls] == [["user0", "user1"], ["user2", "user3"], ["user4"]]
+
+
+class DictRepo:
+    def __init__(self) -> None:
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.written: List[str] = []
+        self.deleted: List[str] = []
+
+    def upsert(self, ids, documents, vectors, metadatas=None):
+        self.written.extend(ids)
+        for rid, doc, vec, meta in zip(ids, documents, vectors, metadatas):
+            self.rows[rid] = {"document": doc, "embedding": vec, "metadata": dict(meta)}
+
+    def get_by_ids(self, ids, include_embeddings=False):
+        return {rid: dict(self.rows[rid]) for rid in ids if rid in self.rows}
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+        for rid in ids:
+            self.rows.pop(rid, None)
+
+    def iter_metadata(self, page_size=1000):
+        return iter([(rid, row["metadata"]) for rid, row in self.rows.items()])
+
+
+def _write_many(path: Path, descs: Dict[str, str]) -> None:
+    path.write_text(json.dumps([
+        {
+            "username": name,
+            "email": f"{name}@example.com",
+            "description": desc,
+            "first_name": "Test",
+            "last_name": "User",
+            "age": 30,
+            "phone": "+12025550123",
+        }
+        for name, desc in descs.items()
+    ]))
+
+
+def test_incremental_ingest_writes_only_changes_and_deletes_removed(tmp_path: Path):
+    p = tmp_path / "users.json"
+    repo = DictRepo()
+    opts = dict(normalize=False, min_chars=1, embed_model="m", index_chunks=True, chunking_mode="token",
+                tokens_per_chunk=2, token_overlap=0, incremental=True)
+
+    _write_many(p, {"alice": "one two three", "bob": "four five", "carol": "six seven"})
+    ingest(FakeEmbeddings(), repo, str(p), **opts)
+    assert sorted(repo.rows) == ["alice#t0000", "alice#t0001", "bob#t0000", "carol#t0000"]
+
+    repo.written.clear()
+    _write_many(p, {"alice": "one two three", "bob": "four nine", "dave": "ten"})
+    n, _ids = ingest(FakeEmbeddings(), repo, str(p), **opts)
+    assert n == 3
+    assert sorted(repo.written) == ["bob#t0000", "dave#t0000"]
+    assert repo.deleted == ["carol#t0000"]
+    assert sorted(repo.rows) == ["alice#t0000", "alice#t0001", "bob#t0000", "dave#t0000"]
+
+
+def test_incremental_ingest_fails_on_missing_file(tmp_path: Path):
+    repo = DictRepo()
+    repo.rows["alice"] = {"metadata": {}}
+    with pytest.raises(FileNotFoundError):
+        ingest(FakeEmbeddings(), repo, str(tmp_path / "missing.json"), False, 1, incremental=True)
+    assert repo.rows
+
+
+def test_ingest_purges_chunks_beyond_new_chunk_count(tmp_path: Path):
+    p = tmp_path / "users.json"
+    repo = DictRepo()
+    opts = dict(normalize=False, min_chars=1, embed_model="m", index_chunks=True, chunking_mode="token",
+                tokens_per_chunk=1, token_overlap=0)
+
+    _write_many(p, {"alice": "one two three"})
+    ingest(FakeEmbeddings(), repo, str(p), **opts)
+    assert sorted(repo.rows) == ["alice#t0000", "alice#t0001", "alice#t0002"]
+
+    _write_many(p, {"alice": "one"})
+    ingest(FakeEmbeddings(), repo, str(p), **opts)
+    assert sorted(repo.rows) == ["alice#t0000"]
+    assert sorted(repo.deleted) == ["alice#t0001", "alice#t0002"]
+
+
+def test_parallel_prepare_matches_serial_output(tmp_path: Path):
+    from search.adapters.sqlite_validated_cache import SqliteValidatedCache
+
+    p = tmp_path / "users.json"
+    _write_many(p, {f"user{i:02d}": f"Sentence one of {i}. Sentence two! And three? " * (i % 4 + 1) for i in range(9)})
+    opts = dict(normalize=True, min_chars=1, embed_model="m", index_chunks=True, sentences_per_chunk=2,
+                sentence_overlap=1, window_size=2)
+
+    serial = DictRepo()
+    n_serial, ids_serial = ingest(FakeEmbeddings(), serial, str(p), **opts)
+    parallel = DictRepo()
+    cache = SqliteValidatedCache(str(tmp_path / "validated.sqlite3"))
+    n_par, ids_par = ingest(FakeEmbeddings(), parallel, str(p), workers=2, validation_cache=cache, **opts)
+
+    assert (n_par, ids_par) == (n_serial, ids_serial)
+    assert parallel.written == serial.written
+    assert parallel.rows == serial.rows
+    # Workers filled the shared validation cache
+    assert len(cache) == 9
+
+
+class FailingEmbeddings(FakeEmbeddings):
+    def __init__(self, fail_after: int) -> None:
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.calls > self.fail_after:
+            raise RuntimeError("embeddings API down")
+        return super().embed_texts(texts)
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_resume_skips_committed_windows(tmp_path: Path, pipeline: bool):
+    from search.utils.ingest_checkpoint import IngestCheckpoint
+
+    p = tmp_path / "users.json"
+    _write_many(p, {f"user{i}": f"Description number {i}" for i in range(5)})
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.json"), key="k")
+    repo = DictRepo()
+    opts = dict(normalize=False, min_chars=1, window_size=2, checkpoint=checkpoint, pipeline=pipeline)
+
+    users = [f"user{i}" for i in range(5)]
+    # The API fails on the third window; the windows written before it are checkpointed
+    with pytest.raises(RuntimeError):
+        ingest(FailingEmbeddings(fail_after=2), repo, str(p), **opts)
+    done = checkpoint.committed()
+    assert done >= (0 if pipeline else 2)
+    assert repo.written == users[:2 * done]
+
+    emb = FailingEmbeddings(fail_after=10)
+    repo.written.clear()
+    n, ids = ingest(emb, repo, str(p), resume=True, **opts)
+    assert (n, ids) == (5, users)
+    assert repo.written == users[2 * done:] and emb.calls == 3 - done
+    # A completed run leaves no checkpoint behind
+    assert checkpoint.committed() == 0 and not (tmp_path / "checkpoint.json").exists()
+
+
+def test_checkpoint_ignored_without_resume_or_for_other_key(tmp_path: Path):
+    from search.utils.ingest_checkpoint import IngestCheckpoint
+
+    p = tmp_path / "users.json"
+    _write_many(p, {f"user{i}": f"Description number {i}" for i in range(3)})
+    path = str(tmp_path / "checkpoint.json")
+    IngestCheckpoint(path, key="other").commit(1, 2)
+    repo = DictRepo()
+    ingest(FakeEmbeddings(), repo, str(p), False, 1, window_size=2, resume=True, checkpoint=IngestCheckpoint(path, "k"))
+    assert repo.written == ["user0", "user1", "user2"]
+
+    IngestCheckpoint(path, key="k").commit(1, 2)
+    repo = DictRepo()
+    ingest(FakeEmbeddings(), repo, str(p), False, 1, window_size=2, checkpoint=IngestCheckpoint(path, "k"))
+    assert repo.written == ["user0", "user1", "user2"]
@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Tuple
+
+from search.services.query_users import search as query_search, search_many
+
+
+Row = Tuple[str, float, str, Dict[str, Any]]
+
+
+class BatchEmbeddings:
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(t))] if t else [] for t in texts]
+
+
+class BatchRepo:
+    """Ranks rows by |row_len - query_len| where the 'vector' is the query length."""
+
+    def __init__(self, rows: List[Row]) -> None:
+        self._rows = rows
+        self.single_calls = 0
+        self.batch_calls: List[int] = []
+
+    def _rank(self, vector: List[float], k: int) -> Tuple[List[Row], List[float]]:
+        scored = sorted(
+            ((rid, abs(len(doc) - vector[0]), doc, meta) for rid, _d, doc, meta in self._rows),
+            key=lambda r: r[1],
+        )[: max(1, k)]
+        return scored, [r[1] for r in scored]
+
+    def query(self, vector: List[float], k: int, where_document: str | None = None, include=None):
+        self.single_calls += 1
+        return self._rank(vector, k)
+
+    def query_many(self, vectors: List[List[float]], k: int, where_document: str | None = None, include=None):
+        self.batch_calls.append(len(vectors))
+        return [self._rank(v, k) for v in vectors]
+
+
+def _rows() -> List[Row]:
+    return [
+        ("a#c0000", 0.0, "xx", {"parent_id": "a"}),
+        ("a#c0001", 0.0, "xxxx", {"parent_id": "a"}),
+        ("b#c0000", 0.0, "xxxxxx", {"parent_id": "b"}),
+        ("c#c0000", 0.0, "xxxxxxxxx", {"parent_id": "c"}),
+    ]
+
+
+def test_search_many_batches_and_matches_single_search():
+    queries = ["x", "xxxxx", "", "xxxxxxxx", "xxx"]
+    emb = BatchEmbeddings()
+    repo = BatchRepo(_rows())
+    got = list(search_many(emb, repo, iter(queries), 2, phrase_prefilter=False, threshold=None,
+                           normalize=False, index_chunks=True, chunk_query_multiplier=2, batch_size=2))
+
+    # One embeddings call and one repository call per batch; empty query skipped
+    assert emb.calls == [["x", "xxxxx"], ["", "xxxxxxxx"], ["xxx"]]
+    assert repo.batch_calls == [2, 1, 1] and repo.single_calls == 0
+    assert len(got) == len(queries)
+    assert got[2] == ([], [])
+
+    for q, result in zip(queries, got):
+        if not q:
+            continue
+        expected = query_search(BatchEmbeddings(), BatchRepo(_rows()), q, 2, phrase_prefilter=False,
+                                threshold=None, normalize=False, index_chunks=True, chunk_query_multiplier=2)
+        assert result == expected
+
+
+def test_search_many_phrase_prefilter_queries_individually():
+    emb = BatchEmbeddings()
+    repo = BatchRepo(_rows())
+    got = list(search_many(emb, repo, ["Xx", "xxx"], 1, phrase_prefilter=True, threshold=None, normalize=True))
+    assert emb.calls == [["xx", "xxx"]]
+    assert repo.batch_calls == [] and repo.single_calls == 2
+    assert [rows[0][0] for rows, _ in got] == ["a#c0000", "a#c0000"]
+
+
+class QuantizedRepo(BatchRepo):
+    def __init__(self, rows: List[Row]) -> None:
+        super().__init__(rows)
+        self.oversamples: List[int] = []
+
+    def query_quantized(self, vector: List[float], k: int, where_document: str | None = None, oversample: int = 8,
+                        include=None):
+        self.oversamples.append(oversample)
+        return self._rank(vector, k)
+
+    def query_many_quantized(
+            self, vectors: List[List[float]], k: int, where_document: str | None = None, oversample: int = 8,
+            include=None,
+    ):
+        self.oversamples.append(oversample)
+        return [self._rank(v, k) for v in vectors]
+
+
+def test_quantized_first_pass_uses_repo_support_and_falls_back():
+    repo = QuantizedRepo(_rows())
+    expected = query_search(BatchEmbeddings(), BatchRepo(_rows()), "xxx", 2, phrase_prefilter=False,
+                            threshold=None, normalize=False)
+    got = query_search(BatchEmbeddings(), repo, "xxx", 2, phrase_prefilter=False, threshold=None,
+                       normalize=False, quantized_first_pass=True, quantized_oversample=3)
+    assert got == expected
+    list(search_many(BatchEmbeddings(), repo, ["x", "xx"], 1, phrase_prefilter=False, threshold=None,
+                     normalize=False, quantized_first_pass=True, quantized_oversample=0))
+    assert repo.oversamples == [3, 1] and repo.single_calls == 0 and repo.batch_calls == []
+
+    # Repositories without binary codes search as usual
+    plain = BatchRepo(_rows())
+    assert query_search(BatchEmbeddings(), plain, "xxx", 2, phrase_prefilter=False, threshold=None,
+                        normalize=False, quantized_first_pass=True) == expected
+    assert plain.single_calls == 1
+
+
+class ProjectingRepo(BatchRepo):
+    """Honors the projection like the real adapters and records the follow-up fetches."""
+
+    def __init__(self, rows: List[Row]) -> None:
+        super().__init__(rows)
+        self.includes: List[Any] = []
+        self.fetched: List[List[str]] = []
+
+    def _rank(self, vector: List[float], k: int, include=None):
+        rows, dists = super()._rank(vector, k)
+        self.includes.append(include)
+        return [(rid, d, "", {}) for rid, d, _, _ in rows], dists
+
+    def query(self, vector: List[float], k: int, where_document: str | None = None, include=None):
+        return self._rank(vector, k, include)
+
+    def query_many(self, vectors: List[List[float]], k: int, where_document: str | None = None, include=None):
+        return [self._rank(v, k, include) for v in vectors]
+
+    def get_by_ids(self, ids: List[str], include_embeddings: bool = False, include_documents: bool = False):
+        self.fetched.append(list(ids))
+        by_id = {rid: (doc, meta) for rid, _, doc, meta in self._rows}
+        return {i: {"metadata": by_id[i][1], "document": by_id[i][0]} for i in ids if i in by_id}
+
+
+def test_candidates_are_ids_only_and_final_rows_fetched_once():
+    repo = ProjectingRepo(_rows())
+    rows, _ = query_search(BatchEmbeddings(), repo, "xxx", 2, phrase_prefilter=False, threshold=None,
+                           normalize=False, index_chunks=True, chunk_query_multiplier=2)
+    assert repo.includes == [frozenset()]
+    # Parents "a" and "b", filled from their best chunks
+    assert repo.fetched == [["a#c0000", "b#c0000"]]
+    expected = query_search(BatchEmbeddings(), BatchRepo(_rows()), "xxx", 2, phrase_prefilter=False,
+                            threshold=None, normalize=False, index_chunks=True, chunk_query_multiplier=2)
+    assert rows == expected[0]
+
+    repo = ProjectingRepo(_rows())
+    got = list(search_many(BatchEmbeddings(), repo, ["x", "xxxxxxxx"], 1, phrase_prefilter=False,
+                           threshold=None, normalize=False, index_chunks=True))
+    assert len(repo.fetched) == 1 and [rows[0][0] for rows, _ in got] == ["a", "c"]
+    assert got[1][0][0][2:] == ("xxxxxxxxx", {"parent_id": "c"})
+
+
+def test_whole_document_ids_containing_hash_are_filled_by_their_own_id():
+    # Without chunking, "a#1" is a user id of its own, not a chunk of "a"
+    users = [("a", 0.0, "xxxxxx", {"username": "a"}), ("a#1", 0.0, "xxx", {"username": "a#1"})]
+    repo = ProjectingRepo(users)
+    rows, _ = query_search(BatchEmbeddings(), repo, "xxx", 2, phrase_prefilter=False, threshold=None,
+                           normalize=False)
+    assert [(r[0], r[3]["username"]) for r in rows] == [("a#1", "a#1"), ("a", "a")]
+    assert repo.fetched == [["a#1", "a"]]
@@ -23,7 +23,7 @@ class PrefilterFallbackRepo:
     def upsert(self, *a, **k):
         raise NotImplementedError
 
-    def query(self, vector: List[float], k: int, where_document: str | None = None):
+    def query(self, vector: List[float], k: int, where_document: str | None = None, include=None):
         self.calls.append({"k": k, "where_document": where_document})
         if where_document:
             return [], []
@@ -64,7 +64,7 @@ def test_threshold_filters_rows():
             return [[1.0, 0.0, 0.0]]
 
     class Repo:
-        def query(self, vector: List[float], k: int, where_document: str | None = None):
+        def query(self, vector: List[float], k: int, where_document: str | None = None, include=None):
             rows: List[Row] = [
                 ("x", 0.10, "d", {}),
                 ("y", 0.15, "d", {}),
@@ -77,3 +77,37 @@ def test_threshold_filters_rows():
     # Distances list mirrors before-threshold trimming
     assert dists == [0.10, 0.15]
 
+
+def test_compact_rows_hydrated_from_parent_store():
+    class Parents:
+        def __init__(self) -> None:
+            self.lookups: List[List[str]] = []
+
+        def get_many(self, ids):
+            self.lookups.append(list(ids))
+            recs = {
+                "A": {"description": "Likes tea. Rides bikes.", "document": "docA",
+                      "metadata": {"first_name": "Ann", "embed_hash": "h"}},
+            }
+            return {i: recs[i] for i in ids if i in recs}
+
+    compact = {"parent_id": "A", "chunk_index": 1, "chunk_start": 11, "chunk_end": 23, "parent_hash": "x",
+               "embed_hash": "c1"}
+    rows: List[Row] = [
+        ("A#c0001", 0.1, "Rides bikes.", compact),
+        ("A#c0000", 0.2, "Likes tea.", {**compact, "chunk_index": 0, "chunk_start": 0, "chunk_end": 10}),
+        ("B#c0000", 0.3, "Plain.", {"parent_id": "B", "first_name": "Bo", "chunk_text": "Plain."}),
+        ("C#c0000", 0.4, "Gone.", {"parent_id": "C", "chunk_start": 0, "chunk_end": 5}),
+    ]
+    parents = Parents()
+    out, dists = query_search(
+        embeddings=RecordingEmbeddings(), repo=PrefilterFallbackRepo(rows), query_text="bikes", k=2,
+        phrase_prefilter=False, threshold=None, normalize=False, index_chunks=True, parents=parents,
+    )
+    # Only the final top-k parents are looked up
+    assert parents.lookups == [["A"]]
+    assert [r[0] for r in out] == ["A", "B"] and dists == [0.1, 0.3]
+    meta = out[0][3]
+    assert meta["first_name"] == "Ann" and meta["chunk_text"] == "Rides bikes."
+    assert meta["embed_hash"] == "c1" and "chunk_start" not in meta and "parent_hash" not in meta
+    assert out[1][3]["chunk_text"] == "Plain."
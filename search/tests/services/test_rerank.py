@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pytest
+
+from search.services.query_users import search as query_search, search_many
+from search.services.rerank import aggregate_by_parent, exact_distances, rerank
+
+Row = Tuple[str, float, str, Dict[str, Any]]
+
+
+@pytest.mark.parametrize("space", ["cosine", "l2", "ip"])
+def test_exact_distances_match_per_row_formulas(space):
+    rng = np.random.default_rng(0)
+    cands = rng.normal(size=(6, 4)).astype(np.float32)
+    q = rng.normal(size=4)
+    expected = {
+        "cosine": [1 - c @ q / (np.linalg.norm(c) * np.linalg.norm(q)) for c in cands],
+        "l2": [float(((c - q) ** 2).sum()) for c in cands],
+        "ip": [1 - c @ q for c in cands],
+    }[space]
+    assert np.allclose(exact_distances(q.tolist(), cands, space), expected, atol=1e-5)
+
+
+def test_rerank_replaces_approximate_distances_and_keeps_nearest():
+    rows = [("a", 0.1, "A", {}), ("b", 0.2, "B", {}), ("c", 0.3, "C", {})]
+    # Exact cosine distances: a = 1.0, b = 0.0; c has no embedding and keeps 0.3
+    got = rerank(rows, [1.0, 0.0], [[0.0, 1.0], [2.0, 0.0], None], "cosine", keep=2)
+    assert [(r[0], round(r[1], 6)) for r in got] == [("b", 0.0), ("c", 0.3)]
+
+
+def _chunks() -> List[Row]:
+    return [
+        ("a#0", 0.10, "a0", {"parent_id": "a"}),
+        ("b#0", 0.12, "b0", {"parent_id": "b"}),
+        ("b#1", 0.13, "b1", {"parent_id": "b"}),
+        ("b#2", 0.14, "b2", {"parent_id": "b"}),
+        ("a#1", 0.60, "a1", {"parent_id": "a"}),
+        ("solo", 0.20, "s", {}),
+    ]
+
+
+def test_aggregate_by_parent_functions():
+    best = aggregate_by_parent(_chunks())
+    assert [(r[0], r[1], r[2]) for r in best] == [("a", 0.10, "a0"), ("b", 0.12, "b0"), ("solo", 0.20, "s")]
+
+    mean = aggregate_by_parent(_chunks(), "mean-top-n", top_n=2)
+    assert [r[0] for r in mean] == ["b", "solo", "a"]
+    assert mean[0][1] == pytest.approx(0.125) and mean[2][1] == pytest.approx(0.35)
+    assert mean[0][2] == "b0"
+
+    # Several close chunks outweigh one slightly better chunk
+    soft = aggregate_by_parent(_chunks(), "softmax-sum", temperature=0.05)
+    assert [r[0] for r in soft] == ["b", "a", "solo"]
+    assert soft[0][1] < 0.12 and soft[2][1] == pytest.approx(0.20)
+    # Low temperature tends to max
+    assert [r[0] for r in aggregate_by_parent(_chunks(), "softmax-sum", temperature=1e-4)] == ["a", "b", "solo"]
+
+    with pytest.raises(ValueError):
+        aggregate_by_parent(_chunks(), "median")
+
+
+class HnswRepo:
+    """Approximate distances are off; stored embeddings give the exact order."""
+
+    metadata = {"hnsw:space": "cosine"}
+
+    def __init__(self) -> None:
+        self.rows: List[Row] = [
+            ("x#0", 0.10, "x0", {"parent_id": "x"}),
+            ("y#0", 0.11, "y0", {"parent_id": "y"}),
+            ("z#0", 0.12, "z0", {"parent_id": "z"}),
+        ]
+        self.embeddings = [[0.0, 1.0], [1.0, 0.1], [1.0, 0.0]]
+        self.ks: List[int] = []
+
+    def query(self, vector: List[float], k: int, where_document: str | None = None, include=None):
+        rows = self.rows[:k]
+        return rows, [r[1] for r in rows]
+
+    def query_many_with_embeddings(self, vectors: List[List[float]], k: int, where_document: str | None = None, include=None):
+        self.ks.append(k)
+        return [(self.rows[:k], self.embeddings[:k]) for _ in vectors]
+
+
+class Emb:
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return [[1.0, 0.0] for _ in texts]
+
+
+def test_search_exact_rerank_oversamples_and_reorders():
+    repo = HnswRepo()
+    plain, _ = query_search(Emb(), repo, "q", 1, phrase_prefilter=False, threshold=None, normalize=False)
+    assert [r[0] for r in plain] == ["x#0"] and repo.ks == []
+
+    rows, dists = query_search(Emb(), repo, "q", 1, phrase_prefilter=False, threshold=None, normalize=False,
+                               index_chunks=True, chunk_query_multiplier=1, exact_rerank=True, rerank_oversample=3)
+    assert repo.ks == [3]
+    assert [r[0] for r in rows] == ["z"] and dists[0] == pytest.approx(0.0, abs=1e-6)
+
+    many = list(search_many(Emb(), repo, ["q", "q"], 2, phrase_prefilter=False, threshold=None, normalize=False,
+                            exact_rerank=True, rerank_oversample=2))
+    assert repo.ks == [3, 4] and [[r[0] for r in rows] for rows, _ in many] == [["z#0", "y#0"]] * 2
@@ -0,0 +1,40 @@
+from typing import Any, Dict, List
+
+from search.services.vacuum import find_orphan_chunks, vacuum_orphans
+
+
+class MetaRepo:
+    def __init__(self, rows: Dict[str, Dict[str, Any]]) -> None:
+        self.rows = rows
+        self.deleted: List[str] = []
+
+    def iter_metadata(self, page_size: int = 1000):
+        return iter(list(self.rows.items()))
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+        for rid in ids:
+            self.rows.pop(rid, None)
+
+
+def _chunk(parent: str, index: int, count: int) -> Dict[str, Any]:
+    return {"parent_id": parent, "chunk_index": index, "chunk_count": count}
+
+
+def test_find_orphan_chunks_uses_first_chunk_count():
+    repo = MetaRepo({
+        "a#c0000": _chunk("a", 0, 2),
+        "a#c0001": _chunk("a", 1, 2),
+        "a#c0002": _chunk("a", 2, 4),  # left over from a longer description
+        "a#c0003": _chunk("a", 3, 4),
+        "b#c0001": _chunk("b", 1, 2),  # parent has no chunk 0
+        "whole": {"first_name": "X"},  # whole-doc records are never orphans
+    })
+    assert sorted(find_orphan_chunks(repo)) == ["a#c0002", "a#c0003", "b#c0001"]
+
+
+def test_vacuum_orphans_deletes_in_bulk():
+    repo = MetaRepo({"a#c0000": _chunk("a", 0, 1), "a#c0001": _chunk("a", 1, 2)})
+    assert vacuum_orphans(repo) == ["a#c0001"]
+    assert repo.deleted == ["a#c0001"]
+    assert list(repo.rows) == ["a#c0000"]
@@ -0,0 +1,91 @@
+from typing import Any, Dict, List
+
+import pytest
+from pydantic import ValidationError
+
+from search.adapters.sqlite_validated_cache import SqliteValidatedCache
+from search.models.user import User
+from search.services.validate_users import UserValidator, record_hash
+
+
+def _raw(i: int, **over: Any) -> Dict[str, Any]:
+    rec = {
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "description": f"Description {i}",
+        "first_name": "Alice",
+        "last_name": "Anderson",
+        "age": 30,
+        "phone": "+12025550123",
+    }
+    rec.update(over)
+    return rec
+
+
+def test_bulk_validation_matches_per_record_user():
+    records = [_raw(i) for i in range(5)]
+    out = list(UserValidator(batch_size=2).validate(records))
+    assert [raw for raw, _ in out] == records
+    for raw, fields in out:
+        user = User(**raw)
+        assert fields == {
+            "username": user.username, "description": user.description, "first_name": user.first_name,
+            "last_name": user.last_name, "email": str(user.email), "phone": str(user.phone),
+        }
+
+
+def test_cache_skips_revalidation_of_unchanged_records(tmp_path):
+    cache = SqliteValidatedCache(str(tmp_path / "validated.sqlite3"))
+    records: List[Dict[str, Any]] = [_raw(i) for i in range(3)]
+    first = UserValidator(cache=cache)
+    expected = list(first.validate(records))
+    assert first.validated == 3 and len(cache) == 3
+
+    records[1] = _raw(1, description="Changed")
+    second = UserValidator(cache=cache)
+    out = list(second.validate(records))
+    assert second.validated == 1 and second.cache_hits == 2
+    assert out[0] == expected[0] and out[1][1]["description"] == "Changed"
+    # Key order in the file does not matter
+    assert record_hash({"a": 1, "b": 2}) == record_hash({"b": 2, "a": 1})
+
+
+def test_invalid_records_raise_and_trusted_mode_skips_validation():
+    bad = [_raw(0, email="not-an-email")]
+    with pytest.raises(ValidationError):
+        list(UserValidator().validate(bad))
+    ((_raw_rec, fields),) = UserValidator(trusted=True).validate(bad)
+    assert fields["email"] == "not-an-email" and fields["phone"] == "+12025550123"
+
+
+def test_cache_evicts_least_recently_used_records(tmp_path):
+    import pickle
+
+    cache = SqliteValidatedCache(str(tmp_path / "validated.sqlite3"), max_entries=2)
+    cache.put_many("s", {"a": {"n": 1}})
+    cache.put_many("s", {"b": {"n": 2}})
+    assert cache.get_many("s", ["a"]) == {"a": {"n": 1}}  # touch "a"
+    cache.put_many("s", {"c": {"n": 3}})
+    assert len(cache) == 2 and sorted(cache.get_many("s", ["a", "b", "c"])) == ["a", "c"]
+
+    # Worker processes reopen the file with the same bound
+    clone = pickle.loads(pickle.dumps(cache))
+    clone.put_many("s", {"d": {"n": 4}})
+    assert len(clone) == 2
+
+
+def test_cache_opens_files_written_before_eviction(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "validated.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE validated (schema TEXT NOT NULL, record_hash TEXT NOT NULL, fields TEXT NOT NULL,"
+                 " PRIMARY KEY (schema, record_hash))")
+    conn.execute("""INSERT INTO validated VALUES ('s', 'old', '{"n": 0}')""")
+    conn.commit()
+    conn.close()
+
+    cache = SqliteValidatedCache(path, max_entries=1)
+    assert cache.get_many("s", ["old"]) == {"old": {"n": 0}}
+    cache.put_many("s", {"new": {"n": 1}})
+    assert cache.get_many("s", ["old", "new"]) == {"new": {"n": 1}}
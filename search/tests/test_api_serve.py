@@ -0,0 +1,102 @@
+import json
+from typing import Any, List
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+from search.api import request_args, run_batch, serve_lines
+from search.utils.load_data import parse_args
+
+
+class FakeRepo:
+    name = "users"
+    metadata = {"hnsw:space": "cosine", "model": "m"}
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.opened: List[Any] = []
+
+    def open_index(self, args):
+        self.opened.append(args)
+        return FakeRepo(), False, 1
+
+    def search(self, repo, args):
+        if args.query == "boom":
+            raise RuntimeError("backend down")
+        meta = {"first_name": "Alice", "chunk_text": "x" * 300}
+        return [("alice", 0.1, "doc", meta)], [0.1]
+
+    def search_many(self, repo, args, queries):
+        for q in queries:
+            yield [(f"hit-{q}", 0.2, "doc", {})], [0.2]
+
+
+def test_request_args_overlays_startup_args():
+    base = parse_args(["--persist", "/tmp/p", "--normalize", "--k", "3"])
+    args = request_args(base, {"query": "bike", "k": 7, "normalize": False, "index_chunks": True})
+    assert args.persist == "/tmp/p"
+    assert args.query == "bike" and args.k == 7
+    assert args.normalize is False and args.index_chunks is True
+    # base namespace untouched
+    assert base.k == 3 and base.normalize is True
+
+
+def test_request_values_starting_with_dash_are_values():
+    args = request_args(parse_args([]), {"query": "-x", "k": 1, "threshold": -0.5})
+    assert (args.query, args.k, args.threshold) == ("-x", 1, -0.5)
+
+    out: List[str] = []
+    serve_lines(FakeSession(), parse_args([]), [json.dumps({"id": 3, "query": "-x", "k": 1}) + "\n"], out.append)
+    reply = json.loads(out[0])
+    assert "error" not in reply and reply["query"] == "-x" and reply["id"] == 3
+
+
+def test_request_args_rejects_unknown_and_server_only_fields(capsys):
+    base = parse_args([])
+    with pytest.raises(ValueError):
+        request_args(base, {"nope": 1})
+    with pytest.raises(ValueError):
+        request_args(base, {"socket": "/tmp/s"})
+    with pytest.raises(ValueError, match="invalid int value: 'many'"):
+        request_args(base, {"k": "many"})
+    with pytest.raises(ValueError, match="invalid choice"):
+        request_args(base, {"backend": "faiss"})
+    # argparse's message is the error; nothing reaches the server's stderr
+    assert capsys.readouterr().err == ""
+
+
+def test_serve_lines_answers_one_json_line_per_request():
+    session = FakeSession()
+    out: List[str] = []
+    lines = [
+        json.dumps({"id": 1, "query": "bike", "k": 2}) + "\n",
+        "\n",
+        json.dumps({"id": 2, "query": "boom"}) + "\n",
+        "not json\n",
+    ]
+    serve_lines(session, parse_args([]), lines, out.append)
+
+    assert len(out) == 3 and all(s.endswith("\n") for s in out)
+    first, second, third = (json.loads(s) for s in out)
+    assert first["id"] == 1 and first["query"] == "bike" and first["k"] == 2
+    assert first["count"] == 1 and first["rows"][0]["id"] == "alice"
+    assert first["rows"][0]["snippet"].endswith("…")
+    assert first["collection"] == "users" and first["reindexed"] is False
+    assert second == {"error": "backend down", "id": 2}
+    assert "error" in third
+    # the session (and its open collections) is shared by all requests
+    assert len(session.opened) == 2
+
+
+def test_run_batch_streams_one_line_per_query(tmp_path):
+    qfile = tmp_path / "queries.jsonl"
+    qfile.write_text('"bike"\n\n{"id": "q2", "query": "music"}\n')
+    out: List[str] = []
+    run_batch(FakeSession(), parse_args(["--queries-file", str(qfile), "--k", "4"]), out.append)
+
+    first, second = (json.loads(s) for s in out)
+    assert first["query"] == "bike" and first["k"] == 4 and "id" not in first
+    assert first["rows"][0]["id"] == "hit-bike"
+    assert second["query"] == "music" and second["id"] == "q2"
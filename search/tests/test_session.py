@@ -0,0 +1,405 @@
+import json
+from pathlib import Path
+from typing import List
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+from search.session import SearchSession
+from search.utils.load_data import parse_args
+
+
+class CountingEmbeddings:
+    def __init__(self) -> None:
+        self.texts: List[str] = []
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        self.texts.extend(texts)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+
+def _write_users(path: Path, desc: str) -> None:
+    data = [
+        {
+            "username": "alice",
+            "email": "alice@example.com",
+            "description": desc,
+            "first_name": "Alice",
+            "last_name": "Anderson",
+            "age": 30,
+            "phone": "+12025550123",
+        }
+    ]
+    path.write_text(json.dumps(data))
+
+
+def _args(tmp_path: Path, data: Path, *extra: str):
+    return parse_args(["--data", str(data), "--persist", str(tmp_path / "chroma"), "--min-chars", "1", *extra])
+
+
+def _session(monkeypatch, emb: CountingEmbeddings) -> SearchSession:
+    monkeypatch.setattr(SearchSession, "embeddings", lambda self, args: emb)
+    return SearchSession()
+
+
+def test_unchanged_dataset_skips_ingest_across_sessions(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle to work every day.")
+    args = _args(tmp_path, data)
+
+    emb = CountingEmbeddings()
+    repo, reindexed, count = _session(monkeypatch, emb).open_index(args)
+    assert count == 1 and len(emb.texts) == 1
+    assert repo.metadata["dataset_count"] == 1 and repo.metadata["hnsw:space"] == "cosine"
+
+    # A new process (session) finds the fingerprint and does not ingest again
+    emb2 = CountingEmbeddings()
+    repo2, reindexed2, count2 = _session(monkeypatch, emb2).open_index(args)
+    assert count2 == 1 and reindexed2 is False
+    assert emb2.texts == []
+
+
+def test_changed_dataset_or_settings_reingests(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle to work every day.")
+    args = _args(tmp_path, data)
+    _session(monkeypatch, CountingEmbeddings()).open_index(args)
+
+    _write_users(data, "Plays the violin in an orchestra.")
+    emb = CountingEmbeddings()
+    _session(monkeypatch, emb).open_index(args)
+    assert emb.texts == ["Plays the violin in an orchestra."]
+
+    emb = CountingEmbeddings()
+    _session(monkeypatch, emb).open_index(_args(tmp_path, data, "--normalize"))
+    assert emb.texts == ["plays the violin in an orchestra."]
+
+
+def test_malformed_dataset_fails_and_is_not_recorded_as_synced(tmp_path: Path, monkeypatch):
+    import chromadb
+
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle to work every day.")
+    good = data.read_text()
+    data.write_text(good[:-1] + ", {not valid}]")
+    args = _args(tmp_path, data, "--fixed-collection")
+
+    with pytest.raises(json.JSONDecodeError):
+        _session(monkeypatch, CountingEmbeddings()).open_index(args)
+    meta = chromadb.PersistentClient(path=str(tmp_path / "chroma")).get_collection("users").metadata or {}
+    assert "dataset_digest" not in meta
+
+    # Fixed file: ingested in full and recorded
+    data.write_text(good)
+    emb = CountingEmbeddings()
+    repo, _, count = _session(monkeypatch, emb).open_index(args)
+    assert count == 1 and repo.metadata["dataset_count"] == 1
+
+
+def test_recreated_collection_reuses_content_addressed_embeddings(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz. Bakes bread.")
+    fixed = ("--fixed-collection", "--index-chunks")
+    _session(monkeypatch, CountingEmbeddings()).open_index(
+        _args(tmp_path, data, *fixed, "--sentences-per-chunk", "1", "--sentence-overlap", "0")
+    )
+
+    # With a fixed collection, changing the chunking recreates it; only never-seen chunk texts are embedded
+    emb = CountingEmbeddings()
+    repo, reindexed, _count = _session(monkeypatch, emb).open_index(
+        _args(tmp_path, data, *fixed, "--sentences-per-chunk", "2", "--sentence-overlap", "1")
+    )
+    assert reindexed is True and repo.name == "users"
+    assert emb.texts == ["Rides a bicycle. Loves jazz.", "Loves jazz. Bakes bread."]
+
+    emb = CountingEmbeddings()
+    _session(monkeypatch, emb).open_index(
+        _args(tmp_path, data, *fixed, "--sentences-per-chunk", "1", "--sentence-overlap", "0")
+    )
+    assert emb.texts == []
+
+
+def test_chunking_configs_live_side_by_side(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz. Bakes bread.")
+    sentence = _args(tmp_path, data, "--index-chunks", "--no-embedding-store")
+    token = _args(tmp_path, data, "--index-chunks", "--chunking-mode", "token", "--no-embedding-store")
+
+    repo_s, _, _ = _session(monkeypatch, CountingEmbeddings()).open_index(sentence)
+    repo_t, _, _ = _session(monkeypatch, CountingEmbeddings()).open_index(token)
+    assert repo_s.name != repo_t.name and repo_s.name.startswith("users-")
+
+    # Switching back is a lookup: no re-ingest, no embeddings
+    emb = CountingEmbeddings()
+    repo, reindexed, count = _session(monkeypatch, emb).open_index(sentence)
+    assert (repo.name, reindexed, count, emb.texts) == (repo_s.name, False, 1, [])
+
+
+def test_max_collections_evicts_least_recently_used(tmp_path: Path, monkeypatch):
+    import chromadb
+
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz. Bakes bread.")
+    session = _session(monkeypatch, CountingEmbeddings())
+    names = []
+    for per in ("1", "2", "3"):
+        repo, _, _ = session.open_index(
+            _args(tmp_path, data, "--index-chunks", "--sentences-per-chunk", per, "--max-collections", "2")
+        )
+        names.append(repo.name)
+
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    assert sorted(c.name for c in client.list_collections()) == sorted(names[1:])
+
+
+def test_cached_open_does_not_touch_the_registry(tmp_path: Path, monkeypatch):
+    from search.utils.collection_registry import CollectionRegistry
+
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz.")
+    args = _args(tmp_path, data, "--index-chunks")
+    session = _session(monkeypatch, CountingEmbeddings())
+    session.open_index(args)
+    assert (tmp_path / "chroma" / "collections.json").exists()
+
+    def fail(*_a, **_k):
+        raise AssertionError("collections.json written on a cached open")
+
+    monkeypatch.setattr(CollectionRegistry, "touch_and_evict", fail)
+    for _ in range(3):
+        session.open_index(args)
+
+
+def test_local_provider_ingests_and_queries_offline(tmp_path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Python developer who loves hiking")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    session = SearchSession()
+    args = _args(tmp_path, data, "--embeddings-provider", "local", "--local-dim", "32", "--query", "python")
+    repo, _reindexed, count = session.open_index(args)
+    assert count == 1
+    assert repo.metadata["model"] == "local-ngram3-32"
+
+    rows, dists = session.search(repo, args)
+    assert [r[0] for r in rows] == ["alice"]
+    assert len(dists) == 1
+
+
+def test_resume_continues_interrupted_ingest(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    data.write_text(json.dumps([
+        {"username": f"user{i}", "email": f"user{i}@example.com", "description": f"Plays chess on day {i}.",
+         "first_name": "Ann", "last_name": "Bee", "age": 30, "phone": "+12025550123"}
+        for i in range(3)
+    ]))
+    opts = ("--ingest-window", "1", "--no-embedding-store", "--resume")
+
+    class Flaky(CountingEmbeddings):
+        def embed_texts(self, texts):
+            if len(self.texts) >= 2:
+                raise RuntimeError("embeddings API down")
+            return super().embed_texts(texts)
+
+    with pytest.raises(RuntimeError):
+        _session(monkeypatch, Flaky()).open_index(_args(tmp_path, data, *opts))
+    assert list((tmp_path / "chroma" / "checkpoints").glob("*.json"))
+
+    emb = CountingEmbeddings()
+    repo, _reindexed, count = _session(monkeypatch, emb).open_index(_args(tmp_path, data, *opts))
+    assert emb.texts == ["Plays chess on day 2."]
+    assert count == 3 and repo.metadata["dataset_count"] == 3
+    assert not list((tmp_path / "chroma" / "checkpoints").glob("*.json"))
+
+
+def test_compact_chunks_store_parents_once_and_rehydrate_results(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz. Bakes bread.")
+    args = _args(tmp_path, data, "--index-chunks", "--compact-chunks", "--sentences-per-chunk", "1",
+                 "--sentence-overlap", "0", "--query", "jazz", "--k", "1")
+    session = _session(monkeypatch, CountingEmbeddings())
+    repo, _reindexed, count = session.open_index(args)
+    assert count == 1 and repo.metadata["compact_chunks"] is True
+    stored = repo.get_by_ids(["alice#c0001"])["alice#c0001"]
+    assert "email" not in stored["metadata"] and "chunk_text" not in stored["metadata"]
+
+    rows, _ = session.search(repo, args)
+    assert rows[0][0] == "alice"
+    assert rows[0][3]["email"] == "alice@example.com" and rows[0][3]["chunk_text"]
+
+    # The plain chunk layout lives in its own collection
+    plain, _, _ = session.open_index(_args(tmp_path, data, "--index-chunks", "--sentences-per-chunk", "1",
+                                           "--sentence-overlap", "0"))
+    assert plain.name != repo.name
+
+
+def test_compact_chunk_text_is_the_embedded_text(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    # Token chunks are joined by single spaces, so no chunk equals its raw description span
+    _write_users(data, "Hello,   world!\n\nRides a  bicycle.")
+    opts = ("--index-chunks", "--chunking-mode", "token", "--tokens-per-chunk", "3", "--token-overlap", "0",
+            "--query", "bicycle", "--k", "1")
+    emb = CountingEmbeddings()
+    session = _session(monkeypatch, emb)
+    compact, _, _ = session.open_index(_args(tmp_path, data, *opts, "--compact-chunks"))
+    plain, _, _ = session.open_index(_args(tmp_path, data, *opts))
+    assert sorted(set(emb.texts)) == ["! Rides a", "Hello , world", "bicycle ."]
+
+    rows, _ = session.search(compact, _args(tmp_path, data, *opts, "--compact-chunks"))
+    expected, _ = session.search(plain, _args(tmp_path, data, *opts))
+    assert rows[0][3]["chunk_text"] in emb.texts
+    assert rows[0][3]["chunk_text"] == expected[0][3]["chunk_text"]
+
+
+def test_compact_phrase_prefilter_matches_chunk_text_only(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz.")
+    opts = ("--index-chunks", "--sentences-per-chunk", "1", "--sentence-overlap", "0")
+    session = _session(monkeypatch, CountingEmbeddings())
+    plain, _, _ = session.open_index(_args(tmp_path, data, *opts))
+    compact, _, _ = session.open_index(_args(tmp_path, data, *opts, "--compact-chunks"))
+    vec = [10.0, 1.0, 0.5]
+
+    # Chunk words match in both layouts
+    for repo in (plain, compact):
+        rows, _ = repo.query(vec, 5, where_document="bicycle")
+        assert [r[0] for r in rows] == ["alice#c0000"]
+    # Parent fields (the contact tail) are only in the plain layout's documents
+    assert plain.query(vec, 5, where_document="alice@example.com")[0]
+    assert compact.query(vec, 5, where_document="alice@example.com")[0] == []
+
+    # Search with --phrase-prefilter falls back to unfiltered ranking when nothing matches
+    args = _args(tmp_path, data, *opts, "--compact-chunks", "--phrase-prefilter", "--query", "alice@example.com")
+    rows, _ = session.search(compact, args)
+    assert rows[0][0] == "alice" and rows[0][3]["email"] == "alice@example.com"
+
+
+def test_numpy_backend_ingests_searches_and_skips_unchanged(tmp_path: Path, monkeypatch):
+    from search.adapters.numpy_user_vectors import NumpyUserVectors
+
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz.")
+    args = _args(tmp_path, data, "--backend", "numpy", "--index-chunks", "--sentences-per-chunk", "1",
+                 "--sentence-overlap", "0", "--query", "Loves jazz.", "--k", "1")
+    session = _session(monkeypatch, CountingEmbeddings())
+    repo, _, count = session.open_index(args)
+    assert isinstance(repo, NumpyUserVectors) and count == 1
+    assert (tmp_path / "chroma" / "numpy" / repo.name / "vectors.npy").exists()
+    rows, dists = session.search(repo, args)
+    assert rows[0][0] == "alice" and dists[0] == pytest.approx(0.0, abs=1e-6)
+    assert (tmp_path / "chroma" / "numpy" / repo.name / "codes.npy").exists()
+    args.quantized_first_pass = True
+    assert session.search(repo, args) == (rows, dists)
+
+    emb = CountingEmbeddings()
+    repo2, reindexed, count2 = _session(monkeypatch, emb).open_index(args)
+    assert (repo2.name, reindexed, count2, emb.texts) == (repo.name, False, 1, [])
+    # Backends never share a collection
+    chroma, _, _ = _session(monkeypatch, CountingEmbeddings()).open_index(
+        _args(tmp_path, data, "--index-chunks", "--sentences-per-chunk", "1", "--sentence-overlap", "0")
+    )
+    assert chroma.name != repo.name
+
+
+def test_ivf_backend_reports_index_metrics(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz.")
+    args = _args(tmp_path, data, "--backend", "ivf", "--query", "jazz", "--k", "1", "--verbose")
+    lines: List[str] = []
+    monkeypatch.setattr(SearchSession, "embeddings", lambda self, a: CountingEmbeddings())
+    session = SearchSession(log=lines.append)
+    repo, _, count = session.open_index(args)
+    assert count == 1 and (tmp_path / "chroma" / "ivf" / repo.name).is_dir()
+    assert session.search(repo, args)[0][0][0] == "alice"
+    assert any(line.startswith("IVF index: vectors=1") for line in lines)
+
+
+def test_touched_dataset_records_new_stat_and_is_not_rehashed(tmp_path: Path, monkeypatch):
+    import os
+
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle to work every day.")
+    args = _args(tmp_path, data)
+    _session(monkeypatch, CountingEmbeddings()).open_index(args)
+
+    # Same bytes, newer mtime: matched by digest, hashed once, and the new stat is stored
+    st = os.stat(data)
+    os.utime(data, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    emb = CountingEmbeddings()
+    repo, reindexed, count = _session(monkeypatch, emb).open_index(args)
+    assert (reindexed, count, emb.texts) == (False, 1, [])
+    assert repo.metadata["dataset_mtime_ns"] == st.st_mtime_ns + 5_000_000_000
+
+    hashed: List[str] = []
+    monkeypatch.setattr("search.utils.fingerprint.file_digest", lambda path, *a, **k: hashed.append(path))
+    _session(monkeypatch, CountingEmbeddings()).open_index(args)
+    assert hashed == []
+
+
+def test_openai_client_leaves_retries_to_the_adapter(monkeypatch):
+    openai = pytest.importorskip("openai")
+
+    built = []
+
+    class FakeOpenAI:
+        def __init__(self, **kwargs):
+            built.append(kwargs)
+
+    monkeypatch.setattr(openai, "OpenAI", FakeOpenAI)
+    monkeypatch.setattr("search.session.load_env", lambda: ("sk-test", "http://embeddings.local/v1"))
+    session = SearchSession()
+    session.embeddings(parse_args([]))
+    session.embeddings(parse_args(["--embed-batch-size", "16"]))
+    assert built == [{"base_url": "http://embeddings.local/v1", "api_key": "sk-test", "max_retries": 0}]
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+def test_vacuum_never_creates_a_missing_collection(tmp_path: Path, monkeypatch, backend: str):
+    import chromadb
+
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle. Loves jazz.")
+    args = _args(tmp_path, data, "--backend", backend, "--index-chunks", "--vacuum-orphans")
+    session = _session(monkeypatch, CountingEmbeddings())
+    with pytest.raises(LookupError, match="No .* collection"):
+        session.vacuum_orphans(args)
+    assert not (tmp_path / "chroma").exists()
+
+    # Another collection in the store must not make vacuum create this one either
+    session.open_index(_args(tmp_path, data, "--backend", backend))
+    with pytest.raises(LookupError):
+        session.vacuum_orphans(args)
+    assert not (tmp_path / "chroma" / "numpy" / session.collection_name(args)).exists()
+    assert session.collection_name(args) not in {c.name for c in chromadb.PersistentClient(
+        path=str(tmp_path / "chroma")).list_collections()}
+
+    repo, _, _ = session.open_index(args)
+    vacuumed, deleted = session.vacuum_orphans(args)
+    assert (vacuumed.name, deleted) == (repo.name, [])
+
+
+def test_dimension_change_recovers_with_embedding_store(tmp_path: Path, monkeypatch):
+    data = tmp_path / "users.json"
+    _write_users(data, "Rides a bicycle to work every day.")
+    args = _args(tmp_path, data)
+    _session(monkeypatch, CountingEmbeddings()).open_index(args)
+
+    class Wider(CountingEmbeddings):
+        def embed_texts(self, texts):
+            return [v + [0.25] for v in super().embed_texts(texts)]
+
+    # Same model name, new dimension: the store's 3-d vectors must not be mixed with 4-d ones
+    users = json.loads(data.read_text())
+    users.append({**users[0], "username": "bob", "email": "bob@example.com", "description": "Plays the violin."})
+    data.write_text(json.dumps(users))
+    emb = Wider()
+    repo, reindexed, count = _session(monkeypatch, emb).open_index(args)
+    assert (reindexed, count) == (True, 2)
+    assert sorted(set(emb.texts)) == ["Plays the violin.", "Rides a bicycle to work every day."]
+    stored = repo.get_by_ids(["alice", "bob"], include_embeddings=True)
+    assert all(len(item["embedding"]) == 4 for item in stored.values())
+    # The store now holds the new dimension, so the next rebuild reuses it without a retry
+    emb = Wider()
+    _repo, reindexed, _count = _session(monkeypatch, emb).open_index(_args(tmp_path, data, "--force-recreate"))
+    assert emb.texts == []
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Cumulative import budget for an entry point, in microseconds. Importing the heavy stack
+# eagerly costs well over a second; the lazy entry points measure ~15 ms.
+STARTUP_BUDGET_US = 250_000
+
+HEAVY_MODULES = ("chromadb", "openai", "pydantic", "dotenv", "search.session", "search.models.user")
+
+
+def _import_times(module: str) -> Dict[str, int]:
+    """Return {module: cumulative_us} as reported by `python -X importtime`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    out: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit():
+            out[name] = int(cumulative)
+    return out
+
+
+@pytest.mark.parametrize("entry", ["search.api", "search.query"])
+def test_entry_point_import_is_lazy_and_within_budget(entry: str):
+    times = _import_times(entry)
+    assert entry in times
+    eager = sorted(m for m in times if m.split(".")[0] in HEAVY_MODULES or m in HEAVY_MODULES)
+    assert not eager, f"{entry} imports heavy modules at startup: {eager}"
+    assert times[entry] <= STARTUP_BUDGET_US, f"{entry} import took {times[entry]} us"
+
+
+def test_session_import_skips_openai_and_ingest_path():
+    pytest.importorskip("chromadb")
+    times = _import_times("search.session")
+    loaded = set(times)
+    assert "openai" not in loaded
+    assert "search.services.ingest_users" not in loaded
+    assert "search.models.user" not in loaded
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from search.adapters.numpy_user_vectors import open_numpy_collection
+from search.utils.bench_quantized import benchmark, synthetic_vectors
+
+
+def test_benchmark_reports_recall_against_unquantized_search(tmp_path):
+    rng = np.random.default_rng(0)
+    data = synthetic_vectors(1000, 64, rng)
+    repo = open_numpy_collection(str(tmp_path), "bench", model="m")
+    repo.upsert([f"v{i}" for i in range(1000)], [""] * 1000, data.tolist())
+
+    rows = benchmark(repo, data[:10] + 0.1, 5, [1, 200])
+    assert [r["oversample"] for r in rows] == [None, 1, 200]
+    assert rows[0]["recall"] == 1.0 and all(r["ms"] >= 0 for r in rows)
+    # 200 x 5 covers the whole collection, so the shortlist loses nothing
+    assert rows[2]["recall"] == 1.0 and rows[1]["recall"] <= rows[2]["recall"]
+
+
+def test_persisted_benchmark_requires_a_collection_name(tmp_path):
+    from search.utils.bench_quantized import main
+    from search.utils.collection_registry import CollectionRegistry
+
+    CollectionRegistry(str(tmp_path / "collections.json")).touch("users-0123456789ab", "users", {"backend": "numpy"})
+    with pytest.raises(SystemExit, match="--collection is required.*users-0123456789ab"):
+        main(["--persist", str(tmp_path)])
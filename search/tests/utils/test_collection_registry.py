@@ -0,0 +1,56 @@
+from search.utils.collection_registry import CollectionRegistry, collection_name
+
+
+def test_collection_name_depends_on_model_space_and_settings():
+    a = collection_name("users", "m", "cosine", {"index_chunks": True, "chunking_mode": "sentence"})
+    assert a.startswith("users-") and len(a) == len("users-") + 12
+    assert a == collection_name("users", "m", "cosine", {"chunking_mode": "sentence", "index_chunks": True})
+    assert a != collection_name("users", "m", "cosine", {"index_chunks": True, "chunking_mode": "token"})
+    assert a != collection_name("users", "other", "cosine", {"index_chunks": True, "chunking_mode": "sentence"})
+    assert a != collection_name("users", "m", "l2", {"index_chunks": True, "chunking_mode": "sentence"})
+
+
+def test_registry_orders_by_last_use(tmp_path):
+    now = [0.0]
+    reg = CollectionRegistry(str(tmp_path / "collections.json"), clock=lambda: now[0])
+    for i, name in enumerate(["a", "b", "c"]):
+        now[0] = float(i)
+        reg.touch(name, "users", {"n": i})
+    reg.touch("other", "people", {})
+    now[0] = 10.0
+    reg.touch("a", "users", {"n": 0})
+
+    assert reg.evictable("users", keep=2, protect="a") == ["b"]
+    reg.remove(["b"])
+    assert sorted(CollectionRegistry(reg.path).entries()) == ["a", "c", "other"]
+
+
+def test_touch_and_evict_removes_coldest_in_one_step(tmp_path):
+    now = [0.0]
+    reg = CollectionRegistry(str(tmp_path / "collections.json"), clock=lambda: now[0])
+    for i, name in enumerate(["a", "b", "c"]):
+        now[0] = float(i)
+        assert reg.touch_and_evict(name, "users", {"n": i}, keep=0) == {}
+    now[0] = 10.0
+    evicted = reg.touch_and_evict("a", "users", {"n": 0}, keep=2)
+    assert list(evicted) == ["b"] and evicted["b"]["settings"] == {"n": 1}
+    assert sorted(reg.entries()) == ["a", "c"]
+
+
+def _touch_many(path: str, prefix: str) -> None:
+    reg = CollectionRegistry(path)
+    for i in range(25):
+        reg.touch(f"{prefix}{i}", "users", {})
+
+
+def test_concurrent_processes_keep_each_others_entries(tmp_path):
+    import multiprocessing
+
+    path = str(tmp_path / "collections.json")
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_touch_many, args=(path, p)) for p in "abcd"]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert len(CollectionRegistry(path).entries()) == 100
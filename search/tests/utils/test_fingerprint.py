@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from search.utils.fingerprint import dataset_fingerprint, fingerprint_matches
+
+
+def test_fingerprint_tracks_content_and_settings(tmp_path: Path):
+    p = tmp_path / "data.json"
+    p.write_text("[1, 2]")
+    fp = dataset_fingerprint(str(p), {"normalize": False})
+    assert fp is not None and fp["dataset_size"] == 6
+    assert fingerprint_matches(fp, dataset_fingerprint(str(p), {"normalize": False}))
+    assert not fingerprint_matches(fp, dataset_fingerprint(str(p), {"normalize": True}))
+
+    p.write_text("[1, 3]")
+    assert not fingerprint_matches(fp, dataset_fingerprint(str(p), {"normalize": False}))
+
+
+def test_fingerprint_reuses_digest_when_stat_unchanged(tmp_path: Path, monkeypatch):
+    p = tmp_path / "data.json"
+    p.write_text("[]")
+    fp = dataset_fingerprint(str(p), {})
+
+    def fail(*_a, **_k):
+        raise AssertionError("file should not be re-read")
+
+    monkeypatch.setattr("search.utils.fingerprint.file_digest", fail)
+    again = dataset_fingerprint(str(p), {}, previous=fp)
+    assert again == fp
+
+
+def test_fingerprint_missing_file(tmp_path: Path):
+    assert dataset_fingerprint(str(tmp_path / "missing.json"), {}) is None
+    assert not fingerprint_matches({"dataset_digest": "x"}, None)
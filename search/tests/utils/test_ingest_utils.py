@@ -5,6 +5,8 @@ from search.utils.ingest import (
     hash_text,
     coerce_embedding,
     batched,
+    batched_by_tokens,
+    estimate_tokens,
     safe_join_fields,
 )
 
@@ -35,6 +37,20 @@ def test_batched_yields_chunks():
     assert list(batched(seq, 0)) == [seq]
 
 
+def test_batched_by_tokens_packs_by_budget_and_count():
+    seq = ["a" * 40, "b" * 40, "c" * 4, "d" * 4, "e" * 100, "f" * 4]
+    # estimates: 10, 10, 1, 1, 25, 1
+    assert estimate_tokens("a" * 40) == 10 and estimate_tokens("") == 1
+    out = [list(b) for b in batched_by_tokens(seq, max_tokens=21)]
+    assert out == [seq[0:3], seq[3:4], seq[4:5], seq[5:6]]
+    # Oversized single text still yields alone; item cap applies too
+    out = [list(b) for b in batched_by_tokens(seq, max_tokens=1000, max_items=4)]
+    assert out == [seq[0:4], seq[4:6]]
+    # No token budget -> plain count batching
+    assert [list(b) for b in batched_by_tokens(seq, 0, 5)] == [seq[0:5], seq[5:6]]
+    assert list(batched_by_tokens([], 10)) == []
+
+
 def test_safe_join_fields_skips_empty_and_normalizes():
     s = safe_join_fields("  Hello ", None, "  world  ", "")
     assert s == "Hello world"
@@ -1,6 +1,8 @@
 import json
 from pathlib import Path
 
+import pytest
+
 from search.utils.load_data import load_json
 
 
@@ -21,3 +23,45 @@ def test_load_json_invalid_returns_empty(tmp_path: Path):
     p.write_text("{ not valid json }")
     assert load_json(str(p)) == []
 
+
+def test_iter_json_records_streams_array_across_chunks(tmp_path: Path):
+    from search.utils.load_data import iter_json_records
+
+    data = [{"n": i, "text": "x" * (i % 7), "nested": {"v": [1, 2.5, None]}} for i in range(50)]
+    p = tmp_path / "data.json"
+    p.write_text(json.dumps(data, indent=2))
+    assert list(iter_json_records(str(p), chunk_size=16)) == data
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7])
+def test_iter_json_records_numbers_split_at_chunk_boundaries(tmp_path: Path, chunk_size: int):
+    from search.utils.load_data import iter_json_records
+
+    p = tmp_path / "data.json"
+    p.write_text('[1.25, {"a": -3e-2}, 12E+3, 0.5, -7, true, {"b": [4.0e1, 1]}]')
+    expected = [1.25, {"a": -0.03}, 12000.0, 0.5, -7, True, {"b": [40.0, 1]}]
+    assert list(iter_json_records(str(p), chunk_size=chunk_size)) == expected
+
+    jsonl = tmp_path / "data.jsonl"
+    jsonl.write_text("1.5\n2e3\n-0.25")
+    assert list(iter_json_records(str(jsonl), chunk_size=chunk_size)) == [1.5, 2000.0, -0.25]
+
+
+def test_iter_json_records_reads_jsonl(tmp_path: Path):
+    from search.utils.load_data import iter_json_records
+
+    p = tmp_path / "data.jsonl"
+    p.write_text('{"a": 1}\n{"b": 2}\n\n{"c": 12345}\n')
+    assert list(iter_json_records(str(p), chunk_size=3)) == [{"a": 1}, {"b": 2}, {"c": 12345}]
+
+
+def test_iter_json_records_missing_empty_and_invalid(tmp_path: Path):
+    from search.utils.load_data import iter_json_records
+
+    assert list(iter_json_records(str(tmp_path / "missing.json"))) == []
+    empty = tmp_path / "empty.json"
+    empty.write_text(" [ ] ")
+    assert list(iter_json_records(str(empty))) == []
+    bad = tmp_path / "bad.json"
+    bad.write_text('[{"a": 1}, {not valid}]')
+    assert list(iter_json_records(str(bad))) == [{"a": 1}]
@@ -0,0 +1,39 @@
+from search.utils.rate_limit import AimdLimiter, backoff_delay
+
+
+def test_aimd_limiter_halves_on_throttle_and_recovers_additively():
+    now = [0.0]
+    lim = AimdLimiter(8, cooldown=1.0, clock=lambda: now[0])
+    lim.on_throttle()
+    assert lim.limit == 4
+    # Second signal within the cooldown is part of the same congestion event
+    lim.on_throttle()
+    assert lim.limit == 4
+    now[0] = 2.0
+    lim.on_throttle()
+    assert lim.limit == 2
+    # +1/limit per success: about one step per window of `limit` successes
+    for _ in range(6):
+        lim.on_success()
+    assert lim.limit == 4
+    for _ in range(100):
+        lim.on_success()
+    assert lim.limit == 8
+
+
+def test_aimd_limiter_never_drops_below_min():
+    now = [0.0]
+    lim = AimdLimiter(2, cooldown=0.0, clock=lambda: now[0])
+    for i in range(5):
+        now[0] = float(i)
+        lim.on_throttle()
+    assert lim.limit == 1
+    with lim.slot():
+        pass
+
+
+def test_backoff_delay_grows_and_caps():
+    assert backoff_delay(0, 0.5, 30.0, lambda: 1.0) == 0.5
+    assert backoff_delay(3, 0.5, 30.0, lambda: 1.0) == 4.0
+    assert backoff_delay(10, 0.5, 30.0, lambda: 1.0) == 30.0
+    assert backoff_delay(3, 0.5, 30.0, lambda: 0.5) == 2.0
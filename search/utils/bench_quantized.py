@@ -0,0 +1,122 @@
+import argparse
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from search.adapters.ivf_user_vectors import ivf_collection_path, open_ivf_collection
+from search.adapters.numpy_user_vectors import NumpyUserVectors, numpy_collection_path, open_numpy_collection
+from search.utils.collection_registry import CollectionRegistry
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare recall and latency of the binary-quantized first pass against unquantized search."
+    )
+    parser.add_argument("--persist", default=None,
+                        help="Benchmark an existing collection under this path (default: synthetic data)")
+    parser.add_argument("--collection", default=None,
+                        help="Collection name, required with --persist: the derived name the search CLI opened "
+                             "(e.g. users-0123456789ab), as listed in <persist>/collections.json")
+    parser.add_argument("--backend", choices=["numpy", "ivf"], default="numpy", help="Vector backend")
+    parser.add_argument("--space", choices=["cosine", "l2", "ip"], default="cosine",
+                        help="Distance space for synthetic data")
+    parser.add_argument("--vectors", type=int, default=20_000, help="Synthetic vectors to index")
+    parser.add_argument("--dim", type=int, default=1024, help="Synthetic vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to run")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--oversample", type=int, nargs="+", default=[2, 4, 8, 16],
+                        help="Oversample factors to try")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    return parser.parse_args(argv)
+
+
+def known_collections(persist: str, backend: str) -> List[str]:
+    """Names of `backend` collections recorded in the persist directory's collection registry."""
+    entries = CollectionRegistry(os.path.join(persist, "collections.json")).entries()
+    return sorted(n for n, e in entries.items() if (e.get("settings") or {}).get("backend") == backend)
+
+
+def synthetic_vectors(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Clustered gaussian vectors (about 100 per cluster), closer to real embeddings than pure noise."""
+    centers = rng.standard_normal((max(1, n // 100), dim)).astype(np.float32)
+    noise = rng.standard_normal((n, dim)).astype(np.float32)
+    return centers[rng.integers(0, centers.shape[0], size=n)] + 0.7 * noise
+
+
+def benchmark(
+        repo: NumpyUserVectors, queries: np.ndarray, k: int, oversamples: Sequence[int]
+) -> List[Dict[str, Any]]:
+    """
+    One row for the unquantized path (oversample None) and one per oversample factor:
+    mean milliseconds per single query and recall@k against the unquantized results.
+    """
+    vectors = queries.tolist()
+
+    def run(oversample: int | None) -> tuple[List[set[str]], float]:
+        found: List[set[str]] = []
+        start = time.perf_counter()
+        for v in vectors:
+            if oversample is None:
+                rows, _ = repo.query(v, k)
+            else:
+                rows, _ = repo.query_quantized(v, k, oversample=oversample)
+            found.append({r[0] for r in rows})
+        return found, (time.perf_counter() - start) * 1000.0 / max(1, len(vectors))
+
+    truth, exact_ms = run(None)
+    out: List[Dict[str, Any]] = [{"oversample": None, "recall": 1.0, "ms": exact_ms}]
+    for oversample in oversamples:
+        found, ms = run(oversample)
+        hits = sum(len(f & t) / max(1, len(t)) for f, t in zip(found, truth))
+        out.append({"oversample": oversample, "recall": hits / max(1, len(truth)), "ms": ms})
+    return out
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.persist and not args.collection:
+        raise SystemExit(f"--collection is required with --persist; known collections: "
+                         f"{', '.join(known_collections(args.persist, args.backend)) or 'none'}")
+    rng = np.random.default_rng(args.seed)
+    opener = open_ivf_collection if args.backend == "ivf" else open_numpy_collection
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.persist:
+            name = args.collection
+            path = (ivf_collection_path if args.backend == "ivf" else numpy_collection_path)(args.persist, name)
+            if not os.path.isdir(path):
+                raise SystemExit(f"No {args.backend} collection at {path}")
+            repo = opener(args.persist, name)
+            if repo.dimension is None or not len(repo):
+                raise SystemExit(f"Collection '{repo.name}' is empty")
+            # Stored vectors stand in for queries
+            ids = [rid for rid, _ in repo.iter_metadata()]
+            picked = [ids[i] for i in rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)]
+            stored = repo.get_by_ids(picked, include_embeddings=True)
+            queries = np.asarray([stored[rid]["embedding"] for rid in picked if rid in stored], dtype=np.float32)
+        else:
+            data = synthetic_vectors(args.vectors, args.dim, rng)
+            repo = opener(tmp, "bench", space=args.space, model="bench")
+            ids = [f"v{i}" for i in range(data.shape[0])]
+            for i in range(0, len(ids), 5000):
+                repo.upsert(ids[i: i + 5000], [""] * len(ids[i: i + 5000]), data[i: i + 5000].tolist())
+            train_if_needed = getattr(repo, "train_if_needed", None)
+            if train_if_needed is not None:
+                train_if_needed()
+            queries = data[rng.choice(data.shape[0], size=min(args.queries, data.shape[0]), replace=False)]
+            queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+        dim = int(repo.dimension or 0)
+        print(f"{repo.name}: {len(repo)} vectors x {dim} dims ({repo.space}); "
+              f"codes {(dim + 63) // 64 * 8} B/vector vs {4 * dim} B/vector float32")
+        try:
+            for row in benchmark(repo, queries, args.k, args.oversample):
+                label = "exact" if row["oversample"] is None else f"oversample {row['oversample']}"
+                print(f"{label:>14}: recall@{args.k}={row['recall']:.3f} {row['ms']:.2f} ms/query")
+        finally:
+            repo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None  # type: ignore[assignment]
+
+from search.utils.fingerprint import settings_digest
+
+
+def collection_name(base: str, model: str | None, space: str, settings: Mapping[str, Any]) -> str:
+    """Collection name derived from the model, HNSW space and chunking settings it is built with."""
+    digest = settings_digest({**settings, "model": model, "space": space})[:12]
+    return f"{base}-{digest}"
+
+
+class CollectionRegistry:
+    """
+    Last-used times of config-derived collections, kept in a small JSON file under the
+    persist directory. `touch` records a use; `evictable` lists the coldest collections
+    beyond a per-base limit so callers can drop them; `touch_and_evict` does both in one
+    step. Every read-modify-write holds an exclusive lock on `<path>.lock`, so processes
+    sharing a persist directory do not lose each other's entries.
+    """
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time) -> None:
+        self._path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        with self._locked():
+            return self._load()
+
+    def touch(self, name: str, base: str, settings: Mapping[str, Any]) -> None:
+        with self._locked():
+            data = self._load()
+            data[name] = {"base": base, "last_used": self._clock(), "settings": dict(settings)}
+            self._save(data)
+
+    def evictable(self, base: str, keep: int, protect: str | None = None) -> List[str]:
+        """Least recently used collections of `base` beyond the `keep` most recent (never `protect`)."""
+        with self._locked():
+            data = self._load()
+        return _coldest(data, base, keep, protect)
+
+    def touch_and_evict(
+            self, name: str, base: str, settings: Mapping[str, Any], keep: int
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Record a use of `name` and, with `keep` > 0, remove the coldest collections of `base`
+        beyond it from the registry. Returns the removed entries for the caller to drop.
+        """
+        with self._locked():
+            data = self._load()
+            data[name] = {"base": base, "last_used": self._clock(), "settings": dict(settings)}
+            evicted = {n: data.pop(n) for n in _coldest(data, base, keep, name)} if keep > 0 else {}
+            self._save(data)
+        return evicted
+
+    def remove(self, names: List[str]) -> None:
+        if not names:
+            return
+        with self._locked():
+            data = self._load()
+            for n in names:
+                data.pop(n, None)
+            self._save(data)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+            with open(f"{self._path}.lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self, data: Dict[str, Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        tmp = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, sort_keys=True)
+        os.replace(tmp, self._path)
+
+
+def _coldest(data: Mapping[str, Mapping[str, Any]], base: str, keep: int, protect: str | None) -> List[str]:
+    same = sorted(
+        (n for n, e in data.items() if e.get("base") == base),
+        key=lambda n: float(data[n].get("last_used") or 0.0),
+        reverse=True,
+    )
+    return [n for n in same[max(1, keep):] if n != protect]
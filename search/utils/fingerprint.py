@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Mapping
+
+FINGERPRINT_KEYS = ("dataset_path", "dataset_size", "dataset_mtime_ns", "dataset_digest", "ingest_settings")
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the raw file bytes, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def settings_digest(settings: Mapping[str, Any]) -> str:
+    """Stable short digest of the ingest settings that shape stored records."""
+    blob = json.dumps(dict(settings), sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def dataset_fingerprint(
+        path: str, settings: Mapping[str, Any], previous: Mapping[str, Any] | None = None
+) -> Dict[str, Any] | None:
+    """
+    Fingerprint of a dataset file plus the ingest settings applied to it.
+    The content digest is carried over from `previous` when path, size and mtime
+    are unchanged, so an untouched file is never re-read. Returns None if the
+    file cannot be stat'ed.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    fp: Dict[str, Any] = {
+        "dataset_path": os.path.abspath(path),
+        "dataset_size": int(st.st_size),
+        "dataset_mtime_ns": int(st.st_mtime_ns),
+        "ingest_settings": settings_digest(settings),
+    }
+    prev = previous or {}
+    same_file = all(prev.get(k) == fp[k] for k in ("dataset_path", "dataset_size", "dataset_mtime_ns"))
+    if same_file and isinstance(prev.get("dataset_digest"), str):
+        fp["dataset_digest"] = prev["dataset_digest"]
+    else:
+        fp["dataset_digest"] = file_digest(path)
+    return fp
+
+
+def fingerprint_matches(meta: Mapping[str, Any] | None, fp: Mapping[str, Any] | None) -> bool:
+    """True when `meta` records an ingest of the same content with the same settings."""
+    if not meta or not fp:
+        return False
+    return (
+        meta.get("dataset_digest") == fp.get("dataset_digest")
+        and meta.get("ingest_settings") == fp.get("ingest_settings")
+    )
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import hashlib
 import re
-from typing import Any, Iterable, List, Optional, Sequence
+from typing import Any, Callable, Iterable, List, Optional, Sequence
 
 
 def normalize_text(s: str | None) -> str:
@@ -48,6 +48,38 @@ def batched(seq: Sequence[str], batch_size: int) -> Iterable[Sequence[str]]:
         yield seq[i : i + batch_size]
 
 
+def estimate_tokens(s: str | None) -> int:
+    """Rough token count (~4 characters per token); never below 1 so every text costs something."""
+    return max(1, (len(s or "") + 3) // 4)
+
+
+def batched_by_tokens(
+        seq: Sequence[str],
+        max_tokens: int,
+        max_items: int = 0,
+        estimate: Callable[[str], int] = estimate_tokens,
+) -> Iterable[Sequence[str]]:
+    """
+    Yield contiguous slices of `seq` whose estimated token total stays within `max_tokens`
+    and whose length stays within `max_items` (non-positive limits are ignored).
+    A single text over the budget is yielded on its own.
+    """
+    if max_tokens <= 0:
+        yield from batched(seq, max_items)
+        return
+    start = 0
+    tokens = 0
+    for i, text in enumerate(seq):
+        cost = estimate(text)
+        full = (0 < max_items <= i - start) or tokens + cost > max_tokens
+        if i > start and full:
+            yield seq[start:i]
+            start, tokens = i, 0
+        tokens += cost
+    if start < len(seq):
+        yield seq[start:]
+
+
 def safe_join_fields(*fields: Optional[str]) -> str:
     """Join only non-empty, normalized values with single spaces."""
     return " ".join([normalize_text(f) for f in fields if f and normalize_text(f)])
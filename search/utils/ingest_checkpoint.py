@@ -0,0 +1,52 @@
+import json
+import os
+from typing import Any, Dict
+
+
+class IngestCheckpoint:
+    """
+    Progress of a running ingest, kept in a small JSON file under the persist directory:
+    how many windows (and parents) are already committed to the collection. `key` ties the
+    record to one dataset, collection and set of ingest/windowing settings; a checkpoint
+    written under another key is ignored.
+    """
+
+    def __init__(self, path: str, key: str) -> None:
+        self._path = path
+        self._key = key
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def committed(self) -> int:
+        """Windows committed under this key (0 if none or recorded for other settings)."""
+        data = self._load()
+        if data.get("key") != self._key:
+            return 0
+        try:
+            return max(0, int(data.get("windows") or 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def commit(self, windows: int, parents: int) -> None:
+        """Record that the first `windows` windows (`parents` users) are written."""
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        tmp = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"key": self._key, "windows": int(windows), "parents": int(parents)}, f)
+        os.replace(tmp, self._path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
@@ -1,7 +1,10 @@
 import argparse
 import json
 import sys
-from typing import Any
+from typing import Any, Iterator, Sequence
+
+# Characters that can follow a number's decoded prefix and still belong to it ("1" of "1.", "2e", "3e-")
+_NUMBER_TAIL = "0123456789.eE+-"
 
 
 def load_json(path: str) -> list[dict[str, Any]]:
@@ -16,25 +19,184 @@ def load_json(path: str) -> list[dict[str, Any]]:
         return []
 
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Load users, embed descriptions, and query Chroma.")
+def iter_json_records(path: str, chunk_size: int = 1 << 20, strict: bool = False) -> Iterator[Any]:
+    """
+    Stream records from a JSON array file or a JSONL / concatenated-JSON file without
+    loading it whole; memory is bounded by `chunk_size` plus the largest single record.
+    Errors are reported like `load_json`; on malformed input the stream stops there.
+    With `strict`, a missing or malformed file raises instead.
+    """
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        if strict:
+            raise
+        print(f"Error: The file {path} was not found.", file=sys.stderr)
+        return
+    decoder = json.JSONDecoder()
+    with f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws() -> bool:
+            """Advance past whitespace; False at end of input."""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf):
+                    return True
+                if not fill():
+                    return False
+
+        def decode() -> Any:
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if fill():
+                        continue
+                    raise
+                # A value ending at the buffer edge may continue in the next chunk, and so may a number
+                # followed only by the start of a fraction or exponent ("1." of "1.25"), which
+                # raw_decode stops short of
+                if (end == len(buf) or _is_number(value) and not buf[end:].lstrip(_NUMBER_TAIL)) and fill():
+                    continue
+                pos = end
+                return value
+
+        try:
+            if not skip_ws():
+                return
+            if buf[pos] != "[":
+                while skip_ws():
+                    yield decode()
+                return
+            pos += 1
+            if skip_ws() and buf[pos] == "]":
+                return
+            while True:
+                if not skip_ws():
+                    raise json.JSONDecodeError("Unterminated array", buf, pos)
+                yield decode()
+                if not skip_ws():
+                    raise json.JSONDecodeError("Unterminated array", buf, pos)
+                sep = buf[pos]
+                pos += 1
+                if sep == "]":
+                    return
+                if sep != ",":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos - 1)
+        except json.JSONDecodeError:
+            if strict:
+                raise
+            print(f"Error: The file {path} could not be decoded.", file=sys.stderr)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def build_parser(parser_class: type = argparse.ArgumentParser) -> argparse.ArgumentParser:
+    parser = parser_class(description="Load users, embed descriptions, and query Chroma.")
     parser.add_argument("--export-user-schema", action="store_true",
                         help="Export user JSON schema for search.api output and exit")
+    parser.add_argument("--serve", action="store_true",
+                        help="Stay resident and answer newline-delimited JSON requests (search.api only)")
+    parser.add_argument("--socket",
+                        help="With --serve: listen on this Unix socket path instead of stdin/stdout")
     parser.add_argument("--data", default="data.json", help="Path to users JSON file")
     parser.add_argument("--persist", default=".chroma", help="Path for Chroma persistence store")
-    parser.add_argument("--collection", default="users", help="Chroma collection name")
+    parser.add_argument("--collection", default="users", help="Chroma collection name (base name unless --fixed-collection)")
+    parser.add_argument("--fixed-collection", action="store_true",
+                        help="Use --collection as is and recreate it when chunking settings change (legacy); "
+                             "by default each model/space/chunking configuration gets its own collection")
+    parser.add_argument("--max-collections", type=int, default=0,
+                        help="Configurations kept per --collection; least recently used ones are dropped "
+                             "(default 0: keep all; only set it when no other process uses the same --persist)")
     parser.add_argument("--space", default="cosine", help="Vector space metric for HNSW index (cosine, l2, ip)")
+    parser.add_argument("--backend", choices=["chroma", "numpy", "ivf"], default="chroma",
+                        help="Vector store: chroma (HNSW, approximate), numpy (exact search over a memory-mapped "
+                             "float32 matrix under <persist>/numpy/) or ivf (k-means inverted file under <persist>/ivf/)")
+    parser.add_argument("--ivf-nlist", type=int, default=0,
+                        help="With --backend ivf: number of k-means lists (0: about sqrt of the vector count)")
+    parser.add_argument("--ivf-nprobe", type=int, default=8,
+                        help="With --backend ivf: lists scanned per query (higher: better recall, slower)")
     parser.add_argument("--force-recreate", action="store_true",
                         help="Drop and recreate the collection with the requested space")
+    parser.add_argument("--embed-batch-size", type=int, default=128,
+                        help="Max texts per embeddings request")
+    parser.add_argument("--embed-max-tokens", type=int, default=32_000,
+                        help="Estimated token budget per embeddings request when ingesting (0 = count-only batching)")
+    parser.add_argument("--embed-concurrency", type=int, default=4,
+                        help="Max embeddings requests in flight (reduced automatically on HTTP 429)")
+    parser.add_argument("--no-embedding-store", action="store_true",
+                        help="Do not keep corpus embeddings in <persist>/embeddings.sqlite3 across collection rebuilds")
+    parser.add_argument("--embedding-store-max-entries", type=int, default=0,
+                        help="Max corpus embeddings kept in <persist>/embeddings.sqlite3, least recently used "
+                             "evicted first (0: unbounded; the store keeps every text ever embedded)")
+    parser.add_argument("--embeddings-provider", choices=["openai", "local"], default="openai",
+                        help="openai: --model via the configured endpoint; local: deterministic hashed n-gram "
+                             "vectors computed offline (benchmarks, tests)")
+    parser.add_argument("--local-dim", type=int, default=256, help="Vector dimension for --embeddings-provider local")
+    parser.add_argument("--local-latency-ms", type=float, default=0.0,
+                        help="Simulated mean latency per local embeddings request, in milliseconds")
+    parser.add_argument("--local-latency-jitter-ms", type=float, default=0.0,
+                        help="Standard deviation of the simulated local latency, in milliseconds")
     parser.add_argument("--model", default="text-embedding-mxbai-embed-large-v1", help="Embedding model name")
     parser.add_argument("--query", default="", help="Query text")
+    parser.add_argument("--queries-file",
+                        help="JSONL file of queries (strings or {\"query\": ..., \"id\": ...}); "
+                             "prints one JSON result line per query (search.api only)")
+    parser.add_argument("--query-batch-size", type=int, default=256,
+                        help="Queries embedded and searched per batch with --queries-file")
     parser.add_argument("--k", type=int, default=5, help="Top-k results to return")
+    parser.add_argument("--query-cache-size", type=int, default=1024,
+                        help="In-memory LRU entries for query embeddings (0 disables the memory tier)")
+    parser.add_argument("--query-cache-disk-entries", type=int, default=100_000,
+                        help="Max query embeddings kept on disk under --persist (0 disables the disk tier)")
+    parser.add_argument("--validation-cache-entries", type=int, default=1_000_000,
+                        help="Max validated user records kept on disk under --persist, least recently used "
+                             "evicted first (0 disables the cache)")
     parser.add_argument("--threshold", type=float, help="Max distance threshold to accept")
     parser.add_argument("--normalize", action="store_true",
                         help="Normalize text (lowercase, collapse spaces) before embedding")
     parser.add_argument("--min-chars", type=int, default=10, help="Minimum description length to index")
     parser.add_argument("--phrase-prefilter", action="store_true",
                         help="Apply substring prefilter using the query text")
+    parser.add_argument("--ingest-window", type=int, default=2048,
+                        help="Records read, embedded and upserted per step while ingesting; bounds peak memory")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Processes for validation, payload building and chunking (0/1: in-process)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Overlap reading/chunking, embedding and writing of consecutive ingest windows")
+    parser.add_argument("--pipeline-depth", type=int, default=2,
+                        help="With --pipeline: windows queued between stages (bounds memory)")
+    parser.add_argument("--trusted-input", action="store_true",
+                        help="Skip User validation (data already validated upstream, e.g. by the back-end at upload)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Diff the dataset against the collection: write only added/changed records and "
+                             "delete users (and their chunks) no longer in --data")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted ingest of the same dataset and settings from its last "
+                             "committed window (checkpoint under --persist)")
+    parser.add_argument("--vacuum-orphans", action="store_true",
+                        help="Delete chunk records outside their user's current chunk set from the existing "
+                             "collection, then exit (no ingest, no query)")
     parser.add_argument("--verbose", action="store_true", help="Verbose output: histogram and reuse details")
     # Chunking and indexing controls
     parser.add_argument("--index-chunks", action="store_true",
@@ -49,6 +211,30 @@ def parse_args() -> argparse.Namespace:
                         help="Number of tokens per chunk when --chunking-mode=token")
     parser.add_argument("--token-overlap", type=int, default=50,
                         help="Token overlap between adjacent chunks when --chunking-mode=token")
+    parser.add_argument("--compact-chunks", action="store_true",
+                        help="With --index-chunks: store parent fields and text once in <persist>/parents.sqlite3; "
+                             "chunks keep only parent_id and character offsets")
     parser.add_argument("--chunk-query-multiplier", type=int, default=5,
                         help="Multiply k for initial retrieval in chunk mode before aggregating by parent")
-    return parser.parse_args()
+    parser.add_argument("--quantized-first-pass", action="store_true",
+                        help="With --backend numpy/ivf: shortlist candidates by Hamming distance over sign-bit "
+                             "codes, then re-rank them exactly (ignored by chroma)")
+    parser.add_argument("--quantized-oversample", type=int, default=8,
+                        help="With --quantized-first-pass: re-rank this many times the requested candidates")
+    parser.add_argument("--exact-rerank", action="store_true",
+                        help="With --backend chroma: fetch more HNSW candidates with their embeddings and "
+                             "re-rank them by exact distance")
+    parser.add_argument("--rerank-oversample", type=int, default=4,
+                        help="With --exact-rerank: HNSW candidates fetched per kept candidate")
+    parser.add_argument("--parent-aggregation", choices=["max", "mean-top-n", "softmax-sum"], default="max",
+                        help="Chunk mode: score a parent by its best chunk, the mean of its best "
+                             "--aggregation-top-n chunks, or a soft minimum over all its chunks")
+    parser.add_argument("--aggregation-top-n", type=int, default=3,
+                        help="With --parent-aggregation mean-top-n: chunks averaged per parent")
+    parser.add_argument("--aggregation-temperature", type=float, default=0.05,
+                        help="With --parent-aggregation softmax-sum: lower is closer to max")
+    return parser
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
@@ -0,0 +1,66 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+class AimdLimiter:
+    """
+    Concurrency limit with additive-increase / multiplicative-decrease.
+    Each success raises the limit by 1/limit (about +1 per full window of requests);
+    a throttling signal halves it, at most once per `cooldown` seconds so a burst
+    of 429s from the same window counts as one congestion event.
+    """
+
+    def __init__(
+            self,
+            max_limit: int,
+            *,
+            min_limit: int = 1,
+            cooldown: float = 1.0,
+            clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self._limit = float(self.max_limit)
+        self._cooldown = cooldown
+        self._clock = clock
+        self._last_decrease: float | None = None
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        with self._cond:
+            return int(self._limit)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / max(1.0, self._limit))
+            self._cond.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            now = self._clock()
+            if self._last_decrease is not None and now - self._last_decrease < self._cooldown:
+                return
+            self._last_decrease = now
+            self._limit = max(float(self.min_limit), self._limit / 2.0)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, jitter: Callable[[], float]) -> float:
+    """Exponential backoff with full jitter: uniform-ish in [0, min(cap, base * 2**attempt)]."""
+    return min(cap, base * (2 ** attempt)) * jitter()